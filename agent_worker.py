@@ -0,0 +1,260 @@
+"""
+Agent Worker - hosts agents in a separate process with batched decisions
+"""
+from typing import Any, Callable, Dict, List, Optional
+import multiprocessing
+import pickle
+import struct
+
+from agent import Agent
+
+
+# Message types
+_SPAWN = 1
+_DECIDE = 2
+_SHUTDOWN = 3
+
+# Message header: type, record count
+_HEADER = struct.Struct("<BI")
+
+# Percept record: slot, x, y, cell_content, goal_visible, goal_direction, up, down, left, right
+_PERCEPT = struct.Struct("<IiiBBBBBBB")
+
+# Action record: slot, action code
+_ACTION = struct.Struct("<IB")
+
+# Action and direction codes; index 0 is "no action" / "no direction"
+_ACTIONS = (None, "up", "down", "left", "right")
+_ACTION_CODES = {action: code for code, action in enumerate(_ACTIONS)}
+
+
+def _encode_percept(slot: int, percept: Dict) -> bytes:
+    adjacents = percept["adjacents"]
+    x, y = percept["position"]
+    return _PERCEPT.pack(
+        slot, x, y,
+        percept["cell_content"],
+        1 if percept["goal_visible"] else 0,
+        _ACTION_CODES.get(percept["goal_direction"], 0),
+        adjacents["up"], adjacents["down"], adjacents["left"], adjacents["right"],
+    )
+
+
+def _decode_percept(record: tuple) -> Dict:
+    _, x, y, cell_content, goal_visible, goal_direction, up, down, left, right = record
+    return {
+        "position": (x, y),
+        "adjacents": {"up": up, "down": down, "left": left, "right": right},
+        "goal_visible": bool(goal_visible),
+        "goal_direction": _ACTIONS[goal_direction],
+        "cell_content": cell_content,
+    }
+
+
+def _worker_main(conn: Any) -> None:
+    """
+    Serve agent requests in the worker process until shut down.
+
+    Args:
+        conn: The worker's end of the pipe
+    """
+    agents: List[Agent] = []
+    while True:
+        try:
+            message = conn.recv_bytes()
+        except EOFError:
+            return
+        kind, count = _HEADER.unpack_from(message)
+
+        if kind == _SHUTDOWN:
+            return
+
+        if kind == _SPAWN:
+            # Setup messages are rare, so they carry a pickled factory call
+            factory, args, kwargs = pickle.loads(message[_HEADER.size:])
+            agents.append(factory(*args, **kwargs))
+            conn.send_bytes(_HEADER.pack(_SPAWN, len(agents) - 1))
+            continue
+
+        # _DECIDE: perceive everything first, then decide, as Environment.step does
+        slots = []
+        for record in _PERCEPT.iter_unpack(message[_HEADER.size:]):
+            agents[record[0]].perceive(_decode_percept(record))
+            slots.append(record[0])
+
+        reply = bytearray(_HEADER.pack(_DECIDE, len(slots)))
+        for slot in slots:
+            agent = agents[slot]
+            action = agent.decide()
+            agent.act()
+            reply += _ACTION.pack(slot, _ACTION_CODES.get(action, 0))
+        conn.send_bytes(bytes(reply))
+
+
+class AgentWorker:
+    """
+    A local worker process hosting one or more agents.
+
+    Agents are created inside the worker from a picklable factory (usually
+    the agent class) and represented in the environment by RemoteAgent
+    proxies. During a step, each proxy's percept is queued; the first proxy
+    asked to decide sends every queued percept in one message and receives
+    every action in one reply, so there is one round trip per worker per
+    step rather than one per agent.
+
+    Per-step messages use fixed-size little-endian struct records over a
+    multiprocessing pipe. If the worker process dies, its agents stop
+    acting (their decisions become None) instead of crashing the
+    environment.
+    """
+
+    def __init__(self, context: Optional[str] = None):
+        """
+        Start the worker process.
+
+        Args:
+            context: multiprocessing start method ("fork", "spawn", ...), or
+                None for the platform default
+        """
+        ctx = multiprocessing.get_context(context)
+        self._conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_main, args=(child_conn,), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.alive = True
+        self._queued = bytearray()  # Encoded percepts awaiting the next batch
+        self._queued_count = 0
+        self._actions: Dict[int, Any] = {}  # Maps slots to actions from the last batch
+
+    def spawn(self, factory: Callable[..., Agent], *args: Any, **kwargs: Any) -> "RemoteAgent":
+        """
+        Create an agent inside the worker.
+
+        Args:
+            factory: A picklable callable returning an Agent, e.g. the agent class
+            *args, **kwargs: Arguments for the factory
+
+        Returns:
+            A RemoteAgent proxy to add to an environment
+        """
+        payload = pickle.dumps((factory, args, kwargs))
+        self._conn.send_bytes(_HEADER.pack(_SPAWN, 0) + payload)
+        _, slot = _HEADER.unpack(self._conn.recv_bytes())
+        name = kwargs.get("name", args[0] if args else getattr(factory, "__name__", "RemoteAgent"))
+        return RemoteAgent(self, slot, name)
+
+    def queue_percept(self, slot: int, percept: Dict) -> None:
+        """
+        Queue a percept for the next batched decision.
+
+        Args:
+            slot: The agent's slot in the worker
+            percept: The percept to deliver
+        """
+        self._queued += _encode_percept(slot, percept)
+        self._queued_count += 1
+
+    def action_for(self, slot: int) -> Any:
+        """
+        Get an agent's action, sending the queued batch first if needed.
+
+        Args:
+            slot: The agent's slot in the worker
+
+        Returns:
+            The agent's decided action, or None if it has none
+        """
+        if self._queued_count:
+            self.flush()
+        return self._actions.get(slot)
+
+    def flush(self) -> None:
+        """
+        Send all queued percepts and collect the agents' actions.
+        """
+        message = _HEADER.pack(_DECIDE, self._queued_count) + bytes(self._queued)
+        self._queued = bytearray()
+        self._queued_count = 0
+        self._actions = {}
+        if not self.alive:
+            return
+        try:
+            self._conn.send_bytes(message)
+            reply = self._conn.recv_bytes()
+        except (EOFError, OSError):
+            self.alive = False
+            return
+        for slot, code in _ACTION.iter_unpack(reply[_HEADER.size:]):
+            self._actions[slot] = _ACTIONS[code]
+
+    def close(self) -> None:
+        """
+        Stop the worker process.
+        """
+        if self.alive:
+            try:
+                self._conn.send_bytes(_HEADER.pack(_SHUTDOWN, 0))
+            except OSError:
+                pass
+            self.alive = False
+        self._conn.close()
+        self.process.join(timeout=1)
+        if self.process.is_alive():
+            self.process.terminate()
+
+    def __enter__(self) -> "AgentWorker":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
+class RemoteAgent(Agent):
+    """
+    An environment-side proxy for an agent hosted in an AgentWorker.
+    """
+
+    def __init__(self, worker: AgentWorker, slot: int, name: str = "RemoteAgent"):
+        """
+        Initialize the proxy.
+
+        Args:
+            worker: The worker hosting the agent
+            slot: The agent's slot in the worker
+            name: A name for the agent
+        """
+        super().__init__(name)
+        self.worker = worker
+        self.slot = slot
+        self.current_action = None
+        self._has_percept = False
+
+    def perceive(self, percept: Any) -> None:
+        """
+        Queue the percept for the worker's next batch.
+
+        Args:
+            percept: The percept received from the environment
+        """
+        self._has_percept = percept is not None
+        if self._has_percept:
+            self.worker.queue_percept(self.slot, percept)
+
+    def decide(self) -> Any:
+        """
+        Get the remote agent's decision for the current step.
+
+        Returns:
+            An action to be performed
+        """
+        self.current_action = self.worker.action_for(self.slot) if self._has_percept else None
+        return self.current_action
+
+    def act(self) -> Any:
+        """
+        Execute the decided action.
+
+        Returns:
+            The action performed
+        """
+        return self.current_action
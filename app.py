@@ -1,35 +1,89 @@
 """
 Flask web server for agent visualization
 """
-from flask import Flask, render_template, jsonify, request
+from flask import Flask, Response, g, render_template, jsonify, request
+from collections.abc import Mapping
 import json
+import os
 import random
+import sys
+import tempfile
+import threading
 import time
 from collections import deque
 
 # Import our agent implementations and grid world
-from reflex_agent import SimpleReflexAgent
+from reflex_agent import SimpleReflexAgent, default_explorer
 from model_agent import ModelBasedAgent
 from utility_agent import UtilityBasedAgent
 from q_learning_agent import QLearningAgent
 from grid_world import GridWorld
+from simulation_store import SimulationNotFound, create_store
+from simulation_jobs import JobManager, JobQueueFull
+from response_encoding import encode_payload
+from q_table_store import QValueOverlay, save_q_table, warm_start
+from metrics import CONTENT_TYPE, SIZE_BUCKETS, Counter, Gauge, Histogram, MetricsRegistry
 
 app = Flask(__name__)
 
-# Global variables to store the current simulation state
-current_env = None
-current_agent = None
-simulation_running = False
-step_count = 0
-simulation_data = {
-    'steps': [],
-    'performance': [],
-    'visit_counts': {}
-}
+# Simulations are kept in a store shared by all server processes, keyed by the
+# id the client sends in this header (also usable as a sticky-routing key)
+SIMULATION_HEADER = 'X-Simulation-Id'
+store = create_store(os.environ.get('SIMULATION_STORE', 'sqlite'))
+
+# Background simulation runs; submissions beyond the pool and queue are refused
+MAX_JOB_STEPS = 100000
+jobs = JobManager(store, lambda config: create_simulation(config['agent_type']),
+                  max_workers=int(os.environ.get('SIMULATION_JOB_WORKERS', 2)),
+                  max_queued=int(os.environ.get('SIMULATION_JOB_QUEUE', 8)))
+
+# Agent comparisons run this many mazes per agent type, each capped at this many steps
+COMPARE_AGENT_TYPES = ('reflex', 'model', 'utility', 'qlearning')
+COMPARE_TRIALS = 5
+COMPARE_MAX_STEPS = 1000
+
+# A job event stream holds a server thread that polls the job record at this
+# interval; it ends after this many seconds and the client reconnects
+JOB_EVENTS_POLL_SECONDS = 0.5
+JOB_EVENTS_MAX_SECONDS = 60
+
+# Q-tables learned on each maze; new Q-learning agents on a known maze start from them
+Q_TABLE_DIR = os.environ.get('Q_TABLE_DIR', os.path.join(tempfile.gettempdir(), 'q_tables'))
+
+# Metrics served at /metrics; each server process reports its own requests
+metrics = MetricsRegistry()
+REQUEST_LATENCY = metrics.register(Histogram(
+    'http_request_duration_seconds', 'Request latency by route', ['route', 'method']))
+REQUEST_COUNT = metrics.register(Counter(
+    'http_requests_total', 'Requests by route and status', ['route', 'method', 'status']))
+RESPONSE_SIZE = metrics.register(Histogram(
+    'http_response_size_bytes', 'Response payload size by route', ['route'], buckets=SIZE_BUCKETS))
+STEP_TIME = metrics.register(Histogram(
+    'simulation_step_seconds', 'Time for one environment step by agent class', ['agent']))
+MAZE_TIME = metrics.register(Histogram(
+    'maze_generation_seconds', 'Time to generate a maze'))
+ACTIVE_SIMULATIONS = metrics.register(Gauge(
+    'active_simulations', 'Simulations in the store', function=lambda: len(stored_simulation_ids())))
+ACTIVE_JOBS = metrics.register(Gauge(
+    'active_jobs', 'Background jobs queued or running in this process', function=lambda: jobs.active_jobs))
+AGENT_STRUCTURE_BYTES = metrics.register(Gauge(
+    'agent_structure_bytes', 'Approximate memory used by agent structures in simulations this process updated',
+    ['structure']))
+AGENT_STRUCTURE_ENTRIES = metrics.register(Gauge(
+    'agent_structure_entries', 'Entries in agent structures in simulations this process updated',
+    ['structure']))
+
+# Agent structure sizes of the simulations this process last created or stepped,
+# with their running totals, so /metrics need not load every stored simulation
+AGENT_STRUCTURES = ('q_values', 'utilities', 'model')
+agent_structure_sizes = {}  # Maps simulation ids to (bytes, entries) dicts keyed by structure
+agent_structure_totals = ({structure: 0 for structure in AGENT_STRUCTURES},
+                          {structure: 0 for structure in AGENT_STRUCTURES})
+agent_structure_lock = threading.Lock()
 
 def convert_dict_keys_to_str(obj):
     """Convert all dictionary tuple keys to strings to make them JSON serializable"""
-    if isinstance(obj, dict):
+    if isinstance(obj, Mapping):
         return {str(k): convert_dict_keys_to_str(v) for k, v in obj.items()}
     elif isinstance(obj, list):
         return [convert_dict_keys_to_str(item) for item in obj]
@@ -95,6 +149,84 @@ def is_agent_trapped(grid, pos):
             
     return True  # All directions are blocked
 
+@app.before_request
+def start_request_timer():
+    """Record when the request started, for the latency metric"""
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    """Record latency, status and payload size for the request's route"""
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    start = getattr(g, 'request_start', None)
+    if start is not None:
+        REQUEST_LATENCY.observe(time.perf_counter() - start, route=route, method=request.method)
+    REQUEST_COUNT.inc(route=route, method=request.method, status=str(response.status_code))
+    if response.content_length is not None:
+        RESPONSE_SIZE.observe(response.content_length, route=route)
+    return response
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Report server metrics in the Prometheus text format"""
+    # Drop simulations that were deleted or expired from the store since they were measured
+    stored = set(stored_simulation_ids())
+    for simulation_id in [simulation_id for simulation_id in list(agent_structure_sizes)
+                          if simulation_id not in stored]:
+        record_agent_structures(simulation_id, None)
+    return Response(metrics.render(), content_type=CONTENT_TYPE)
+
+def stored_simulation_ids():
+    """Get the ids of stored simulations, leaving out background job records"""
+    return [simulation_id for simulation_id in store.ids() if not JobManager.is_job_key(simulation_id)]
+
+def measure_agent_structures(agent):
+    """
+    Approximate the size of an agent's learned structures.
+    
+    Returns:
+        A tuple of (bytes, entries) dicts keyed by structure name
+    """
+    sizes = {structure: 0 for structure in AGENT_STRUCTURES}
+    entries = {structure: 0 for structure in AGENT_STRUCTURES}
+    for structure in ('q_values', 'utilities'):
+        table = getattr(agent, structure, None)
+        if isinstance(table, QValueOverlay):
+            table = table.changes  # The mapped base table is shared, not held by the agent
+        if table is not None:
+            sizes[structure] = sys.getsizeof(table) + sum(
+                sys.getsizeof(key) + sys.getsizeof(value) for key, value in table.items())
+            entries[structure] = len(table)
+    if hasattr(agent, 'world_model'):
+        sizes['model'] = agent.world_model.nbytes
+        entries['model'] = len(agent.model)
+    return sizes, entries
+
+def record_agent_structures(simulation_id, agent):
+    """
+    Update the agent structure gauges for a simulation's agent.
+    
+    Args:
+        simulation_id: The simulation the agent belongs to
+        agent: The agent after its latest change, or None if the simulation is gone
+    """
+    measured = measure_agent_structures(agent) if agent is not None else None
+    sizes, entries = agent_structure_totals
+    with agent_structure_lock:
+        previous = agent_structure_sizes.pop(simulation_id, None)
+        if previous is not None:
+            for structure in AGENT_STRUCTURES:
+                sizes[structure] -= previous[0][structure]
+                entries[structure] -= previous[1][structure]
+        if measured is not None:
+            agent_structure_sizes[simulation_id] = measured
+            for structure in AGENT_STRUCTURES:
+                sizes[structure] += measured[0][structure]
+                entries[structure] += measured[1][structure]
+        for structure in AGENT_STRUCTURES:
+            AGENT_STRUCTURE_BYTES.set(sizes[structure], structure=structure)
+            AGENT_STRUCTURE_ENTRIES.set(entries[structure], structure=structure)
+
 @app.route('/')
 def index():
     """Render the main page"""
@@ -103,53 +235,105 @@ def index():
 @app.route('/init', methods=['POST'])
 def initialize_simulation():
     """Initialize a new simulation based on agent type"""
-    global current_env, current_agent, simulation_running, step_count, simulation_data
-    
     # Get agent type from request
     agent_type = request.json.get('agent_type', 'reflex')
     
-    # Reset simulation state
-    step_count = 0
-    simulation_running = False
-    simulation_data = {
-        'steps': [],
-        'performance': [],
-        'visit_counts': {}
-    }
+    env, agent = create_simulation(agent_type)
+    
+    # Replace the client's previous simulation, if any
+    previous_id = get_simulation_id()
+    if previous_id:
+        store.delete(previous_id)
+        record_agent_structures(previous_id, None)
+    simulation_id = store.create({
+        'env': env,
+        'agent': agent,
+        'step_count': 0,
+        'simulation_data': {
+            'steps': [],
+            'performance': [],
+            'visit_counts': {}
+        },
+        'render_snapshot': {},
+        'q_table_saved': False
+    })
+    record_agent_structures(simulation_id, agent)
+    
+    # Return initial state; the client draws the whole grid from it
+    state = get_environment_state(env)
+    state['simulation_id'] = simulation_id
+    state['full_redraw'] = True
+    return simulation_response(state, simulation_id)
+
+def get_simulation_id():
+    """
+    Get the simulation id sent by the client, if any.
     
+    Job records share the store with simulations, so an id naming a job
+    record is ignored rather than loaded or deleted as a simulation.
+    """
+    simulation_id = request.headers.get(SIMULATION_HEADER) or request.args.get('simulation_id')
+    if simulation_id and JobManager.is_job_key(simulation_id):
+        return None
+    return simulation_id
+
+def simulation_response(state, simulation_id):
+    """
+    Build a response in the format and compression the client accepts,
+    echoing the simulation id header.
+    """
+    body, headers = encode_payload(state, request.headers.get('Accept', ''),
+                                   request.headers.get('Accept-Encoding', ''))
+    response = Response(body, headers=headers)
+    response.headers[SIMULATION_HEADER] = simulation_id
+    return response
+
+def create_simulation(agent_type):
+    """
+    Create the web environment with a maze and an agent of the given type.
+    
+    Args:
+        agent_type: One of 'reflex', 'model', 'utility' or 'qlearning'
+        
+    Returns:
+        A tuple of (environment, agent)
+    """
     # Create environment
     width = 15
     height = 8
-    current_env = GridWorld(width=width, height=height, name="Web Visualization")
+    env = GridWorld(width=width, height=height, name="Web Visualization")
     
     # Define start and goal positions
     start_pos = (1, 1)
     goal_pos = (width - 2, height - 2)
     
     # Add goal
-    current_env.add_goal(goal_pos)
+    env.add_goal(goal_pos)
     
     # Create a maze with guaranteed path
-    create_structured_maze(current_env, start_pos, goal_pos)
+    with MAZE_TIME.time():
+        create_structured_maze(env, start_pos, goal_pos)
     
     # Create agent based on type
     if agent_type == 'reflex':
-        current_agent = create_reflex_agent()
+        agent = create_reflex_agent()
     elif agent_type == 'model':
-        current_agent = ModelBasedAgent("Explorer")
+        agent = ModelBasedAgent("Explorer")
     elif agent_type == 'utility':
-        current_agent = UtilityBasedAgent("Explorer", exploration_rate=0.2)
+        agent = UtilityBasedAgent("Explorer", exploration_rate=0.2)
     elif agent_type == 'qlearning':
-        current_agent = QLearningAgent("Q-Learner", learning_rate=0.2, discount_factor=0.9, exploration_rate=0.3)
+        agent = QLearningAgent("Q-Learner", learning_rate=0.2, discount_factor=0.9, exploration_rate=0.3)
     else:
         # Default to reflex agent
-        current_agent = create_reflex_agent()
+        agent = create_reflex_agent()
     
     # Add agent to environment at position (1, 1)
-    current_env.add_agent(current_agent, start_pos)
+    env.add_agent(agent, start_pos)
     
-    # Return initial state
-    return jsonify(get_environment_state())
+    if isinstance(agent, QLearningAgent):
+        warm_start(agent, env, Q_TABLE_DIR)
+    
+    return env, agent
 
 def create_structured_maze(env, start_pos, goal_pos):
     """
@@ -242,7 +426,7 @@ def create_structured_maze(env, start_pos, goal_pos):
         for dx, dy in [(0, -1), (0, 1), (-1, 0), (1, 0)]:
             nx, ny = sx + dx, sy + dy
             if 0 <= nx < env.width and 0 <= ny < env.height and env.grid[ny][nx] == env.OBSTACLE:
-                env.grid[ny][nx] = env.EMPTY
+                env.remove_obstacle((nx, ny))
                 grid_copy[ny][nx] = env.EMPTY
     
     # Final path validation
@@ -254,76 +438,68 @@ def create_structured_maze(env, start_pos, goal_pos):
         
         # Clear horizontal path
         for x in range(min(sx, gx), max(sx, gx) + 1):
-            env.grid[sy][x] = env.EMPTY
+            env.remove_obstacle((x, sy))
             
         # Clear vertical path
         for y in range(min(sy, gy), max(sy, gy) + 1):
-            env.grid[y][gx] = env.EMPTY
+            env.remove_obstacle((gx, y))
 
 def create_reflex_agent():
     """Create and configure a reflex agent with rules"""
-    agent = SimpleReflexAgent("Explorer")
-    
-    # Rule 1: If at the goal, stay there
-    def at_goal(percept):
-        return percept["cell_content"] == GridWorld.GOAL
-    agent.add_rule(at_goal, None)
-    
-    # Rule 2: If a goal is visible, move toward it
-    def goal_visible(percept):
-        return percept["goal_visible"]
-    agent.add_rule(goal_visible, lambda percept: percept["goal_direction"])
-    
-    # Rule 3: If obstacle ahead, try to go around it
-    def obstacle_ahead(percept):
-        open_directions = [d for d, content in percept["adjacents"].items() 
-                          if content != GridWorld.OBSTACLE]
-        if open_directions:
-            return True
-        return False
-    
-    # Choose a random open direction
-    def choose_open_direction(percept):
-        open_directions = [d for d, content in percept["adjacents"].items() 
-                         if content != GridWorld.OBSTACLE]
-        if open_directions:
-            return random.choice(open_directions)
-        return None
-    
-    agent.add_rule(obstacle_ahead, choose_open_direction)
-    
-    return agent
+    return default_explorer("Explorer")
 
 @app.route('/step', methods=['POST'])
 def step_simulation():
     """Advance the simulation by one step"""
-    global step_count, simulation_data
-    
-    if current_env is None or current_agent is None:
+    simulation_id = get_simulation_id()
+    try:
+        with store.session(simulation_id) as sim:
+            state = advance_simulation(sim)
+            record_agent_structures(simulation_id, sim['agent'])
+    except SimulationNotFound:
         return jsonify({"error": "Simulation not initialized"}), 400
+    except TimeoutError:
+        return jsonify({"error": "Simulation is busy"}), 409
+    
+    return simulation_response(state, simulation_id)
+
+def advance_simulation(sim):
+    """Run one step of a stored simulation and build the client state"""
+    env = sim['env']
+    agent = sim['agent']
+    simulation_data = sim['simulation_data']
     
     # Run one step of the simulation
-    current_env.step()
-    step_count += 1
+    with STEP_TIME.time(agent=type(agent).__name__):
+        env.step()
+    sim['step_count'] += 1
     
     # Track performance over time for charts
-    simulation_data['steps'].append(step_count)
-    simulation_data['performance'].append(current_agent.performance_measure)
+    simulation_data['steps'].append(sim['step_count'])
+    simulation_data['performance'].append(agent.performance_measure)
     
     # Update visit counts if available (for heat map)
-    if hasattr(current_agent, 'visit_counts'):
-        simulation_data['visit_counts'] = convert_dict_keys_to_str(current_agent.visit_counts)
+    if hasattr(agent, 'visit_counts'):
+        simulation_data['visit_counts'] = convert_dict_keys_to_str(agent.visit_counts)
     
     # Check if goal is reached
     goal_reached = False
-    for goal_pos in current_env.goal_positions:
-        if current_env.agent_positions[current_agent] == goal_pos:
+    for goal_pos in env.goal_positions:
+        if env.agent_positions[agent] == goal_pos:
             goal_reached = True
             break
     
-    # Get the current state
-    state = get_environment_state()
-    state['step_count'] = step_count
+    # Keep what the agent learned for the next agent on this maze, once per
+    # episode; further steps on the goal do not change the table
+    if goal_reached and isinstance(agent, QLearningAgent) and not sim.get('q_table_saved'):
+        save_q_table(agent, env, Q_TABLE_DIR)
+        sim['q_table_saved'] = True
+    
+    # Get the current state; the client keeps its copy of the grid and
+    # applies the cells the environment changed this tick
+    state = get_environment_state(env, include_grid=False)
+    state['cell_changes'] = [[x, y, get_cell_type(env, x, y)] for x, y in sorted(env.last_changes)]
+    state['step_count'] = sim['step_count']
     state['goal_reached'] = goal_reached
     state['simulation_data'] = simulation_data
     
@@ -331,111 +507,280 @@ def step_simulation():
     agent_type = "unknown"
     agent_info = {}
     
-    if isinstance(current_agent, SimpleReflexAgent):
+    if isinstance(agent, SimpleReflexAgent):
         agent_type = "reflex"
-    elif isinstance(current_agent, ModelBasedAgent):
+    elif isinstance(agent, ModelBasedAgent):
         agent_type = "model"
         agent_info = {
-            "model_size": len(current_agent.model),
-            "goal_position": current_agent.goal_position,
-            "plan": current_agent.plan
+            "model_size": len(agent.model),
+            "goal_position": agent.goal_position,
+            "plan": agent.plan
         }
-    elif isinstance(current_agent, UtilityBasedAgent):
+    elif isinstance(agent, UtilityBasedAgent):
         agent_type = "utility"
         agent_info = {
-            "model_size": len(current_agent.model),
-            "exploration_rate": current_agent.exploration_rate,
-            "utilities": convert_dict_keys_to_str(current_agent.utilities)
+            "model_size": len(agent.model),
+            "exploration_rate": agent.exploration_rate,
+            "utilities": convert_dict_keys_to_str(agent.utilities)
         }
-    elif isinstance(current_agent, QLearningAgent):
+    elif isinstance(agent, QLearningAgent):
         agent_type = "qlearning"
         
         # Convert q_values to use string keys
-        q_values_dict = convert_dict_keys_to_str(current_agent.q_values)
-        visit_counts_dict = convert_dict_keys_to_str(current_agent.visit_counts) if hasattr(current_agent, 'visit_counts') else {}
+        q_values_dict = convert_dict_keys_to_str(agent.q_values)
+        visit_counts_dict = convert_dict_keys_to_str(agent.visit_counts) if hasattr(agent, 'visit_counts') else {}
         
         agent_info = {
-            "model_size": len(current_agent.model),
-            "exploration_rate": current_agent.exploration_rate,
-            "learning_rate": current_agent.learning_rate,
-            "discount_factor": current_agent.discount_factor,
-            "total_reward": current_agent.total_reward,
+            "model_size": len(agent.model),
+            "exploration_rate": agent.exploration_rate,
+            "learning_rate": agent.learning_rate,
+            "discount_factor": agent.discount_factor,
+            "total_reward": agent.total_reward,
             "q_values": q_values_dict,
             "visit_counts": visit_counts_dict
         }
         
         # Generate q_value_grid if available
-        if hasattr(current_agent, 'get_q_value_grid'):
-            agent_info["q_value_grid"] = current_agent.get_q_value_grid(current_env.width, current_env.height)
+        if hasattr(agent, 'get_q_value_grid'):
+            agent_info["q_value_grid"] = agent.get_q_value_grid(env.width, env.height)
     
     state['agent_type'] = agent_type
     state['agent_info'] = agent_info
     
-    return jsonify(state)
+    # Tell the client which cells to repaint
+    layers = get_render_layers(env, agent)
+    if 'policy' in layers:
+        agent_info['policy'] = convert_dict_keys_to_str(layers['policy'])
+    state['dirty_cells'] = collect_dirty_cells(sim, layers)
+    state['full_redraw'] = False
+    
+    return state
 
 @app.route('/state', methods=['GET'])
 def get_state():
     """Get the current state of the simulation"""
-    if current_env is None or current_agent is None:
+    simulation_id = get_simulation_id()
+    try:
+        sim = store.load(simulation_id or '')
+    except SimulationNotFound:
         return jsonify({"error": "Simulation not initialized"}), 400
     
-    state = get_environment_state()
-    state['step_count'] = step_count
-    state['simulation_data'] = simulation_data
+    state = get_environment_state(sim['env'])
+    state['step_count'] = sim['step_count']
+    state['simulation_data'] = sim['simulation_data']
     
-    return jsonify(state)
+    return simulation_response(state, simulation_id)
+
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    """Start a background simulation run for a step budget"""
+    config = request.json or {}
+    agent_type = config.get('agent_type', 'reflex')
+    steps = config.get('steps', 1000)
+    if not isinstance(steps, int) or not 1 <= steps <= MAX_JOB_STEPS:
+        return jsonify({"error": f"steps must be an integer from 1 to {MAX_JOB_STEPS}"}), 400
+    
+    try:
+        job_id = jobs.submit({'agent_type': agent_type}, steps)
+    except JobQueueFull:
+        return busy_response()
+    
+    return jsonify(jobs.status(job_id)), 202
+
+def busy_response():
+    """Build the response for a job refused because the pool and its queue are full"""
+    response = jsonify({"error": "Server busy, try again later"})
+    response.headers['Retry-After'] = '5'
+    return response, 503
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Get a background job's status and results"""
+    try:
+        return jsonify(jobs.status(job_id))
+    except SimulationNotFound:
+        return jsonify({"error": "Job not found"}), 404
+
+@app.route('/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    """Cancel a background job"""
+    try:
+        return jsonify(jobs.cancel(job_id))
+    except SimulationNotFound:
+        return jsonify({"error": "Job not found"}), 404
+
+@app.route('/jobs/<job_id>/events', methods=['GET'])
+def stream_job(job_id):
+    """
+    Stream a background job's status as server-sent events.
+    
+    Each open stream keeps a server thread (a worker, under gunicorn's sync
+    workers) busy polling the job record, so a stream ends when the job
+    does or after JOB_EVENTS_MAX_SECONDS, whichever comes first. An
+    EventSource client reconnects by itself after the time limit.
+    """
+    try:
+        job = jobs.status(job_id)
+    except SimulationNotFound:
+        return jsonify({"error": "Job not found"}), 404
+    
+    def events(job):
+        deadline = time.monotonic() + JOB_EVENTS_MAX_SECONDS
+        while True:
+            yield f"data: {json.dumps(job)}\n\n"
+            if job['status'] in JobManager.TERMINAL_STATUSES or time.monotonic() >= deadline:
+                return
+            time.sleep(JOB_EVENTS_POLL_SECONDS)
+            job = jobs.status(job_id)
+    
+    return Response(events(job), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
 
 @app.route('/compare', methods=['POST'])
 def compare_agents():
-    """Run simulations with different agents and compare results"""
-    # This would run multiple simulations and return comparative data
-    # Simplified implementation for demonstration purposes
-    results = {
-        'reflex': {'steps_to_goal': 28, 'success_rate': 0.7},
-        'model': {'steps_to_goal': 16, 'success_rate': 0.9},
-        'utility': {'steps_to_goal': 19, 'success_rate': 0.85},
-        'qlearning': {'steps_to_goal': 22, 'success_rate': 0.95}
+    """Start a background comparison of the agent types; its job record holds the results"""
+    try:
+        job_id = jobs.submit_task({'kind': 'compare'}, run_comparison)
+    except JobQueueFull:
+        return busy_response()
+    
+    return jsonify(jobs.status(job_id)), 202
+
+def run_comparison(config):
+    """Compare each agent type in turn, yielding the results gathered so far"""
+    results = {}
+    for agent_type in COMPARE_AGENT_TYPES:
+        results[agent_type] = compare_agent(agent_type)
+        yield dict(results)
+
+def compare_agent(agent_type, trials=COMPARE_TRIALS, max_steps=COMPARE_MAX_STEPS):
+    """
+    Score an agent type against the shortest paths in fresh web mazes.
+    
+    Args:
+        agent_type: One of 'reflex', 'model', 'utility' or 'qlearning'
+        trials: The number of mazes to run
+        max_steps: Steps after which a trial counts as a failure
+        
+    Returns:
+        The mean steps to the goal and mean shortest path length over
+        successful trials, the success rate, and the mean efficiency
+        (shortest path length / steps taken, 0 for failed trials)
+    """
+    steps_taken = []
+    optimal_steps = []
+    efficiency = 0.0
+    for _ in range(trials):
+        env, agent = create_simulation(agent_type)
+        # O(1) after the goal distance field is built
+        optimal = env.optimal_distance(env.agent_positions[agent])
+        for step in range(1, max_steps + 1):
+            env.step()
+            if env.agent_positions[agent] in env.goal_positions:
+                steps_taken.append(step)
+                optimal_steps.append(optimal)
+                efficiency += optimal / step
+                break
+    
+    successes = len(steps_taken)
+    return {
+        'steps_to_goal': sum(steps_taken) / successes if successes else None,
+        'optimal_steps': sum(optimal_steps) / successes if successes else None,
+        'success_rate': successes / trials,
+        'efficiency': efficiency / trials
     }
+
+def get_render_layers(env, agent):
+    """
+    Collect the per-cell contents the client draws, one dict per layer.
     
-    return jsonify(results)
-
-def get_environment_state():
-    """Extract the current environment state as JSON"""
-    if current_env is None:
-        return {}
-    
-    # Convert grid to a list of lists for JSON
-    grid = []
-    for y in range(current_env.height):
-        row = []
-        for x in range(current_env.width):
-            cell_type = "empty"
-            if current_env.grid[y][x] == GridWorld.OBSTACLE:
-                cell_type = "obstacle"
-            elif current_env.grid[y][x] == GridWorld.GOAL:
-                cell_type = "goal"
-            row.append(cell_type)
-        grid.append(row)
+    Args:
+        env: The simulation's environment
+        agent: The simulation's agent
+        
+    Returns:
+        Maps layer names to dicts of (x, y) -> drawn value
+    """
+    layers = {
+        'agents': {position: agent.name for agent, position in env.agent_positions.items()}
+    }
+    
+    if hasattr(agent, 'visit_counts'):
+        layers['visits'] = dict(agent.visit_counts)
+    
+    if isinstance(agent, UtilityBasedAgent):
+        layers['values'] = dict(agent.utilities)
+    elif isinstance(agent, QLearningAgent):
+        q_grid = agent.get_q_value_grid(env.width, env.height)
+        layers['values'] = {(x, y): value for y, row in enumerate(q_grid) for x, value in enumerate(row)}
+        
+        # Best action per position, as drawn by the policy view
+        best = {}
+        for (position, action), value in agent.q_values.items():
+            if value > best.get(position, (None, float('-inf')))[1]:
+                best[position] = (action, value)
+        layers['policy'] = {position: action for position, (action, value) in best.items() if value > 0}
+    
+    return layers
+
+def collect_dirty_cells(sim, layers):
+    """
+    Find the cells whose drawn contents changed since the last response.
     
+    Args:
+        sim: The stored simulation, whose render snapshot is updated
+        layers: The current output of get_render_layers()
+        
+    Returns:
+        A list of [x, y] pairs for every cell the client should repaint
+    """
+    # Obstacles and goals changed by the environment this tick
+    dirty = set(sim['env'].last_changes)
+    for name, cells in layers.items():
+        previous = sim['render_snapshot'].get(name, {})
+        for position in cells.keys() | previous.keys():
+            if cells.get(position) != previous.get(position):
+                dirty.add(position)
+    
+    sim['render_snapshot'] = layers
+    return [list(position) for position in sorted(dirty)]
+
+def get_cell_type(env, x, y):
+    """Name the contents of a grid cell for the client"""
+    if env.grid[y][x] == GridWorld.OBSTACLE:
+        return "obstacle"
+    if env.grid[y][x] == GridWorld.GOAL:
+        return "goal"
+    return "empty"
+
+def get_environment_state(env, include_grid=True):
+    """
+    Extract the current environment state as JSON.
+    
+    The whole grid is only needed when the client redraws everything; a
+    step response leaves it out and lists the changed cells instead.
+    """
     # Add agent positions
     agents = []
-    for agent, position in current_env.agent_positions.items():
+    for agent, position in env.agent_positions.items():
         agents.append({
             "name": agent.name,
             "position": position,
             "performance": agent.performance_measure
         })
     
-    return {
-        "grid": grid,
-        "width": current_env.width,
-        "height": current_env.height,
+    state = {
+        "width": env.width,
+        "height": env.height,
         "agents": agents,
-        "time_step": current_env.time_step
+        "time_step": env.time_step
     }
+    if include_grid:
+        # Convert grid to a list of lists for JSON
+        state["grid"] = [[get_cell_type(env, x, y) for x in range(env.width)]
+                         for y in range(env.height)]
+    return state
 
 if __name__ == '__main__':
     # Use environment variable for port if available (Render.com sets this)
-    import os
     port = int(os.environ.get('PORT', 5000))
     app.run(host='0.0.0.0', port=port, debug=False)
\ No newline at end of file
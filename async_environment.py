@@ -0,0 +1,158 @@
+"""
+Async Environment - concurrent agent decisions with per-agent deadlines
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional, Tuple
+import asyncio
+
+from environment import Environment
+from grid_world import GridWorld
+
+
+class AsyncEnvironment(Environment):
+    """
+    An environment whose step and run are coroutines that await all agents'
+    decisions concurrently.
+
+    Agents that define a coroutine method ``decide_async()`` (for example a
+    policy served over the network) are awaited directly. Ordinary agents
+    have their synchronous ``decide()`` run in a thread pool so that one slow
+    agent does not hold up the others.
+
+    Every decision must finish within ``decision_timeout`` seconds. An agent
+    that misses the deadline gets a fallback action for that step: no action
+    (``NOOP``) or the action it took last step (``LAST_ACTION``). A
+    thread-pool decision that overran keeps running in the background, and
+    until it finishes the agent is not asked to perceive, decide or act
+    again (so no two threads touch it at once) and is given the fallback.
+    The late decision's action is discarded, but anything decide() changes
+    on the agent itself, such as a Q-learning agent's recorded last
+    action, is still changed when it finishes. Coroutine decisions that
+    overrun are cancelled.
+
+    This class is meant to be combined with a concrete environment, e.g.
+    ``class MyWorld(AsyncEnvironment, GridWorld)``; see AsyncGridWorld.
+    """
+
+    # Fallback policies for missed deadlines
+    NOOP = "noop"
+    LAST_ACTION = "last_action"
+
+    def __init__(self, *args: Any, decision_timeout: float = 1.0, fallback: str = NOOP,
+                 max_workers: Optional[int] = None, **kwargs: Any):
+        """
+        Initialize the environment.
+
+        Args:
+            decision_timeout: Seconds each agent has to decide, or None for no deadline
+            fallback: NOOP or LAST_ACTION, the action used when a deadline is missed
+            max_workers: Size of the thread pool for synchronous agents
+            *args, **kwargs: Passed on to the concrete environment
+        """
+        if fallback not in (self.NOOP, self.LAST_ACTION):
+            raise ValueError(f"unknown fallback policy: {fallback}")
+        super().__init__(*args, **kwargs)
+        self.decision_timeout = decision_timeout
+        self.fallback = fallback
+        self.max_workers = max_workers
+        self.last_actions: Dict[Any, Any] = {}  # Maps agents to the action applied last step
+        self.missed_deadlines: Dict[Any, int] = {}  # Maps agents to their missed-deadline counts
+        self._executor = None  # ThreadPoolExecutor, created on first use
+        self._pending: Dict[Any, asyncio.Future] = {}  # Overrunning thread-pool decisions
+
+    async def step(self) -> None:
+        """
+        Run one time step of the environment.
+        """
+        # Agents whose overrunning decide() is still running are left alone until it finishes
+        busy = set()
+        for agent, future in list(self._pending.items()):
+            if future.done():
+                del self._pending[agent]
+            else:
+                busy.add(agent)
+
+        # First, agents perceive the environment
+        for agent in self.agents:
+            if agent not in busy:
+                percept = self.get_percept(agent)
+                agent.perceive(percept)
+
+        # Then, agents decide concurrently
+        decisions = await asyncio.gather(*(self._decide(agent, agent in busy) for agent in self.agents))
+
+        # And act, in the usual order
+        for agent, (action, on_time) in zip(self.agents, decisions):
+            if on_time:
+                agent.act()
+            self.apply_action(agent, action)
+            self.last_actions[agent] = action
+
+        # Update the environment
+        self.update()
+        self.time_step += 1
+
+    async def run(self, steps: int) -> None:
+        """
+        Run the environment for a specified number of steps.
+
+        Args:
+            steps: The number of steps to run
+        """
+        for _ in range(steps):
+            await self.step()
+
+    def close(self) -> None:
+        """
+        Shut down the thread pool used for synchronous agents.
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    async def _decide(self, agent: Any, busy: bool) -> Tuple[Any, bool]:
+        """
+        Get an agent's decision under the deadline.
+
+        Args:
+            agent: The agent
+            busy: Whether the agent's previous decision is still running
+
+        Returns:
+            A tuple of (action, whether the agent decided in time)
+        """
+        if busy:
+            return self._missed(agent)
+
+        decide_async = getattr(agent, "decide_async", None)
+        if decide_async is not None:
+            try:
+                return await asyncio.wait_for(decide_async(), self.decision_timeout), True
+            except asyncio.TimeoutError:
+                return self._missed(agent)
+
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        future = asyncio.get_running_loop().run_in_executor(self._executor, agent.decide)
+        try:
+            # Shield the future so a timeout leaves it to finish in the background
+            return await asyncio.wait_for(asyncio.shield(future), self.decision_timeout), True
+        except asyncio.TimeoutError:
+            self._pending[agent] = future
+            return self._missed(agent)
+
+    def _missed(self, agent: Any) -> Tuple[Any, bool]:
+        """
+        Record a missed deadline and pick the fallback action.
+        """
+        self.missed_deadlines[agent] = self.missed_deadlines.get(agent, 0) + 1
+        if self.fallback == self.LAST_ACTION:
+            return self.last_actions.get(agent), False
+        return None, False
+
+
+class AsyncGridWorld(AsyncEnvironment, GridWorld):
+    """
+    A GridWorld whose step and run are coroutines; see AsyncEnvironment.
+    """
+    pass
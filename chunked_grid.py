@@ -0,0 +1,255 @@
+"""
+Chunked Grid - a sparse tile-based grid backend for very large GridWorlds
+"""
+from typing import Dict, Iterator, Set, Tuple
+import random
+
+
+class ChunkedGrid:
+    """
+    A 2D grid of small integer cell values stored in fixed-size square tiles.
+
+    Tiles that contain only empty (zero) cells are not stored at all; a tile
+    is allocated as a dense bytearray the first time a non-empty value is
+    written into it, and released again once it becomes all-empty. Memory
+    therefore scales with the number of non-empty cells rather than with
+    width * height.
+
+    The grid supports the same ``grid[y][x]`` read/write access as the
+    list-of-lists representation used by GridWorld, so existing callers
+    keep working unchanged.
+    """
+
+    def __init__(self, width: int, height: int, chunk_size: int = 64):
+        """
+        Initialize the grid with every cell empty.
+
+        Args:
+            width: The width of the grid
+            height: The height of the grid
+            chunk_size: The side length of each square tile
+        """
+        if chunk_size <= 0:
+            raise ValueError("chunk_size must be positive")
+        self.width = width
+        self.height = height
+        self.chunk_size = chunk_size
+        self._chunks: Dict[Tuple[int, int], bytearray] = {}  # Maps tile coords to cell values
+        self._counts: Dict[Tuple[int, int], int] = {}  # Maps tile coords to non-empty cell counts
+        self._shared_tiles: Set[Tuple[int, int]] = set()  # Tiles shared with a copy, copied on write
+
+    def get(self, x: int, y: int) -> int:
+        """
+        Get the value of a cell.
+
+        Args:
+            x: The column of the cell
+            y: The row of the cell
+
+        Returns:
+            The cell value (0 for cells in unallocated tiles)
+        """
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            raise IndexError(f"cell ({x}, {y}) is outside the grid")
+        size = self.chunk_size
+        chunk = self._chunks.get((x // size, y // size))
+        if chunk is None:
+            return 0
+        return chunk[(y % size) * size + (x % size)]
+
+    def set(self, x: int, y: int, value: int) -> None:
+        """
+        Set the value of a cell, allocating or releasing its tile as needed.
+
+        Args:
+            x: The column of the cell
+            y: The row of the cell
+            value: The new cell value (0-255)
+        """
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            raise IndexError(f"cell ({x}, {y}) is outside the grid")
+        size = self.chunk_size
+        key = (x // size, y // size)
+        chunk = self._chunks.get(key)
+
+        if chunk is None:
+            if value == 0:
+                return
+            chunk = bytearray(size * size)
+            self._chunks[key] = chunk
+            self._counts[key] = 0
+        elif key in self._shared_tiles:
+            chunk = bytearray(chunk)
+            self._chunks[key] = chunk
+            self._shared_tiles.discard(key)
+
+        index = (y % size) * size + (x % size)
+        old = chunk[index]
+        chunk[index] = value
+
+        if old == 0 and value != 0:
+            self._counts[key] += 1
+        elif old != 0 and value == 0:
+            self._counts[key] -= 1
+            if self._counts[key] == 0:
+                # Tile is all-empty again, so drop it
+                del self._chunks[key]
+                del self._counts[key]
+                self._shared_tiles.discard(key)
+
+    def copy(self) -> "ChunkedGrid":
+        """
+        Create a grid with the same cells that shares tiles with this one.
+
+        Tiles are copied by whichever grid next writes to them, so the copy
+        costs O(tiles) rather than O(cells).
+
+        Returns:
+            The new grid
+        """
+        grid = ChunkedGrid(self.width, self.height, self.chunk_size)
+        grid._chunks = dict(self._chunks)
+        grid._counts = dict(self._counts)
+        self._shared_tiles = set(self._chunks)
+        grid._shared_tiles = set(self._chunks)
+        return grid
+
+    def nonempty_cells(self) -> Iterator[Tuple[int, int, int]]:
+        """
+        Iterate over all non-empty cells.
+
+        Returns:
+            An iterator of (x, y, value) tuples
+        """
+        size = self.chunk_size
+        for (cx, cy), chunk in self._chunks.items():
+            for index, value in enumerate(chunk):
+                if value:
+                    yield cx * size + index % size, cy * size + index // size, value
+
+    def random_empty_cell(self) -> Tuple[int, int]:
+        """
+        Choose a uniformly random empty cell without indexing the whole grid.
+
+        Empty cells in allocated tiles are found by scanning the allocated
+        tiles; empty cells elsewhere by sampling unallocated tiles. Each
+        call costs O(allocated tiles + chunk_size ** 2), or O(tiles) when
+        most of the grid is allocated, and no memory proportional to
+        width * height.
+
+        Returns:
+            The (x, y) position of an empty cell
+
+        Raises:
+            IndexError: If the grid has no empty cells
+        """
+        size = self.chunk_size
+        allocated_area = 0
+        allocated_empty = 0
+        for key, count in self._counts.items():
+            area = self._tile_area(key)
+            allocated_area += area
+            allocated_empty += area - count
+        unallocated_empty = self.width * self.height - allocated_area
+        total = allocated_empty + unallocated_empty
+        if total == 0:
+            raise IndexError("no empty cells to sample from")
+
+        pick = random.randrange(total)
+        if pick < allocated_empty:
+            for key, count in self._counts.items():
+                empty = self._tile_area(key) - count
+                if pick < empty:
+                    return self._nth_empty_in_tile(key, pick)
+                pick -= empty
+
+        tiles_x = -(-self.width // size)
+        tiles_y = -(-self.height // size)
+        if unallocated_empty * 2 >= self.width * self.height:
+            # Mostly unallocated: sample cells until one lands in an unallocated tile
+            while True:
+                x = random.randrange(self.width)
+                y = random.randrange(self.height)
+                if (x // size, y // size) not in self._chunks:
+                    return x, y
+        pick -= allocated_empty
+        for cy in range(tiles_y):
+            for cx in range(tiles_x):
+                if (cx, cy) in self._chunks:
+                    continue
+                area = self._tile_area((cx, cy))
+                if pick < area:
+                    tile_width = min(size, self.width - cx * size)
+                    return cx * size + pick % tile_width, cy * size + pick // tile_width
+                pick -= area
+        raise AssertionError("empty cell count out of sync with tiles")
+
+    def _tile_area(self, key: Tuple[int, int]) -> int:
+        """Number of grid cells in a tile, which is smaller at the right and bottom edges."""
+        size = self.chunk_size
+        return min(size, self.width - key[0] * size) * min(size, self.height - key[1] * size)
+
+    def _nth_empty_in_tile(self, key: Tuple[int, int], n: int) -> Tuple[int, int]:
+        """The position of the n-th empty in-bounds cell of an allocated tile, in row-major order."""
+        size = self.chunk_size
+        cx, cy = key
+        tile_width = min(size, self.width - cx * size)
+        tile_height = min(size, self.height - cy * size)
+        chunk = self._chunks[key]
+        for row in range(tile_height):
+            start = row * size
+            empty = tile_width - sum(1 for value in chunk[start:start + tile_width] if value)
+            if n < empty:
+                for column in range(tile_width):
+                    if chunk[start + column] == 0:
+                        if n == 0:
+                            return cx * size + column, cy * size + row
+                        n -= 1
+            n -= empty
+        raise AssertionError("empty cell count out of sync with tile")
+
+    @property
+    def tile_count(self) -> int:
+        """Number of allocated (non-empty) tiles."""
+        return len(self._chunks)
+
+    def __getitem__(self, y: int) -> "_GridRow":
+        if not 0 <= y < self.height:
+            raise IndexError(f"row {y} is outside the grid")
+        return _GridRow(self, y)
+
+    def __len__(self) -> int:
+        return self.height
+
+    def __iter__(self) -> Iterator["_GridRow"]:
+        for y in range(self.height):
+            yield _GridRow(self, y)
+
+    def __str__(self) -> str:
+        return f"ChunkedGrid({self.width}x{self.height}, {self.tile_count} tiles)"
+
+
+class _GridRow:
+    """
+    A lightweight view of one row of a ChunkedGrid, so that ``grid[y][x]``
+    reads and writes behave like a list of lists.
+    """
+
+    __slots__ = ("_grid", "_y")
+
+    def __init__(self, grid: ChunkedGrid, y: int):
+        self._grid = grid
+        self._y = y
+
+    def __getitem__(self, x: int) -> int:
+        return self._grid.get(x, self._y)
+
+    def __setitem__(self, x: int, value: int) -> None:
+        self._grid.set(x, self._y, value)
+
+    def __len__(self) -> int:
+        return self._grid.width
+
+    def __iter__(self) -> Iterator[int]:
+        for x in range(self._grid.width):
+            yield self._grid.get(x, self._y)
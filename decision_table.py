@@ -0,0 +1,246 @@
+"""
+Decision Table - compiled declarative condition-action rules for reflex agents
+"""
+from itertools import product
+from typing import Any, Dict, Iterable, List, Tuple
+import random
+
+
+class _Marker:
+    """
+    A named singleton compared by identity.
+
+    Pickling refers to the module-level name, so a pickled agent or table
+    still holds the same marker after it is loaded.
+    """
+
+    __slots__ = ("name",)
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __repr__(self) -> str:
+        return self.name
+
+    def __reduce__(self) -> str:
+        return self.name
+
+
+# Sentinel returned when no rule matches a percept
+NO_MATCH = _Marker("NO_MATCH")
+
+# Action that picks a random adjacent direction that is not an obstacle
+RANDOM_OPEN_DIRECTION = _Marker("RANDOM_OPEN_DIRECTION")
+
+
+class PerceptField:
+    """
+    A declarative action that returns the value of a percept field,
+    e.g. ``PerceptField("goal_direction")`` to move toward a visible goal.
+    """
+
+    __slots__ = ("name",)
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __repr__(self) -> str:
+        return f"PerceptField({self.name!r})"
+
+
+class DecisionTable:
+    """
+    An ordered list of declarative rules compiled into a lookup table.
+
+    Each rule is a dictionary of conditions over percept fields plus an action.
+    A condition maps a field to a required value, or to a tuple/set/frozenset
+    of allowed values. Supported fields are ``cell_content``, ``goal_visible``,
+    ``goal_direction`` and the adjacent cell contents ``up``, ``down``,
+    ``left`` and ``right``. As with callable rules, the first matching rule wins.
+
+    All supported fields have small finite domains, so the table enumerates
+    every combination once and records which rule (if any) applies. Matching
+    a percept is then a handful of dictionary reads and one list index.
+    Percepts with values outside those domains fall back to checking the
+    rules in order.
+
+    Actions may be a constant (including None), a ``PerceptField``,
+    ``RANDOM_OPEN_DIRECTION``, or a callable taking the percept.
+    """
+
+    DIRECTIONS = ("up", "down", "left", "right")
+
+    # Domains of the indexed percept fields, in key order
+    FIELD_DOMAINS = (
+        ("cell_content", (0, 1, 2)),
+        ("goal_visible", (False, True)),
+        ("goal_direction", (None, "up", "down", "left", "right")),
+        ("up", (0, 1, 2)),
+        ("down", (0, 1, 2)),
+        ("left", (0, 1, 2)),
+        ("right", (0, 1, 2)),
+    )
+    FIELDS = tuple(name for name, _ in FIELD_DOMAINS)
+
+    # Entry kinds in the compiled table
+    _CONSTANT = 0
+    _FIELD = 1
+    _CHOICE = 2
+    _CALL = 3
+
+    def __init__(self):
+        """
+        Initialize an empty table.
+        """
+        self.rules: List[Tuple[Dict[str, frozenset], Any]] = []
+        self._table = None  # Compiled entries indexed by percept key, or None if stale
+        self._cell_index = {value: i for i, value in enumerate(self.FIELD_DOMAINS[0][1])}
+        self._direction_index = {value: i for i, value in enumerate(self.FIELD_DOMAINS[2][1])}
+
+    def add_rule(self, conditions: Dict[str, Any], action: Any) -> None:
+        """
+        Append a declarative rule to the table.
+
+        Args:
+            conditions: Maps percept field names to a required value or a
+                collection of allowed values; an empty dict always matches
+            action: The action to perform when the conditions hold
+        """
+        normalized = {}
+        for field, allowed in conditions.items():
+            if field not in self.FIELDS:
+                raise ValueError(f"unsupported rule field: {field}")
+            if not isinstance(allowed, (tuple, list, set, frozenset)):
+                allowed = (allowed,)
+            normalized[field] = frozenset(allowed)
+        self.rules.append((normalized, action))
+        self._table = None
+
+    def compile(self) -> None:
+        """
+        Build the lookup table over every combination of field values.
+        """
+        domains = [values for _, values in self.FIELD_DOMAINS]
+        table = []
+        for values in product(*domains):
+            fields = dict(zip(self.FIELDS, values))
+            table.append(self._entry_for(fields))
+        self._table = table
+
+    def lookup(self, percept: Dict) -> Any:
+        """
+        Find the action for a percept.
+
+        Args:
+            percept: A GridWorld percept dictionary
+
+        Returns:
+            The resolved action, or NO_MATCH if no rule applies
+        """
+        if self._table is None:
+            self.compile()
+        key = self._key(percept)
+        if key is None:
+            return self._lookup_slow(percept)
+        return self._resolve(self._table[key], percept)
+
+    def lookup_batch(self, percepts: Iterable[Dict]) -> List[Any]:
+        """
+        Find the actions for many percepts at once.
+
+        Args:
+            percepts: GridWorld percept dictionaries
+
+        Returns:
+            A list of resolved actions (NO_MATCH where no rule applies),
+            in the same order as the percepts
+        """
+        if self._table is None:
+            self.compile()
+        table = self._table
+        key_of = self._key
+        resolve = self._resolve
+        actions = []
+        for percept in percepts:
+            key = key_of(percept)
+            if key is None:
+                actions.append(self._lookup_slow(percept))
+            else:
+                actions.append(resolve(table[key], percept))
+        return actions
+
+    def _key(self, percept: Dict) -> Any:
+        """
+        Encode the indexed fields of a percept as a table index.
+
+        Returns:
+            The table index, or None if a field is missing or out of domain
+        """
+        try:
+            cell_index = self._cell_index
+            adjacents = percept["adjacents"]
+            key = cell_index[percept["cell_content"]] * 2 + (1 if percept["goal_visible"] else 0)
+            key = key * 5 + self._direction_index[percept["goal_direction"]]
+            key = key * 3 + cell_index[adjacents["up"]]
+            key = key * 3 + cell_index[adjacents["down"]]
+            key = key * 3 + cell_index[adjacents["left"]]
+            return key * 3 + cell_index[adjacents["right"]]
+        except (KeyError, TypeError):
+            return None
+
+    def _entry_for(self, fields: Dict[str, Any]) -> Any:
+        """
+        Compile the first matching rule for a combination of field values.
+        """
+        for conditions, action in self.rules:
+            if all(fields[field] in allowed for field, allowed in conditions.items()):
+                if action is RANDOM_OPEN_DIRECTION:
+                    open_directions = tuple(d for d in self.DIRECTIONS if fields[d] != 1)  # Not an obstacle
+                    return (self._CHOICE, open_directions)
+                if isinstance(action, PerceptField):
+                    return (self._FIELD, action.name)
+                if callable(action):
+                    return (self._CALL, action)
+                return (self._CONSTANT, action)
+        return None
+
+    def _resolve(self, entry: Any, percept: Dict) -> Any:
+        """
+        Turn a compiled entry into a concrete action for a percept.
+        """
+        if entry is None:
+            return NO_MATCH
+        kind, payload = entry
+        if kind == self._CONSTANT:
+            return payload
+        if kind == self._FIELD:
+            return percept.get(payload)
+        if kind == self._CHOICE:
+            return random.choice(payload) if payload else None
+        return payload(percept)
+
+    def _lookup_slow(self, percept: Dict) -> Any:
+        """
+        Check the rules in order for a percept that cannot be indexed.
+        """
+        if percept is None:
+            return NO_MATCH
+        adjacents = percept.get("adjacents") or {}
+        fields = {field: percept.get(field) for field in self.FIELDS[:3]}
+        for direction in self.DIRECTIONS:
+            fields[direction] = adjacents.get(direction)
+
+        for conditions, action in self.rules:
+            if all(fields[field] in allowed for field, allowed in conditions.items()):
+                if action is RANDOM_OPEN_DIRECTION:
+                    open_directions = [d for d, content in adjacents.items() if content != 1]
+                    return random.choice(open_directions) if open_directions else None
+                if isinstance(action, PerceptField):
+                    return percept.get(action.name)
+                if callable(action):
+                    return action(percept)
+                return action
+        return NO_MATCH
+
+    def __len__(self) -> int:
+        return len(self.rules)
@@ -2,7 +2,7 @@
 Environment for agents to operate within
 """
 from abc import ABC, abstractmethod
-from typing import Any, List
+from typing import Any, Dict, List
 
 
 class Environment(ABC):
@@ -72,9 +72,16 @@ class Environment(ABC):
             percept = self.get_percept(agent)
             agent.perceive(percept)
         
-        # Then, agents decide and act
+        # Then, agents decide and act. Agents whose class can decide for many
+        # agents at once (such as reflex agents sharing a rule table) decide
+        # together before anyone moves; their decisions depend only on the
+        # percepts gathered above, so the result is the same.
+        decisions = self._batch_decisions()
         for agent in self.agents:
-            action = agent.decide()
+            if id(agent) in decisions:
+                action = decisions[id(agent)]
+            else:
+                action = agent.decide()
             agent.act()
             self.apply_action(agent, action)
         
@@ -82,6 +89,25 @@ class Environment(ABC):
         self.update()
         self.time_step += 1
         
+    def _batch_decisions(self) -> Dict[int, Any]:
+        """
+        Decide for each class of agents that offers a decide_batch method.
+        
+        Returns:
+            The chosen actions keyed by id(agent); agents whose class has no
+            decide_batch, or that are the only agent of their class, are left out
+        """
+        groups = {}
+        for agent in self.agents:
+            groups.setdefault(type(agent), []).append(agent)
+            
+        decisions = {}
+        for agent_class, agents in groups.items():
+            decide_batch = getattr(agent_class, "decide_batch", None)
+            if decide_batch is not None and len(agents) > 1:
+                decisions.update(zip(map(id, agents), decide_batch(agents)))
+        return decisions
+        
     def run(self, steps: int) -> None:
         """
         Run the environment for a specified number of steps.
@@ -0,0 +1,106 @@
+"""
+Free Cell Index - constant-time random sampling of empty grid cells
+"""
+from array import array
+from typing import Iterator, Tuple
+import random
+
+
+class FreeCellIndex:
+    """
+    An indexed set of grid positions supporting O(1) add, discard,
+    membership and uniform random sampling.
+
+    Positions are packed as ``y * width + x`` into a flat array of members,
+    with a second array mapping each cell to its slot in the member array
+    (or -1). Removal swaps the last member into the freed slot, so the
+    member array stays dense and can be sampled by index.
+    """
+
+    def __init__(self, width: int, height: int):
+        """
+        Initialize an empty index for a grid.
+
+        Args:
+            width: The width of the grid
+            height: The height of the grid
+        """
+        self.width = width
+        self.height = height
+        typecode = 'i' if width * height < 2 ** 31 else 'q'
+        self._members = array(typecode)
+        self._slots = array(typecode, [-1]) * (width * height)
+
+    def add(self, position: Tuple[int, int]) -> None:
+        """
+        Add a position to the index.
+
+        Args:
+            position: The (x, y) position to add
+        """
+        key = position[1] * self.width + position[0]
+        if self._slots[key] >= 0:
+            return
+        self._slots[key] = len(self._members)
+        self._members.append(key)
+
+    def discard(self, position: Tuple[int, int]) -> None:
+        """
+        Remove a position from the index if it is present.
+
+        Args:
+            position: The (x, y) position to remove
+        """
+        key = position[1] * self.width + position[0]
+        slot = self._slots[key]
+        if slot < 0:
+            return
+        last = self._members.pop()
+        if slot < len(self._members):
+            # Move the last member into the freed slot
+            self._members[slot] = last
+            self._slots[last] = slot
+        self._slots[key] = -1
+
+    def copy(self) -> "FreeCellIndex":
+        """
+        Create an independent index with the same members, in the same order.
+
+        Returns:
+            The new index
+        """
+        index = FreeCellIndex.__new__(FreeCellIndex)
+        index.width = self.width
+        index.height = self.height
+        index._members = array(self._members.typecode, self._members)
+        index._slots = array(self._slots.typecode, self._slots)
+        return index
+
+    def sample(self) -> Tuple[int, int]:
+        """
+        Choose a uniformly random position from the index.
+
+        Returns:
+            An (x, y) position
+
+        Raises:
+            IndexError: If the index is empty
+        """
+        if not self._members:
+            raise IndexError("no free cells to sample from")
+        key = self._members[random.randrange(len(self._members))]
+        return key % self.width, key // self.width
+
+    def __contains__(self, position: Tuple[int, int]) -> bool:
+        x, y = position
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return False
+        return self._slots[y * self.width + x] >= 0
+
+    def __len__(self) -> int:
+        return len(self._members)
+
+    def __iter__(self) -> Iterator[Tuple[int, int]]:
+        width = self.width
+        for key in self._members:
+            yield key % width, key // width
@@ -0,0 +1,115 @@
+"""
+Frontier - the boundary between known and unknown cells of a world model
+"""
+from collections import deque
+from typing import List, Optional, Set, Tuple
+
+from world_model import WorldModel
+
+
+class FrontierTracker:
+    """
+    Tracks the frontier of a world model: the known, non-obstacle cells
+    with at least one unknown neighbour.
+
+    The tracker listens to the world model, and each changed cell only
+    re-checks itself and its four neighbours, so keeping the frontier up to
+    date costs O(1) per learned cell. Exploring means walking to the
+    nearest frontier cell, which ``plan_to_nearest`` finds with a single
+    breadth-first search that stops at the first frontier (or goal) cell it
+    reaches.
+    """
+
+    def __init__(self, world_model: WorldModel):
+        """
+        Initialize the tracker from the model's known cells and start listening.
+
+        Args:
+            world_model: The model whose frontier to track
+        """
+        self.world_model = world_model
+        self.cells: Set[Tuple[int, int]] = set()
+        self.target: Optional[Tuple[int, int]] = None  # The cell the last exploration plan leads to
+        self._exhausted = False  # No target was reachable and nothing has changed since
+        for position, _ in world_model.known_cells():
+            self._update(position)
+        world_model.listeners.append(self.cell_changed)
+
+    def cell_changed(self, position: Tuple[int, int]) -> None:
+        """
+        Re-check a changed cell and its neighbours.
+
+        Args:
+            position: The (x, y) position whose content changed
+        """
+        self._exhausted = False
+        x, y = position
+        for cell in (position, (x, y-1), (x, y+1), (x-1, y), (x+1, y)):
+            self._update(cell)
+
+    def _update(self, cell: Tuple[int, int]) -> None:
+        get = self.world_model.get
+        content = get(cell)
+        x, y = cell
+        if content is not None and content != 1 and (
+                get((x, y-1)) is None or get((x, y+1)) is None or get((x-1, y)) is None or get((x+1, y)) is None):
+            self.cells.add(cell)
+        else:
+            self.cells.discard(cell)
+
+    def is_target(self, cell: Optional[Tuple[int, int]]) -> bool:
+        """
+        Check whether a cell is still worth exploring towards.
+
+        Args:
+            cell: The (x, y) position, or None
+
+        Returns:
+            True if the cell is on the frontier or is a known goal
+        """
+        return cell in self.cells or (cell is not None and self.world_model.get(cell) == 2)
+
+    def plan_to_nearest(self, start: Tuple[int, int]) -> List[str]:
+        """
+        Plan the shortest path through known open cells to the nearest
+        frontier cell or known goal, and remember it as the target.
+
+        Args:
+            start: The agent's position
+
+        Returns:
+            A list of actions, empty if no frontier cell is reachable
+        """
+        self.target = None
+        if self._exhausted:
+            return []
+        get = self.world_model.get
+        came_from = {start: None}
+        queue = deque([start])
+        while queue:
+            current = queue.popleft()
+            if current != start and self.is_target(current):
+                self.target = current
+                break
+            x, y = current
+            for neighbor in ((x, y-1), (x, y+1), (x-1, y), (x+1, y)):
+                if neighbor not in came_from:
+                    content = get(neighbor)
+                    if content is not None and content != 1:
+                        came_from[neighbor] = current
+                        queue.append(neighbor)
+        if self.target is None:
+            self._exhausted = True
+            return []
+
+        actions = []
+        current = self.target
+        while came_from[current] is not None:
+            (x, y), (px, py) = current, came_from[current]
+            if x != px:
+                actions.append("right" if x > px else "left")
+            else:
+                actions.append("down" if y > py else "up")
+            current = (px, py)
+        actions.reverse()
+        return actions
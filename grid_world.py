@@ -1,10 +1,17 @@
 """
 Grid Environment - a 2D grid world for agents to navigate
 """
-from typing import Any, Dict, List, Tuple
+from array import array
+from collections import deque
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Set, Tuple
+import copy
+import heapq
 import random
 
 from environment import Environment
+from chunked_grid import ChunkedGrid
+from free_cell_index import FreeCellIndex
+from moving_obstacle import MovingObstacle
 
 
 class GridWorld(Environment):
@@ -24,7 +31,14 @@ class GridWorld(Environment):
     LEFT = "left"
     RIGHT = "right"
     
-    def __init__(self, width: int = 10, height: int = 10, name: str = "GridWorld"):
+    # Next-step direction codes used by the distance field; 0 means no move
+    DIRECTION_CODES = (None, UP, DOWN, LEFT, RIGHT)
+    
+    # Random placement attempts on sparse grids before falling back to a tile scan
+    SPARSE_SAMPLE_ATTEMPTS = 64
+    
+    def __init__(self, width: int = 10, height: int = 10, name: str = "GridWorld",
+                 sparse: bool = False, chunk_size: int = 64, cache_percepts: bool = False):
         """
         Initialize the environment.
         
@@ -32,13 +46,36 @@ class GridWorld(Environment):
             width: The width of the grid
             height: The height of the grid
             name: A name for the environment
+            sparse: Store the grid in lazily allocated tiles instead of a dense
+                list of lists, for very large mostly-open maps
+            chunk_size: The tile side length used when sparse is True
+            cache_percepts: Keep a per-cell table of percepts so that
+                get_percept is a table read on static grids
         """
         super().__init__(name)
         self.width = width
         self.height = height
-        self.grid = [[self.EMPTY for _ in range(width)] for _ in range(height)]
+        if sparse:
+            self.grid = ChunkedGrid(width, height, chunk_size)
+        else:
+            self.grid = [[self.EMPTY for _ in range(width)] for _ in range(height)]
         self.agent_positions = {}  # Maps agents to their positions
+        self.position_agents: Dict[Tuple[int, int], List[Any]] = {}  # Maps positions to agents there
+        self.crowded_positions: Set[Tuple[int, int]] = set()  # Positions holding more than one agent
         self.goal_positions = []
+        self._free_cells = None  # FreeCellIndex of empty cells, built on first random placement
+        self.cache_percepts = cache_percepts
+        self._percept_table: Dict[Tuple[int, int], Dict] = {}  # Maps positions to cached percepts
+        self._distance_field = None  # (distances, next-step codes) from the goals, built on demand
+        self.moving_obstacles: List[MovingObstacle] = []
+        self.last_changes: FrozenSet[Tuple[int, int]] = frozenset()  # Cells changed on the last tick
+        self._pending_changes: Set[Tuple[int, int]] = set()  # Cells changed since the last tick
+        self._subscribers: List[Callable[[int, FrozenSet[Tuple[int, int]]], None]] = []
+        self._updating = False
+        self._initial_positions: Dict[Any, Tuple[int, int]] = {}  # Restored by reset
+        self._initial_performance: Dict[Any, float] = {}
+        self._shared_rows: Set[int] = set()  # Dense grid rows shared with a clone, copied on write
+        self._shared: Set[str] = set()  # Cached structures shared with a clone, copied on write
         
     def add_agent(self, agent: Any, position: Tuple[int, int] = None) -> None:
         """
@@ -52,11 +89,96 @@ class GridWorld(Environment):
         
         # Place the agent at a random empty position if none specified
         if position is None:
-            empty_positions = [(x, y) for x in range(self.width) for y in range(self.height) 
-                              if self.grid[y][x] == self.EMPTY]
-            position = random.choice(empty_positions)
+            position = self.random_empty_position()
             
         self.agent_positions[agent] = position
+        self._place_agent(agent, position)
+        self._initial_positions[agent] = position
+        self._initial_performance[agent] = agent.performance_measure
+        
+        # Agents that keep derived state about the grid hear about changes
+        if hasattr(agent, "on_grid_change"):
+            self.subscribe(agent.on_grid_change)
+        
+    def random_empty_position(self) -> Tuple[int, int]:
+        """
+        Choose a uniformly random empty cell.
+        
+        Dense grids keep an index of empty cells, so each sample is O(1).
+        Sparse grids first try rejection sampling, which is O(1) on mostly
+        open maps, and if that keeps failing count the empty cells tile by
+        tile; a cell index for a sparse grid would take memory proportional
+        to width * height and undo the point of storing it sparsely.
+        
+        Returns:
+            The (x, y) position of an empty cell
+        """
+        if isinstance(self.grid, ChunkedGrid):
+            for _ in range(self.SPARSE_SAMPLE_ATTEMPTS):
+                x = random.randrange(self.width)
+                y = random.randrange(self.height)
+                if self.grid.get(x, y) == self.EMPTY:
+                    return (x, y)
+            return self.grid.random_empty_cell()
+                    
+        if self._free_cells is None:
+            self._free_cells = FreeCellIndex(self.width, self.height)
+            for y in range(self.height):
+                row = self.grid[y]
+                for x in range(self.width):
+                    if row[x] == self.EMPTY:
+                        self._free_cells.add((x, y))
+                        
+        return self._free_cells.sample()
+        
+    def agents_at(self, position: Tuple[int, int]) -> List[Any]:
+        """
+        Get the agents currently at a position.
+        
+        Args:
+            position: The (x, y) position to look up
+            
+        Returns:
+            A list of agents at the position (empty if none)
+        """
+        return list(self.position_agents.get(position, ()))
+        
+    def is_occupied(self, position: Tuple[int, int]) -> bool:
+        """
+        Check whether any agent is at a position.
+        
+        Args:
+            position: The (x, y) position to check
+            
+        Returns:
+            True if at least one agent is at the position
+        """
+        return position in self.position_agents
+        
+    def collisions(self) -> Dict[Tuple[int, int], List[Any]]:
+        """
+        Get all positions shared by more than one agent.
+        
+        Returns:
+            A dictionary mapping each crowded position to the agents there
+        """
+        return {pos: list(self.position_agents[pos]) for pos in self.crowded_positions}
+        
+    def _place_agent(self, agent: Any, position: Tuple[int, int]) -> None:
+        """Record an agent at a position in the spatial hash."""
+        occupants = self.position_agents.setdefault(position, [])
+        occupants.append(agent)
+        if len(occupants) > 1:
+            self.crowded_positions.add(position)
+            
+    def _remove_agent_from(self, agent: Any, position: Tuple[int, int]) -> None:
+        """Remove an agent from a position in the spatial hash."""
+        occupants = self.position_agents[position]
+        occupants.remove(agent)
+        if not occupants:
+            del self.position_agents[position]
+        if len(occupants) < 2:
+            self.crowded_positions.discard(position)
         
     def add_obstacle(self, position: Tuple[int, int]) -> None:
         """
@@ -67,7 +189,26 @@ class GridWorld(Environment):
         """
         x, y = position
         if 0 <= x < self.width and 0 <= y < self.height:
-            self.grid[y][x] = self.OBSTACLE
+            self._set_cell(x, y, self.OBSTACLE)
+            if self._free_cells is not None:
+                self._unshare("_free_cells")
+                self._free_cells.discard(position)
+            self._cell_changed(position)
+                
+    def remove_obstacle(self, position: Tuple[int, int]) -> None:
+        """
+        Remove an obstacle from the grid, leaving the cell empty.
+        
+        Args:
+            position: The (x, y) position to clear
+        """
+        x, y = position
+        if 0 <= x < self.width and 0 <= y < self.height and self.grid[y][x] == self.OBSTACLE:
+            self._set_cell(x, y, self.EMPTY)
+            if self._free_cells is not None:
+                self._unshare("_free_cells")
+                self._free_cells.add(position)
+            self._cell_changed(position)
             
     def add_goal(self, position: Tuple[int, int]) -> None:
         """
@@ -78,8 +219,331 @@ class GridWorld(Environment):
         """
         x, y = position
         if 0 <= x < self.width and 0 <= y < self.height:
-            self.grid[y][x] = self.GOAL
+            self._set_cell(x, y, self.GOAL)
             self.goal_positions.append(position)
+            if self._free_cells is not None:
+                self._unshare("_free_cells")
+                self._free_cells.discard(position)
+            self._cell_changed(position, goal_changed=True)
+            
+    def _set_cell(self, x: int, y: int, value: int) -> None:
+        """Write a grid cell, first copying its row if it is shared with a clone."""
+        if y in self._shared_rows:
+            self.grid[y] = list(self.grid[y])
+            self._shared_rows.discard(y)
+        self.grid[y][x] = value
+        
+    def _unshare(self, name: str) -> None:
+        """Copy a cached structure this environment shares with a clone before changing it."""
+        if name not in self._shared:
+            return
+        self._shared.discard(name)
+        value = getattr(self, name)
+        if name == "_distance_field":
+            distances, next_steps = value
+            value = (array(distances.typecode, distances), bytearray(next_steps))
+        else:
+            value = value.copy()
+        setattr(self, name, value)
+        
+    def reset(self) -> None:
+        """
+        Return the world to the start of an episode.
+        
+        Agents go back to the positions they were added at with the
+        performance they had then, moving obstacles go back to the start of
+        their paths, and the time step goes back to 0. The maze itself is
+        kept, so this costs O(agents + moving obstacles). Agents' own
+        memories are left alone.
+        """
+        moved = [obstacle for obstacle in self.moving_obstacles if obstacle.index != 0]
+        for obstacle in moved:
+            self.remove_obstacle(obstacle.position)
+        for obstacle in moved:
+            obstacle.index = 0
+            self.add_obstacle(obstacle.position)
+            
+        for agent, position in self._initial_positions.items():
+            current = self.agent_positions[agent]
+            if current != position:
+                self._remove_agent_from(agent, current)
+                self._place_agent(agent, position)
+                self.agent_positions[agent] = position
+            agent.performance_measure = self._initial_performance[agent]
+        self.time_step = 0
+        self.last_changes = frozenset()
+        
+    def clone(self) -> "GridWorld":
+        """
+        Copy the world without its agents, for parallel rollouts.
+        
+        The clone shares the grid and the cached percepts, distance field
+        and free-cell index with this world; each side copies a grid row
+        (or tile) or cache the first time it changes it, so cloning a maze
+        costs O(height) rather than O(width * height). Moving obstacles are
+        copied at their current positions, and the clone starts at the
+        current time step with no agents or subscribers.
+        
+        Returns:
+            The new environment
+        """
+        clone = copy.copy(self)
+        clone.agents = []
+        clone.agent_positions = {}
+        clone.position_agents = {}
+        clone.crowded_positions = set()
+        clone._initial_positions = {}
+        clone._initial_performance = {}
+        clone._subscribers = []
+        clone._pending_changes = set()
+        clone.last_changes = frozenset()
+        clone.goal_positions = list(self.goal_positions)
+        clone.moving_obstacles = [copy.copy(obstacle) for obstacle in self.moving_obstacles]
+        
+        if isinstance(self.grid, ChunkedGrid):
+            clone.grid = self.grid.copy()
+        else:
+            clone.grid = list(self.grid)
+            self._shared_rows = set(range(self.height))
+            clone._shared_rows = set(self._shared_rows)
+        shared = {name for name in ("_percept_table", "_distance_field", "_free_cells")
+                  if getattr(self, name) is not None}
+        self._shared |= shared
+        clone._shared = set(shared)
+        return clone
+            
+    def precompute_percepts(self) -> None:
+        """
+        Fill the percept table for every non-obstacle cell.
+        
+        This is optional; with cache_percepts enabled, cells are also added
+        to the table the first time an agent perceives from them.
+        """
+        self.cache_percepts = True
+        self._unshare("_percept_table")
+        for y in range(self.height):
+            for x in range(self.width):
+                if (x, y) not in self._percept_table and self.grid[y][x] != self.OBSTACLE:
+                    self._percept_table[(x, y)] = self._compute_percept(x, y)
+                    
+    def distance_field(self) -> Tuple[array, bytearray]:
+        """
+        Get the shortest-path distance field from all goals.
+        
+        The field is computed by a multi-source breadth-first search from
+        every goal and cached until the grid changes. Cells are indexed as
+        ``y * width + x``.
+        
+        Returns:
+            A tuple of (distances, next steps): the number of moves from each
+            cell to the nearest goal (-1 if unreachable), and for each cell an
+            index into DIRECTION_CODES of the first move on an optimal path
+        """
+        if self._distance_field is None:
+            self._distance_field = self._compute_distance_field()
+        return self._distance_field
+        
+    def optimal_distance(self, position: Tuple[int, int]) -> Optional[int]:
+        """
+        Get the length of the shortest path from a cell to the nearest goal.
+        
+        Args:
+            position: The (x, y) position to start from
+            
+        Returns:
+            The number of moves, or None if no goal can be reached
+        """
+        x, y = position
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return None
+        distance = self.distance_field()[0][y * self.width + x]
+        return distance if distance >= 0 else None
+        
+    def optimal_action(self, position: Tuple[int, int]) -> Optional[str]:
+        """
+        Get the first move of a shortest path from a cell to the nearest goal.
+        
+        Args:
+            position: The (x, y) position to start from
+            
+        Returns:
+            The action to take, or None at a goal or if no goal can be reached
+        """
+        x, y = position
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return None
+        return self.DIRECTION_CODES[self.distance_field()[1][y * self.width + x]]
+        
+    def distance_heuristic(self) -> Callable[[Tuple[int, int], Tuple[int, int]], float]:
+        """
+        Get an A* heuristic backed by the distance field.
+        
+        The true distance to the nearest goal never exceeds the distance to
+        any particular goal, so the heuristic is admissible when the agent
+        knows the whole map. On a partly known map it is not:
+        ModelBasedAgent assumes unverified cells along the goal direction are
+        empty, so its planned paths can be shorter than the true distance.
+        
+        Returns:
+            A function (position, goal) -> estimated remaining moves
+        """
+        def heuristic(a: Tuple[int, int], b: Tuple[int, int]) -> float:
+            distance = self.optimal_distance(a)
+            return float('inf') if distance is None else distance
+        return heuristic
+        
+    def _compute_distance_field(self) -> Tuple[array, bytearray]:
+        """
+        Run a multi-source breadth-first search from every goal.
+        """
+        width, height = self.width, self.height
+        grid = self.grid
+        distances = array('i', [-1]) * (width * height)
+        next_steps = bytearray(width * height)
+        queue = deque()
+        
+        for gx, gy in self.goal_positions:
+            index = gy * width + gx
+            if grid[gy][gx] == self.GOAL and distances[index] < 0:
+                distances[index] = 0
+                queue.append(index)
+                
+        up, down, left, right = 1, 2, 3, 4  # Indices into DIRECTION_CODES
+        while queue:
+            index = queue.popleft()
+            x, y = index % width, index // width
+            distance = distances[index] + 1
+            
+            # Each neighbour's first move is back toward this cell
+            for nx, ny, move in ((x, y-1, down), (x, y+1, up), (x-1, y, right), (x+1, y, left)):
+                if 0 <= nx < width and 0 <= ny < height:
+                    neighbor = ny * width + nx
+                    if distances[neighbor] < 0 and grid[ny][nx] != self.OBSTACLE:
+                        distances[neighbor] = distance
+                        next_steps[neighbor] = move
+                        queue.append(neighbor)
+                        
+        return distances, next_steps
+        
+    def _cell_changed(self, position: Tuple[int, int], goal_changed: bool = False) -> None:
+        """
+        Invalidate cached data derived from the grid after a cell changes.
+        
+        Args:
+            position: The (x, y) position that changed
+            goal_changed: Whether the change added or removed a goal
+        """
+        self._invalidate_percepts(position, goal_changed)
+        if self._distance_field is not None:
+            self._unshare("_distance_field")
+            self._repair_distance_field(position)
+        if self.time_step > 0 or self._updating:
+            self._pending_changes.add(position)
+            
+    def _repair_distance_field(self, position: Tuple[int, int]) -> None:
+        """
+        Update the cached distance field for a change to one cell.
+        
+        Opening a cell (or adding a goal) can only shorten paths, so the new
+        distances spread outward from that cell. Blocking a cell can only
+        lengthen paths for the cells whose optimal route went through it;
+        those are found by following next-step links backwards, cleared,
+        and refilled from their unaffected neighbours. Either way the work
+        is proportional to the number of cells whose distance changes.
+        """
+        distances, next_steps = self._distance_field
+        width, height = self.width, self.height
+        grid = self.grid
+        x, y = position
+        index = y * width + x
+        up, down, left, right = 1, 2, 3, 4  # Indices into DIRECTION_CODES
+        
+        def neighbours(cx: int, cy: int):
+            # (neighbour x, neighbour y, neighbour's move back to (cx, cy))
+            for nx, ny, move in ((cx, cy-1, down), (cx, cy+1, up), (cx-1, cy, right), (cx+1, cy, left)):
+                if 0 <= nx < width and 0 <= ny < height:
+                    yield nx, ny, move
+                    
+        content = grid[y][x]
+        if content == self.OBSTACLE:
+            # Collect the cells whose shortest path runs through this one
+            affected = [index]
+            seen = {index}
+            queue = deque([(x, y)])
+            while queue:
+                cx, cy = queue.popleft()
+                for nx, ny, move in neighbours(cx, cy):
+                    neighbour = ny * width + nx
+                    if neighbour not in seen and next_steps[neighbour] == move:
+                        seen.add(neighbour)
+                        affected.append(neighbour)
+                        queue.append((nx, ny))
+            for cell in affected:
+                distances[cell] = -1
+                next_steps[cell] = 0
+                
+            # Reseed each affected cell from its best unaffected neighbour
+            heap = []
+            for cell in affected[1:]:
+                cx, cy = cell % width, cell // width
+                for nx, ny, move in neighbours(cx, cy):
+                    distance = distances[ny * width + nx]
+                    if distance >= 0:
+                        # Moving from (cx, cy) to the neighbour is the reverse of `move`
+                        heapq.heappush(heap, (distance + 1, cell, self._reverse_move(move)))
+        else:
+            heap = []
+            if content == self.GOAL:
+                heap.append((0, index, 0))
+            else:
+                for nx, ny, move in neighbours(x, y):
+                    distance = distances[ny * width + nx]
+                    if distance >= 0 and grid[ny][nx] != self.OBSTACLE:
+                        heapq.heappush(heap, (distance + 1, index, self._reverse_move(move)))
+                        
+        # Propagate improved distances outward
+        while heap:
+            distance, cell, move = heapq.heappop(heap)
+            if 0 <= distances[cell] <= distance:
+                continue
+            distances[cell] = distance
+            next_steps[cell] = move
+            cx, cy = cell % width, cell // width
+            for nx, ny, back in neighbours(cx, cy):
+                neighbour = ny * width + nx
+                current = distances[neighbour]
+                if (current < 0 or current > distance + 1) and grid[ny][nx] != self.OBSTACLE:
+                    heapq.heappush(heap, (distance + 1, neighbour, back))
+                    
+    @staticmethod
+    def _reverse_move(move: int) -> int:
+        """Reverse a direction code (up <-> down, left <-> right)."""
+        return (0, 2, 1, 4, 3)[move]
+        
+    def _invalidate_percepts(self, position: Tuple[int, int], goal_changed: bool = False) -> None:
+        """
+        Drop cached percepts affected by a change to one cell.
+        
+        A cell's contents appear in its own percept and its neighbours'
+        adjacents. Goals are visible along their whole row and column, so
+        adding one also invalidates those.
+        
+        Args:
+            position: The (x, y) position that changed
+            goal_changed: Whether the change added or removed a goal
+        """
+        if not self._percept_table:
+            return
+        self._unshare("_percept_table")
+        x, y = position
+        table = self._percept_table
+        if goal_changed:
+            for cx in range(self.width):
+                table.pop((cx, y), None)
+            for cy in range(self.height):
+                table.pop((x, cy), None)
+        for cell in ((x, y), (x, y-1), (x, y+1), (x-1, y), (x+1, y)):
+            table.pop(cell, None)
             
     def get_percept(self, agent: Any) -> Dict:
         """
@@ -90,17 +554,40 @@ class GridWorld(Environment):
         - What's in the adjacent cells (up, down, left, right)
         - Whether a goal is visible
         
+        With cache_percepts enabled, the returned dictionary is shared by
+        every agent perceiving from the same cell and must not be modified.
+        
         Args:
             agent: The agent for which to generate a percept
             
         Returns:
             A dictionary containing the percept
         """
-        if agent not in self.agent_positions:
+        position = self.agent_positions.get(agent)
+        if position is None:
             return None
             
-        x, y = self.agent_positions[agent]
+        if self.cache_percepts:
+            percept = self._percept_table.get(position)
+            if percept is None:
+                percept = self._compute_percept(*position)
+                self._unshare("_percept_table")
+                self._percept_table[position] = percept
+            return percept
+            
+        return self._compute_percept(*position)
+        
+    def _compute_percept(self, x: int, y: int) -> Dict:
+        """
+        Build the percept seen from a cell.
         
+        Args:
+            x: The column of the cell
+            y: The row of the cell
+            
+        Returns:
+            A dictionary containing the percept
+        """
         # Get contents of adjacent cells
         adjacents = {
             self.UP: self.OBSTACLE if y == 0 else self.grid[y-1][x],
@@ -160,20 +647,81 @@ class GridWorld(Environment):
         # Check if new position is valid (not an obstacle)
         if self.grid[new_y][new_x] != self.OBSTACLE:
             self.agent_positions[agent] = (new_x, new_y)
+            if (new_x, new_y) != (x, y):
+                self._remove_agent_from(agent, (x, y))
+                self._place_agent(agent, (new_x, new_y))
             
             # Update performance if agent reached a goal
             if self.grid[new_y][new_x] == self.GOAL:
                 agent.update_performance(10)  # Reward for reaching goal
                 
+    def add_moving_obstacle(self, path: List[Tuple[int, int]], period: int = 1) -> MovingObstacle:
+        """
+        Add an obstacle that moves along a cyclic path as the world ticks.
+        
+        Args:
+            path: The positions the obstacle visits, in order
+            period: The number of ticks between moves
+            
+        Returns:
+            The new moving obstacle
+        """
+        obstacle = MovingObstacle(path, period)
+        self.add_obstacle(obstacle.position)
+        self.moving_obstacles.append(obstacle)
+        return obstacle
+        
+    def subscribe(self, callback: Callable[[int, FrozenSet[Tuple[int, int]]], None]) -> None:
+        """
+        Register a callback for grid change events.
+        
+        After each tick that changed the grid, the callback is called with
+        the time step and the set of (x, y) cells whose contents changed.
+        Changes made before the first step (while building the world) are
+        not reported.
+        
+        Args:
+            callback: A function (time_step, changed_cells) -> None
+        """
+        if callback not in self._subscribers:
+            self._subscribers.append(callback)
+            
+    def unsubscribe(self, callback: Callable[[int, FrozenSet[Tuple[int, int]]], None]) -> None:
+        """
+        Remove a callback registered with subscribe.
+        
+        Args:
+            callback: The callback to remove
+        """
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+            
     def update(self) -> None:
         """
         Update the environment's state.
         
-        This could include things like moving dynamic obstacles, 
-        changing goal locations, etc.
+        Moves any moving obstacles that are due, then publishes the cells
+        that changed since the last tick to subscribers.
         """
-        # For now, the environment is static
-        pass
+        self._updating = True
+        for obstacle in self.moving_obstacles:
+            if not obstacle.is_due(self.time_step):
+                continue
+            nx, ny = obstacle.next_position
+            # Wait rather than move onto an agent, a goal or another obstacle
+            if (self.grid[ny][nx] != self.EMPTY or self.is_occupied((nx, ny))):
+                continue
+            self.remove_obstacle(obstacle.position)
+            obstacle.advance()
+            self.add_obstacle(obstacle.position)
+        self._updating = False
+        
+        changes = frozenset(self._pending_changes)
+        self._pending_changes.clear()
+        self.last_changes = changes
+        if changes:
+            for callback in list(self._subscribers):
+                callback(self.time_step, changes)
         
     def display(self) -> None:
         """
@@ -0,0 +1,302 @@
+"""
+Hierarchical Planner - HPA* path planning over an agent's world model
+"""
+from collections import deque
+from typing import Dict, Iterator, List, Set, Tuple
+import heapq
+
+from world_model import WorldModel
+
+
+class HierarchicalPlanner:
+    """
+    Near-optimal path planning for large maps using HPA*.
+
+    The world is divided into square clusters. Wherever two neighbouring
+    clusters share a run of open cells along their border, one entrance is
+    placed in the middle of the run (or one at each end of a wide run), and
+    the distances between the entrances of each cluster are precomputed. A
+    route is first found in this much smaller graph of entrances and then
+    refined into moves one segment at a time, so each decision only
+    searches inside a single cluster.
+
+    The planner watches the world model: every cell whose content changes
+    marks its cluster dirty, and dirty clusters are rebuilt before the next
+    plan. As with the flat A* planner, only known, non-obstacle cells are
+    passable.
+    """
+
+    # Runs of open border cells at least this long get an entrance at each end
+    WIDE_ENTRANCE = 6
+
+    def __init__(self, world_model: WorldModel, cluster_size: int = 16):
+        """
+        Initialize the planner and start watching a world model.
+
+        Args:
+            world_model: The model to plan over
+            cluster_size: The side length of each square cluster
+        """
+        if cluster_size < 2:
+            raise ValueError("cluster_size must be at least 2")
+        self.world_model = world_model
+        self.cluster_size = cluster_size
+        # Maps borders ("v" or "h", cluster x, cluster y) to their (inside, outside) entrance pairs
+        self._transitions: Dict[Tuple[str, int, int], List[Tuple[Tuple[int, int], Tuple[int, int]]]] = {}
+        self._partners: Dict[Tuple[int, int], Set[Tuple[int, int]]] = {}  # Entrance -> entrances across a border
+        # Maps clusters to entrance -> entrance -> distance within the cluster
+        self._intra: Dict[Tuple[int, int], Dict[Tuple[int, int], Dict[Tuple[int, int], int]]] = {}
+        self._dirty: Set[Tuple[int, int]] = set()  # Clusters to rebuild before the next plan
+        self._route: List[Tuple[int, int]] = []  # Abstract nodes still to reach, ending with the goal
+        self._route_goal = None
+        self._route_position = None  # Where the agent should be when it asks for the next segment
+        self._route_clusters: Set[Tuple[int, int]] = set()
+        world_model.listeners.append(self.cell_changed)
+        # Cells known before the planner started watching are built on the first plan
+        for position, _ in world_model.known_cells():
+            self.cell_changed(position)
+
+    def cell_changed(self, position: Tuple[int, int]) -> None:
+        """
+        Mark the cluster containing a changed cell for rebuilding.
+
+        Args:
+            position: The (x, y) position whose content changed
+        """
+        self._dirty.add(self._cluster_of(position))
+
+    def next_segment(self, start: Tuple[int, int], goal: Tuple[int, int]) -> List[str]:
+        """
+        Plan the moves to the next node of the route to a goal.
+
+        The route through the entrance graph is kept between calls and only
+        searched again when the goal changes, the agent leaves the route, or
+        a cluster on the route is rebuilt.
+
+        Args:
+            start: The agent's position
+            goal: The goal position
+
+        Returns:
+            A list of actions, empty if the goal cannot be reached
+        """
+        changed = self._refresh()
+        if (goal != self._route_goal or start != self._route_position or not self._route
+                or changed & self._route_clusters):
+            self._route = self._search(start, goal)
+            self._route_goal = goal
+            self._route_clusters = {self._cluster_of(node) for node in self._route}
+            self._route_clusters.add(self._cluster_of(start))
+        if not self._route:
+            return []
+        target = self._route.pop(0)
+        self._route_position = target
+        actions = self._refine(start, target)
+        if not actions:
+            self._route = []
+        return actions
+
+    def _cluster_of(self, position: Tuple[int, int]) -> Tuple[int, int]:
+        return position[0] // self.cluster_size, position[1] // self.cluster_size
+
+    def _open(self, position: Tuple[int, int]) -> bool:
+        content = self.world_model.get(position)
+        return content is not None and content != 1  # Known and not an obstacle
+
+    def _borders(self, cluster: Tuple[int, int]) -> Iterator[Tuple[Tuple[str, int, int], Tuple[int, int]]]:
+        """Yield each border of a cluster with the cluster on its other side."""
+        cx, cy = cluster
+        yield ("v", cx - 1, cy), (cx - 1, cy)
+        yield ("v", cx, cy), (cx + 1, cy)
+        yield ("h", cx, cy - 1), (cx, cy - 1)
+        yield ("h", cx, cy), (cx, cy + 1)
+
+    def _refresh(self) -> Set[Tuple[int, int]]:
+        """
+        Rebuild the entrances and distances of dirty clusters.
+
+        Returns:
+            The clusters whose part of the entrance graph was rebuilt
+        """
+        if not self._dirty:
+            return set()
+        changed = set(self._dirty)
+        for cluster in self._dirty:
+            for key, other in self._borders(cluster):
+                transitions = self._find_transitions(key)
+                if transitions != self._transitions.get(key, []):
+                    self._set_transitions(key, transitions)
+                    changed.add(other)
+        self._dirty.clear()
+        for cluster in changed:
+            self._build_intra(cluster)
+        return changed
+
+    def _find_transitions(self, key: Tuple[str, int, int]) -> List[Tuple[Tuple[int, int], Tuple[int, int]]]:
+        """Place entrances on the runs of open cell pairs along a border."""
+        kind, cx, cy = key
+        size = self.cluster_size
+        if kind == "v":
+            x = cx * size + size - 1
+            pairs = [((x, y), (x + 1, y)) for y in range(cy * size, cy * size + size)]
+        else:
+            y = cy * size + size - 1
+            pairs = [((x, y), (x, y + 1)) for x in range(cx * size, cx * size + size)]
+
+        transitions = []
+        run = []
+        for pair in pairs + [None]:
+            if pair is not None and self._open(pair[0]) and self._open(pair[1]):
+                run.append(pair)
+                continue
+            if len(run) >= self.WIDE_ENTRANCE:
+                transitions.extend((run[0], run[-1]))
+            elif run:
+                transitions.append(run[len(run) // 2])
+            run = []
+        return transitions
+
+    def _set_transitions(self, key: Tuple[str, int, int],
+                         transitions: List[Tuple[Tuple[int, int], Tuple[int, int]]]) -> None:
+        for a, b in self._transitions.pop(key, ()):
+            for node, partner in ((a, b), (b, a)):
+                partners = self._partners.get(node)
+                if partners is not None:
+                    partners.discard(partner)
+                    if not partners:
+                        del self._partners[node]
+        if transitions:
+            self._transitions[key] = transitions
+        for a, b in transitions:
+            self._partners.setdefault(a, set()).add(b)
+            self._partners.setdefault(b, set()).add(a)
+
+    def _entrances(self, cluster: Tuple[int, int]) -> Set[Tuple[int, int]]:
+        entrances = set()
+        for key, _ in self._borders(cluster):
+            for a, b in self._transitions.get(key, ()):
+                entrances.add(a if self._cluster_of(a) == cluster else b)
+        return entrances
+
+    def _build_intra(self, cluster: Tuple[int, int]) -> None:
+        """Compute the distances between a cluster's entrances inside the cluster."""
+        entrances = self._entrances(cluster)
+        table = {}
+        for entrance in entrances:
+            distances = self._cluster_distances(entrance)
+            table[entrance] = {other: distances[other] for other in entrances
+                               if other != entrance and other in distances}
+        if table:
+            self._intra[cluster] = table
+        else:
+            self._intra.pop(cluster, None)
+
+    def _cluster_distances(self, origin: Tuple[int, int]) -> Dict[Tuple[int, int], int]:
+        """Breadth-first distances from a cell to the open cells of its cluster."""
+        size = self.cluster_size
+        cx, cy = self._cluster_of(origin)
+        min_x, min_y = cx * size, cy * size
+        max_x, max_y = min_x + size, min_y + size
+        distances = {origin: 0}
+        queue = deque([origin])
+        while queue:
+            current = queue.popleft()
+            x, y = current
+            distance = distances[current] + 1
+            for neighbor in ((x, y-1), (x, y+1), (x-1, y), (x+1, y)):
+                if (neighbor not in distances and min_x <= neighbor[0] < max_x
+                        and min_y <= neighbor[1] < max_y and self._open(neighbor)):
+                    distances[neighbor] = distance
+                    queue.append(neighbor)
+        return distances
+
+    def _search(self, start: Tuple[int, int], goal: Tuple[int, int]) -> List[Tuple[int, int]]:
+        """
+        Find a route through the entrance graph with A*.
+
+        The start and goal are joined to the entrances of their clusters
+        for this search only.
+
+        Returns:
+            The nodes to visit after the start, ending with the goal, or an
+            empty list if there is no route
+        """
+        if not self._open(start) or not self._open(goal):
+            return []
+        start_cluster = self._cluster_of(start)
+        goal_cluster = self._cluster_of(goal)
+        start_distances = self._cluster_distances(start)
+        start_edges = {entrance: start_distances[entrance]
+                       for entrance in self._entrances(start_cluster) if entrance in start_distances}
+        if goal in start_distances:
+            start_edges[goal] = start_distances[goal]
+        goal_distances = self._cluster_distances(goal)
+        goal_edges = {entrance: goal_distances[entrance]
+                      for entrance in self._entrances(goal_cluster) if entrance in goal_distances}
+
+        def neighbors(node: Tuple[int, int]) -> Iterator[Tuple[Tuple[int, int], int]]:
+            if node == start:
+                yield from start_edges.items()
+            else:
+                yield from self._intra.get(self._cluster_of(node), {}).get(node, {}).items()
+                if node in goal_edges:
+                    yield goal, goal_edges[node]
+            for partner in self._partners.get(node, ()):
+                yield partner, 1
+
+        gx, gy = goal
+        g_score = {start: 0}
+        came_from = {}
+        heap = [(abs(start[0] - gx) + abs(start[1] - gy), 0, start)]
+        while heap:
+            _, cost, node = heapq.heappop(heap)
+            if node == goal:
+                route = []
+                while node != start:
+                    route.append(node)
+                    node = came_from[node]
+                route.reverse()
+                return route
+            if cost > g_score[node]:
+                continue  # Stale heap entry
+            for neighbor, step in neighbors(node):
+                tentative = cost + step
+                if tentative < g_score.get(neighbor, float('inf')):
+                    g_score[neighbor] = tentative
+                    came_from[neighbor] = node
+                    estimate = tentative + abs(neighbor[0] - gx) + abs(neighbor[1] - gy)
+                    heapq.heappush(heap, (estimate, tentative, neighbor))
+        return []
+
+    def _refine(self, start: Tuple[int, int], target: Tuple[int, int]) -> List[str]:
+        """
+        Turn one route segment into moves.
+
+        Returns:
+            The actions from start to target, empty if the segment is blocked
+        """
+        if self._cluster_of(start) != self._cluster_of(target):
+            # Crossing a border between two paired entrances
+            return [self._direction(start, target)] if target in self._partners.get(start, ()) else []
+        distances = self._cluster_distances(target)
+        if start not in distances:
+            return []
+        actions = []
+        position = start
+        while position != target:
+            x, y = position
+            for neighbor in ((x, y-1), (x, y+1), (x-1, y), (x+1, y)):
+                if distances.get(neighbor) == distances[position] - 1:
+                    actions.append(self._direction(position, neighbor))
+                    position = neighbor
+                    break
+        return actions
+
+    @staticmethod
+    def _direction(a: Tuple[int, int], b: Tuple[int, int]) -> str:
+        """The action that moves from a cell to an adjacent one."""
+        if b[0] > a[0]:
+            return "right"
+        if b[0] < a[0]:
+            return "left"
+        return "down" if b[1] > a[1] else "up"
@@ -0,0 +1,121 @@
+"""
+Jump Point Search - A* with symmetry pruning on 4-connected uniform-cost grids
+"""
+from typing import Callable, Dict, List, Optional, Tuple
+import heapq
+
+from world_model import WorldModel
+
+
+def jump_point_search(model: WorldModel, start: Tuple[int, int], goal: Tuple[int, int],
+                      heuristic: Optional[Callable[[Tuple[int, int], Tuple[int, int]], float]] = None
+                      ) -> Tuple[List[str], int]:
+    """
+    Find a shortest path through the known open cells of a world model.
+
+    Among the many equal-cost paths of an open grid, only canonical ones
+    are searched: paths run horizontally until a wall ends or begins beside
+    them (a forced turn) or they line up with the goal, and vertical runs
+    stop wherever a horizontal run from them would. The search jumps along
+    these runs without putting the cells in between on the open list, so
+    it expands far fewer nodes than A* on open maps while returning paths
+    of the same length.
+
+    Unknown cells are treated as blocked, as in ModelBasedAgent.plan_path.
+
+    Args:
+        model: The world model to search
+        start: The start position
+        goal: The goal position
+        heuristic: An admissible estimate (position, goal) -> cost; defaults
+            to Manhattan distance
+
+    Returns:
+        A tuple of (actions from start to goal, nodes expanded); the action
+        list is empty if there is no path
+    """
+    get = model.get
+
+    def is_open(x: int, y: int) -> bool:
+        content = get((x, y))
+        return content is not None and content != 1  # Known and not an obstacle
+
+    def jump_horizontal(x: int, y: int, dx: int) -> Optional[Tuple[int, int]]:
+        while True:
+            x += dx
+            if not is_open(x, y):
+                return None
+            if (x, y) == goal:
+                return x, y
+            # A wall ending above or below forces a vertical turn here
+            if (is_open(x, y-1) and not is_open(x-dx, y-1)) or (is_open(x, y+1) and not is_open(x-dx, y+1)):
+                return x, y
+
+    def jump_vertical(x: int, y: int, dy: int) -> Optional[Tuple[int, int]]:
+        while True:
+            y += dy
+            if not is_open(x, y):
+                return None
+            if (x, y) == goal or jump_horizontal(x, y, 1) or jump_horizontal(x, y, -1):
+                return x, y
+
+    if heuristic is None:
+        def heuristic(a: Tuple[int, int], b: Tuple[int, int]) -> float:
+            return abs(a[0] - b[0]) + abs(a[1] - b[1])
+
+    if not is_open(*start) or not is_open(*goal):
+        return [], 0
+
+    g_score: Dict[Tuple[int, int], int] = {start: 0}
+    came_from: Dict[Tuple[int, int], Tuple[int, int]] = {}
+    heap = [(heuristic(start, goal), 0, start)]
+    expanded = 0
+    while heap:
+        _, cost, node = heapq.heappop(heap)
+        if cost > g_score[node]:
+            continue  # Stale heap entry
+        if node == goal:
+            return _actions(node, came_from), expanded
+        expanded += 1
+
+        x, y = node
+        parent = came_from.get(node)
+        if parent is None:
+            directions = ((1, 0), (-1, 0), (0, 1), (0, -1))
+        elif parent[1] == y:
+            # Arrived horizontally: keep going, and turn only where forced
+            dx = 1 if x > parent[0] else -1
+            directions = [(dx, 0)]
+            for dy in (-1, 1):
+                if is_open(x, y+dy) and not is_open(x-dx, y+dy):
+                    directions.append((0, dy))
+        else:
+            # Arrived vertically: keep going or branch sideways
+            dy = 1 if y > parent[1] else -1
+            directions = ((0, dy), (1, 0), (-1, 0))
+
+        for dx, dy in directions:
+            successor = jump_horizontal(x, y, dx) if dy == 0 else jump_vertical(x, y, dy)
+            if successor is None:
+                continue
+            tentative = cost + abs(successor[0] - x) + abs(successor[1] - y)
+            if tentative < g_score.get(successor, float('inf')):
+                g_score[successor] = tentative
+                came_from[successor] = node
+                heapq.heappush(heap, (tentative + heuristic(successor, goal), tentative, successor))
+    return [], expanded
+
+
+def _actions(node: Tuple[int, int], came_from: Dict[Tuple[int, int], Tuple[int, int]]) -> List[str]:
+    """Expand the straight runs between jump points into single moves."""
+    actions = []
+    while node in came_from:
+        parent = came_from[node]
+        if node[0] != parent[0]:
+            action = "right" if node[0] > parent[0] else "left"
+        else:
+            action = "down" if node[1] > parent[1] else "up"
+        actions.extend([action] * (abs(node[0] - parent[0]) + abs(node[1] - parent[1])))
+        node = parent
+    actions.reverse()
+    return actions
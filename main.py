@@ -5,10 +5,11 @@ import random
 import time
 from collections import deque
 
-from reflex_agent import SimpleReflexAgent
+from reflex_agent import default_explorer
 from model_agent import ModelBasedAgent
 from utility_agent import UtilityBasedAgent
 from grid_world import GridWorld
+from terminal_renderer import TerminalRenderer
 
 
 def is_path_valid(grid, start, goal):
@@ -188,59 +189,31 @@ def run_reflex_agent():
     # Create a maze with random obstacles, guaranteed to be solvable
     create_solvable_random_maze(env, obstacle_count=10)
     
-    # Create a simple reflex agent
-    agent = SimpleReflexAgent("Explorer")
-    
-    # Define condition-action rules for the agent
-    
-    # Rule 1: If at the goal, stay there
-    def at_goal(percept):
-        return percept["cell_content"] == GridWorld.GOAL
-    agent.add_rule(at_goal, None)  # No movement needed
-    
-    # Rule 2: If a goal is visible, move toward it
-    def goal_visible(percept):
-        return percept["goal_visible"]
-    agent.add_rule(goal_visible, lambda percept: percept["goal_direction"])
-    
-    # Rule 3: If obstacle ahead, try to go around it
-    def obstacle_ahead(percept):
-        pos_x, pos_y = percept["position"]
-        # Look for open directions, prioritizing the one that moves toward goal
-        open_directions = [d for d, content in percept["adjacents"].items() 
-                          if content != GridWorld.OBSTACLE]
-        if open_directions:
-            return True
-        return False
-    
-    # This is a more complex rule that chooses a random open direction
-    def choose_open_direction(percept):
-        open_directions = [d for d, content in percept["adjacents"].items() 
-                         if content != GridWorld.OBSTACLE]
-        if open_directions:
-            return random.choice(open_directions)
-        return None  # No open directions (shouldn't happen in our grid)
-    
-    agent.add_rule(obstacle_ahead, choose_open_direction)
+    # Create a simple reflex agent that stops on the goal, heads for a visible
+    # goal and otherwise picks a random open direction
+    agent = default_explorer("Explorer")
     
     # Add the agent to the environment
     env.add_agent(agent, (1, 1))
     
-    # Run the simulation
-    print("Starting simulation...")
-    env.display()
+    # Run the simulation, redrawing only the cells that change each step
+    renderer = TerminalRenderer(env)
+    renderer.render()
+    goal_step = None
     
     for step in range(20):  # Run for 20 steps
-        print(f"\nStep {step+1}")
         env.step()
-        env.display()
+        renderer.render()
         time.sleep(0.5)  # Pause to make it easier to follow
         
         # Check if agent reached the goal
         if env.agent_positions[agent] == (env.width - 2, env.height - 2):
-            print(f"Goal reached in {step+1} steps!")
+            goal_step = step + 1
             break
     
+    renderer.close()
+    if goal_step:
+        print(f"Goal reached in {goal_step} steps!")
     print(f"Simulation ended. Agent performance: {agent.performance_measure}")
 
 
@@ -260,29 +233,32 @@ def run_model_agent():
     # Add the agent to the environment
     env.add_agent(agent, (1, 1))
     
-    # Run the simulation
-    print("Starting simulation with model-based agent...")
-    env.display()
+    # Run the simulation, redrawing only the cells that change each step
+    renderer = TerminalRenderer(env)
+    renderer.render()
+    goal_step = None
     
     for step in range(50):  # Run for 50 steps
-        print(f"\nStep {step+1}")
         env.step()
-        env.display()
         
-        # Print agent's internal model
-        print(f"Agent's current model contains {len(agent.model)} known cells")
+        # Show the agent's internal model under the grid
+        notes = [f"Agent's current model contains {len(agent.model)} known cells"]
         if agent.goal_position:
-            print(f"Agent knows goal is at: {agent.goal_position}")
+            notes.append(f"Agent knows goal is at: {agent.goal_position}")
         if agent.plan:
-            print(f"Agent's plan: {agent.plan}")
+            notes.append(f"Agent's plan: {agent.plan}")
+        renderer.render(notes=notes)
         
         time.sleep(0.5)  # Pause to make it easier to follow
         
         # Check if agent reached the goal
         if env.agent_positions[agent] == (env.width - 2, env.height - 2):
-            print(f"Goal reached in {step+1} steps!")
+            goal_step = step + 1
             break
     
+    renderer.close()
+    if goal_step:
+        print(f"Goal reached in {goal_step} steps!")
     print(f"Simulation ended. Agent performance: {agent.performance_measure}")
 
 
@@ -302,29 +278,64 @@ def run_utility_agent():
     # Add the agent to the environment
     env.add_agent(agent, (1, 1))
     
-    # Run the simulation
-    print("Starting simulation with utility-based agent...")
-    env.display()
+    # Run the simulation, redrawing only the cells that change each step
+    renderer = TerminalRenderer(env)
+    renderer.render()
+    goal_step = None
     
     for step in range(50):  # Run for 50 steps
-        print(f"\nStep {step+1}")
         env.step()
-        env.display()
         
-        # Print agent's internal state
-        print(f"Agent's current model contains {len(agent.model)} known cells")
-        print(f"Agent's exploration rate: {agent.exploration_rate}")
+        # Show the agent's internal state under the grid
+        renderer.render(notes=[
+            f"Agent's current model contains {len(agent.model)} known cells",
+            f"Agent's exploration rate: {agent.exploration_rate}",
+        ])
         
         time.sleep(0.5)  # Pause to make it easier to follow
         
         # Check if agent reached the goal
         if env.agent_positions[agent] == (env.width - 2, env.height - 2):
-            print(f"Goal reached in {step+1} steps!")
+            goal_step = step + 1
             break
     
+    renderer.close()
+    if goal_step:
+        print(f"Goal reached in {goal_step} steps!")
     print(f"Simulation ended. Agent performance: {agent.performance_measure}")
 
 
+def run_large_world_demo():
+    """Run a reflex agent swarm on a large grid with the incremental terminal renderer"""
+    print("\n=== Large World Swarm Demo ===\n")
+    
+    # Create a large grid environment with scattered obstacles
+    env = GridWorld(width=200, height=100, name="Large Swarm World", cache_percepts=True)
+    for _ in range(3000):
+        env.add_obstacle((random.randrange(env.width), random.randrange(env.height)))
+    env.add_goal((env.width - 2, env.height - 2))
+    
+    # Create a swarm of reflex agents sharing one set of declarative rules
+    leader = default_explorer("Leader")
+    env.add_agent(leader)
+    for i in range(199):
+        env.add_agent(default_explorer(f"Explorer {i}", leader.decision_table))
+        
+    # Render a viewport that follows the leader, capped at 30 frames per second,
+    # so the simulation runs as fast as it can regardless of terminal speed
+    renderer = TerminalRenderer(env, viewport=(60, 25), follow=leader, max_fps=30)
+    start = time.time()
+    for step in range(3000):
+        env.step()
+        renderer.render()
+    renderer.render(force=True)
+    renderer.close()
+    
+    elapsed = time.time() - start
+    print(f"Ran 3000 steps in {elapsed:.1f}s, drew {renderer.frames_drawn} frames "
+          f"and skipped {renderer.frames_skipped}")
+
+
 def main():
     """Main function to run demonstrations of different agent types"""
     while True:
@@ -332,9 +343,10 @@ def main():
         print("1. Run Simple Reflex Agent")
         print("2. Run Model-Based Agent")
         print("3. Run Utility-Based Agent")
-        print("4. Exit")
+        print("4. Run Large World Swarm")
+        print("5. Exit")
         
-        choice = input("\nEnter your choice (1-4): ")
+        choice = input("\nEnter your choice (1-5): ")
         
         if choice == "1":
             run_reflex_agent()
@@ -343,6 +355,8 @@ def main():
         elif choice == "3":
             run_utility_agent()
         elif choice == "4":
+            run_large_world_demo()
+        elif choice == "5":
             print("Exiting...")
             break
         else:
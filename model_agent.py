@@ -1,10 +1,14 @@
 """
 Model-Based Agent implementation
 """
-from typing import Any, Dict, List, Tuple
+from typing import Any, Callable, Dict, FrozenSet, List, Tuple
 import random
 
 from agent import Agent
+from frontier import FrontierTracker
+from hierarchical_planner import HierarchicalPlanner
+from jump_point_search import jump_point_search
+from world_model import WorldModel
 
 
 class ModelBasedAgent(Agent):
@@ -13,21 +17,46 @@ class ModelBasedAgent(Agent):
     of the environment and plans actions based on this model.
     """
     
-    def __init__(self, name: str = "ModelBasedAgent"):
+    PLANNERS = ("astar", "jps", "hierarchical")
+    
+    def __init__(self, name: str = "ModelBasedAgent",
+                 heuristic: Callable[[Tuple[int, int], Tuple[int, int]], float] = None,
+                 planner: str = "astar", cluster_size: int = 16, frontier_exploration: bool = False):
         """
         Initialize the agent.
         
         Args:
             name: A name for the agent
+            heuristic: An admissible A* heuristic (position, goal) -> cost, such as
+                GridWorld.distance_heuristic() on a fully known map; defaults to
+                Manhattan distance
+            planner: "astar" for flat A* over the whole model, "jps" for Jump
+                Point Search (same paths as A* with far fewer expansions on
+                open maps), or "hierarchical" for HPA*, which plans over
+                clusters of cluster_size cells and returns one segment of the
+                route at a time; the heuristic is not used by "hierarchical"
+            cluster_size: The cluster side length for the hierarchical planner
+            frontier_exploration: While the goal is unknown, walk to the nearest
+                frontier cell (a known open cell next to unknown ones) instead
+                of taking the first open direction
         """
+        if planner not in self.PLANNERS:
+            raise ValueError(f"unknown planner: {planner!r}")
         super().__init__(name)
         self.percept = None
-        self.model = {}  # Internal model of the world
+        self.world_model = WorldModel()  # Compact internal model of the world
+        self.model = self.world_model.cells  # Dict-style view: position -> cell content
         self.position = None
         self.goal_position = None
         self.plan = []  # Sequence of actions to execute
         self.current_action = None
-        self.visit_counts = {}  # For visualization
+        self.visit_counts = self.world_model.visits  # For visualization
+        self.heuristic = heuristic
+        self.planner = planner
+        self.nodes_expanded = 0  # Nodes expanded by the last A* or JPS plan
+        self.frontier = FrontierTracker(self.world_model) if frontier_exploration else None
+        self.exploring = False  # Whether the current plan leads to a frontier cell
+        self.hierarchy = HierarchicalPlanner(self.world_model, cluster_size) if planner == "hierarchical" else None
         
     def perceive(self, percept: Any) -> None:
         """
@@ -43,7 +72,11 @@ class ModelBasedAgent(Agent):
             self.position = percept["position"]
             
             # Track visit count for visualization
-            self.visit_counts[self.position] = self.visit_counts.get(self.position, 0) + 1
+            self.world_model.visit(self.position)
+            
+            # Frontier exploration needs the agent's own cell to be known too
+            if self.frontier is not None and "cell_content" in percept:
+                self.model[self.position] = percept["cell_content"]
             
         if "cell_content" in percept and percept["cell_content"] == 2:  # GOAL
             self.goal_position = self.position
@@ -80,10 +113,45 @@ class ModelBasedAgent(Agent):
                 for px in range(x+1, 100):  # Using a reasonable upper limit
                     self.model.setdefault((px, y), 0)
                     
+    def on_grid_change(self, time_step: int, changed_cells: FrozenSet[Tuple[int, int]]) -> None:
+        """
+        Forget changed cells and drop the plan if it crosses one.
+        
+        Only the changed cells are forgotten; they are re-learned from
+        percepts. The plan is kept unless its remaining path runs through
+        a changed cell.
+        
+        Args:
+            time_step: The environment time step of the change
+            changed_cells: The (x, y) cells whose contents changed
+        """
+        for pos in changed_cells:
+            if pos in self.model:
+                del self.model[pos]
+                
+        if self.plan and self.position:
+            x, y = self.position
+            for action in self.plan:
+                if action == "up":
+                    y -= 1
+                elif action == "down":
+                    y += 1
+                elif action == "left":
+                    x -= 1
+                elif action == "right":
+                    x += 1
+                if (x, y) in changed_cells:
+                    self.plan = []
+                    break
+                    
     def plan_path(self) -> List[str]:
         """
         Plan a path to the goal using A* algorithm.
         
+        With the hierarchical planner, only the actions for the next segment
+        of the route are returned; decide asks for the next one when they
+        run out.
+        
         Returns:
             A list of actions (directions) to reach the goal
         """
@@ -91,7 +159,15 @@ class ModelBasedAgent(Agent):
         if not self.position or not self.goal_position:
             return []
             
+        if self.hierarchy is not None:
+            return self.hierarchy.next_segment(self.position, self.goal_position)
+        if self.planner == "jps":
+            path, self.nodes_expanded = jump_point_search(self.world_model, self.position,
+                                                          self.goal_position, self._heuristic)
+            return path
+            
         # A* search
+        self.nodes_expanded = 0
         open_set = {self.position}  # Start with current position
         closed_set = set()
         
@@ -124,6 +200,7 @@ class ModelBasedAgent(Agent):
                 
             open_set.remove(current)
             closed_set.add(current)
+            self.nodes_expanded += 1
             
             # Check each neighbor
             x, y = current
@@ -154,15 +231,19 @@ class ModelBasedAgent(Agent):
         
     def _heuristic(self, a: Tuple[int, int], b: Tuple[int, int]) -> float:
         """
-        Calculate Manhattan distance between two points.
+        Estimate the cost between two points.
+        
+        Uses the agent's heuristic if one was given, otherwise Manhattan distance.
         
         Args:
             a: First point (x, y)
             b: Second point (x, y)
             
         Returns:
-            The Manhattan distance between the points
+            The estimated cost between the points
         """
+        if self.heuristic is not None:
+            return self.heuristic(a, b)
         return abs(a[0] - b[0]) + abs(a[1] - b[1])
         
     def decide(self) -> Any:
@@ -177,9 +258,23 @@ class ModelBasedAgent(Agent):
             self.current_action = None
             return None
             
+        # Drop a plan that now runs into a known obstacle, or that leads to a
+        # frontier cell explored in the meantime
+        if self.plan:
+            x, y = self.position
+            dx, dy = {"up": (0, -1), "down": (0, 1), "left": (-1, 0), "right": (1, 0)}[self.plan[0]]
+            if self.model.get((x + dx, y + dy)) == 1 or (self.exploring and not self.frontier.is_target(self.frontier.target)):
+                self.plan = []
+                
         # If we don't have a plan or our current plan is empty, create a new one
         if not self.plan:
             self.plan = self.plan_path()
+            self.exploring = False
+            
+        # Without a route to the goal, head for the nearest unexplored area
+        if not self.plan and self.frontier is not None:
+            self.plan = self.frontier.plan_to_nearest(self.position)
+            self.exploring = bool(self.plan)
             
         # If we still don't have a plan, move randomly to explore
         if not self.plan:
@@ -0,0 +1,59 @@
+"""
+Moving Obstacle - an obstacle that follows a fixed schedule through a grid
+"""
+from typing import List, Tuple
+
+
+class MovingObstacle:
+    """
+    An obstacle that steps through a cyclic path of grid positions,
+    advancing one position every ``period`` environment ticks.
+
+    To move back and forth, list the return positions in the path too,
+    e.g. ``[(3, 1), (3, 2), (3, 3), (3, 2)]``.
+    """
+
+    def __init__(self, path: List[Tuple[int, int]], period: int = 1):
+        """
+        Initialize the obstacle at the start of its path.
+
+        Args:
+            path: The positions to visit, in order; each must be adjacent to
+                the previous one for the obstacle to appear to move
+            period: The number of ticks between moves
+        """
+        if not path:
+            raise ValueError("a moving obstacle needs at least one position")
+        if period < 1:
+            raise ValueError("period must be at least 1")
+        self.path = list(path)
+        self.period = period
+        self.index = 0
+
+    @property
+    def position(self) -> Tuple[int, int]:
+        """The obstacle's current position."""
+        return self.path[self.index]
+
+    @property
+    def next_position(self) -> Tuple[int, int]:
+        """The position the obstacle will move to next."""
+        return self.path[(self.index + 1) % len(self.path)]
+
+    def is_due(self, time_step: int) -> bool:
+        """
+        Check whether the obstacle should move on this tick.
+
+        Args:
+            time_step: The environment's current time step
+
+        Returns:
+            True if the obstacle moves this tick
+        """
+        return (time_step + 1) % self.period == 0
+
+    def advance(self) -> None:
+        """
+        Move to the next position in the path.
+        """
+        self.index = (self.index + 1) % len(self.path)
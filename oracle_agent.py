@@ -0,0 +1,59 @@
+"""
+Oracle Agent implementation
+"""
+from typing import Any
+
+from agent import Agent
+
+
+class OracleAgent(Agent):
+    """
+    An agent with full knowledge of a GridWorld that always takes a move on
+    a shortest path to the nearest goal.
+
+    It reads the environment's cached distance field directly, so it is not
+    a realistic agent; it serves as the optimal baseline when scoring other
+    agents.
+    """
+
+    def __init__(self, env: Any, name: str = "OracleAgent"):
+        """
+        Initialize the agent.
+
+        Args:
+            env: The GridWorld the agent will be placed in
+            name: A name for the agent
+        """
+        super().__init__(name)
+        self.env = env
+        self.position = None
+        self.current_action = None
+
+    def perceive(self, percept: Any) -> None:
+        """
+        Process a percept from the environment.
+
+        Args:
+            percept: The percept received from the environment
+        """
+        if percept and "position" in percept:
+            self.position = percept["position"]
+
+    def decide(self) -> Any:
+        """
+        Decide on the optimal action for the current position.
+
+        Returns:
+            An action to be performed, or None at a goal
+        """
+        self.current_action = self.env.optimal_action(self.position) if self.position else None
+        return self.current_action
+
+    def act(self) -> Any:
+        """
+        Execute the decided action.
+
+        Returns:
+            The action performed
+        """
+        return self.current_action
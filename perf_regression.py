@@ -0,0 +1,425 @@
+"""
+Performance Regression - benchmark history keyed by git commit, with noise-aware comparison
+"""
+from contextlib import contextmanager
+from functools import partial
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from grid_world import GridWorld
+from reflex_agent import default_explorer
+from model_agent import ModelBasedAgent
+from utility_agent import UtilityBasedAgent
+from q_learning_agent import QLearningAgent
+from simulation_store import SQLiteStore
+from main import create_structured_maze
+
+
+AGENT_TYPES = ("reflex", "model", "utility", "qlearning")
+PLANNERS = ("astar", "jps")
+
+# The history lives beside this module and is not checked in
+DEFAULT_HISTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".perf_history.json")
+
+# Slowdowns below this fraction are never reported, however quiet the runs were
+MIN_THRESHOLD = 0.05
+# Slowdowns must also exceed this many times the runs' relative spread
+NOISE_FACTOR = 3.0
+
+SEED = 0
+STEPS_PER_SAMPLE = 2000
+MAZE_SIZE = (40, 20)
+MAZES_PER_SAMPLE = 5
+PLANNER_MAP_SIZE = 80
+PLANNER_OBSTACLE_RATE = 0.25
+REQUESTS_PER_SAMPLE = 50
+
+
+def _make_agent(agent_type: str) -> Any:
+    """Create an agent configured as the web app configures it."""
+    if agent_type == "reflex":
+        return default_explorer("Explorer")
+    if agent_type == "model":
+        return ModelBasedAgent("Explorer")
+    if agent_type == "utility":
+        return UtilityBasedAgent("Explorer", exploration_rate=0.2)
+    if agent_type == "qlearning":
+        return QLearningAgent("Q-Learner", learning_rate=0.2, discount_factor=0.9, exploration_rate=0.3)
+    raise ValueError(f"unknown agent type: {agent_type!r}")
+
+
+def step_rate(agent_type: str) -> float:
+    """
+    Measure Environment.step throughput with one agent in the CLI demos' maze.
+
+    The maze is the 15x8 one from main.create_structured_maze, with the
+    agent configured as the web app configures it; app.py is not imported
+    because it needs Flask. Every call replays the same seeded maze and
+    agent from scratch, so repeated samples differ only by timing noise.
+
+    Args:
+        agent_type: One of AGENT_TYPES
+
+    Returns:
+        Steps per second
+    """
+    random.seed(SEED)
+    env = GridWorld(width=15, height=8, name="Benchmark")
+    create_structured_maze(env)
+    env.add_agent(_make_agent(agent_type), (1, 1))
+    start = time.perf_counter()
+    for _ in range(STEPS_PER_SAMPLE):
+        env.step()
+    return STEPS_PER_SAMPLE / (time.perf_counter() - start)
+
+
+def maze_generation_time() -> float:
+    """
+    Measure the time to generate a structured maze.
+
+    Returns:
+        Seconds per maze
+    """
+    width, height = MAZE_SIZE
+    random.seed(SEED)
+    start = time.perf_counter()
+    for _ in range(MAZES_PER_SAMPLE):
+        create_structured_maze(GridWorld(width=width, height=height, name="Benchmark"))
+    return (time.perf_counter() - start) / MAZES_PER_SAMPLE
+
+
+def planner_expansions(planner: str) -> int:
+    """
+    Count the nodes a ModelBasedAgent planner expands across a seeded random map.
+
+    Args:
+        planner: "astar" or "jps"
+
+    Returns:
+        The number of nodes expanded
+    """
+    rng = random.Random(SEED)
+    size = PLANNER_MAP_SIZE
+    start, goal = (0, 0), (size - 1, size - 1)
+    agent = ModelBasedAgent("Benchmark", planner=planner)
+    for y in range(size):
+        for x in range(size):
+            blocked = rng.random() < PLANNER_OBSTACLE_RATE and (x, y) not in (start, goal)
+            agent.world_model.set((x, y), GridWorld.OBSTACLE if blocked else GridWorld.EMPTY)
+    agent.world_model.set(goal, GridWorld.GOAL)
+    agent.position = start
+    agent.goal_position = goal
+    agent.plan_path()
+    return agent.nodes_expanded
+
+
+@contextmanager
+def step_latency_benchmark(directory: str) -> Iterator[Optional[Callable[[], float]]]:
+    """
+    Prepare a benchmark of the web app's /step endpoint through Flask's test client.
+
+    While the context is open, the app uses a simulation store and Q-table
+    directory inside the given directory, so the benchmark leaves no state
+    behind; the app's own store and directory are put back on exit.
+
+    Args:
+        directory: A scratch directory
+
+    Yields:
+        A function measuring seconds per /step request, or None if Flask is
+        not installed
+
+    Raises:
+        RuntimeError: If a request fails, so errors are never timed as latency
+    """
+    try:
+        import flask  # noqa: F401
+    except ImportError:
+        yield None
+        return
+    import app
+
+    def post(client: Any, path: str, **kwargs: Any) -> Any:
+        response = client.post(path, **kwargs)
+        if response.status_code != 200:
+            raise RuntimeError(f"POST {path} returned {response.status_code}: "
+                               f"{response.get_data(as_text=True)[:200]}")
+        return response
+
+    def step_latency() -> float:
+        client = app.app.test_client()
+        random.seed(SEED)
+        response = post(client, "/init", json={"agent_type": "model"})
+        headers = {app.SIMULATION_HEADER: response.headers[app.SIMULATION_HEADER]}
+        start = time.perf_counter()
+        for _ in range(REQUESTS_PER_SAMPLE):
+            post(client, "/step", headers=headers)
+        return (time.perf_counter() - start) / REQUESTS_PER_SAMPLE
+
+    saved = app.store, app.Q_TABLE_DIR
+    app.store = SQLiteStore(os.path.join(directory, "simulations.db"))
+    app.Q_TABLE_DIR = os.path.join(directory, "q_tables")
+    try:
+        yield step_latency
+    finally:
+        app.store, app.Q_TABLE_DIR = saved
+
+
+def run_benchmarks(repeats: int = 7, names: Optional[List[str]] = None,
+                   log: Callable[[str], None] = lambda message: None) -> Dict[str, Dict[str, Any]]:
+    """
+    Run the benchmarks.
+
+    Samples are taken round-robin, one of each benchmark per round, so a
+    machine that slows down partway through widens every benchmark's
+    spread instead of shifting whichever ran last. Deterministic
+    benchmarks are sampled once.
+
+    Args:
+        repeats: The number of timing samples per benchmark
+        names: The benchmarks to run, or None for all of them
+        log: Called with progress messages
+
+    Returns:
+        Maps benchmark names to their samples, unit and direction
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        # name -> (sample function, unit, higher is better, deterministic)
+        benchmarks: Dict[str, Tuple[Callable[[], float], str, bool, bool]] = {}
+        for agent_type in AGENT_TYPES:
+            benchmarks[f"step_rate.{agent_type}"] = (partial(step_rate, agent_type), "steps/s", True, False)
+        benchmarks["maze_generation"] = (maze_generation_time, "s", False, False)
+        for planner in PLANNERS:
+            benchmarks[f"planner_expansions.{planner}"] = (partial(planner_expansions, planner),
+                                                           "nodes", False, True)
+        with step_latency_benchmark(directory) as step_latency:
+            if step_latency is not None:
+                benchmarks["step_latency"] = (step_latency, "s", False, False)
+            elif names is None or "step_latency" in names:
+                log("step_latency skipped: Flask is not installed")
+            if names is not None:
+                benchmarks = {name: benchmark for name, benchmark in benchmarks.items() if name in names}
+
+            samples: Dict[str, List[float]] = {name: [] for name in benchmarks}
+            for round_number in range(repeats):
+                log(f"round {round_number + 1}/{repeats}")
+                for name, (sample, _, _, deterministic) in benchmarks.items():
+                    if not (deterministic and samples[name]):
+                        samples[name].append(sample())
+    return {name: {"samples": samples[name], "unit": unit, "higher_is_better": higher_is_better}
+            for name, (_, unit, higher_is_better, _) in benchmarks.items()}
+
+
+def commit_key() -> str:
+    """
+    Identify the code being benchmarked.
+
+    Returns:
+        The HEAD commit, with "-dirty" appended if tracked files have
+        uncommitted changes, or "unknown" outside a git checkout
+    """
+    directory = os.path.dirname(os.path.abspath(__file__))
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=directory, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        status = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=directory,
+                                capture_output=True, text=True, check=True).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return f"{commit}-dirty" if status.strip() else commit
+
+
+def load_history(path: str) -> Dict[str, Dict[str, Any]]:
+    """
+    Load the benchmark history.
+
+    Args:
+        path: The history file
+
+    Returns:
+        Maps commit keys to their records, empty if the file does not exist
+    """
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def save_history(history: Dict[str, Dict[str, Any]], path: str) -> None:
+    """
+    Write the benchmark history, replacing the file atomically.
+
+    Args:
+        history: Maps commit keys to their records
+        path: The history file
+    """
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "w") as f:
+        json.dump(history, f, indent=1, sort_keys=True)
+    os.replace(temp_path, path)
+
+
+def find_baseline(history: Dict[str, Dict[str, Any]], key: str) -> Optional[str]:
+    """
+    Pick the record to compare a run against.
+
+    Args:
+        history: Maps commit keys to their records
+        key: The commit key of the new run
+
+    Returns:
+        The most recent other commit whose run was not flagged as a
+        regression, or None if there is none
+    """
+    candidates = [(record["timestamp"], other) for other, record in history.items()
+                  if other != key and not record.get("regressed")]
+    return max(candidates)[1] if candidates else None
+
+
+def _spread(samples: List[float]) -> float:
+    """The median absolute deviation of samples relative to their median."""
+    median = statistics.median(samples)
+    if len(samples) < 2 or median == 0:
+        return 0.0
+    return statistics.median(abs(sample - median) for sample in samples) / abs(median)
+
+
+def compare(baseline: Dict[str, Dict[str, Any]], current: Dict[str, Dict[str, Any]],
+            min_threshold: float = MIN_THRESHOLD) -> List[Dict[str, Any]]:
+    """
+    Compare a run's benchmarks against a baseline run.
+
+    Medians are compared, and a benchmark only counts as slower if it got
+    worse by more than both min_threshold and NOISE_FACTOR times the larger
+    relative median absolute deviation of the two runs, so a noisy machine
+    raises its own bar instead of producing false alarms.
+
+    Args:
+        baseline: The baseline run's results
+        current: The new run's results
+        min_threshold: The smallest relative slowdown that can be flagged
+
+    Returns:
+        One row per benchmark in the new run, with the baseline and new
+        medians, the relative change (positive is worse), the threshold and
+        a status of "slower", "faster", "same" or "new"
+    """
+    rows = []
+    for name, result in current.items():
+        value = statistics.median(result["samples"])
+        row = {"name": name, "unit": result["unit"], "baseline": None, "value": value,
+               "change": None, "threshold": None, "status": "new"}
+        if name in baseline:
+            base = statistics.median(baseline[name]["samples"])
+            threshold = max(min_threshold, NOISE_FACTOR * max(_spread(baseline[name]["samples"]),
+                                                              _spread(result["samples"])))
+            if base == 0:
+                change = 0.0 if value == 0 else float("inf")
+            else:
+                change = (value - base) / base
+            if result["higher_is_better"]:
+                change = -change
+            row.update(baseline=base, change=change, threshold=threshold,
+                       status="slower" if change > threshold else "faster" if change < -threshold else "same")
+        rows.append(row)
+    return rows
+
+
+def format_comparison(rows: List[Dict[str, Any]]) -> str:
+    """
+    Format a comparison as a text table.
+
+    Args:
+        rows: The output of compare
+
+    Returns:
+        A table with one row per benchmark
+    """
+    lines = [f"{'benchmark':<30}  {'baseline':>12}  {'current':>12}  {'unit':<8}  {'worse by':>8}  "
+             f"{'limit':>6}  status"]
+    for row in rows:
+        baseline = "-" if row["baseline"] is None else f"{row['baseline']:.4g}"
+        change = "-" if row["change"] is None else f"{row['change']:+.1%}"
+        threshold = "-" if row["threshold"] is None else f"{row['threshold']:.1%}"
+        lines.append(f"{row['name']:<30}  {baseline:>12}  {row['value']:>12.4g}  {row['unit']:<8}  "
+                     f"{change:>8}  {threshold:>6}  {row['status']}")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Benchmark the working tree, record the run and compare it against the baseline.
+
+    Args:
+        argv: Command-line arguments, defaulting to sys.argv[1:]
+
+    Returns:
+        The exit status: 1 if any benchmark got significantly slower, else 0
+    """
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument("--history", default=DEFAULT_HISTORY, help="benchmark history file")
+    parser.add_argument("--repeats", type=int, default=7, help="timing samples per benchmark")
+    parser.add_argument("--baseline", help="commit key to compare against (default: the latest good run)")
+    parser.add_argument("--threshold", type=float, default=MIN_THRESHOLD,
+                        help="smallest relative slowdown to flag")
+    parser.add_argument("--no-save", action="store_true", help="do not record this run")
+    args = parser.parse_args(argv)
+
+    history = load_history(args.history)
+    key = commit_key()
+    baseline_key = args.baseline or find_baseline(history, key)
+    if baseline_key is not None and baseline_key not in history:
+        parser.error(f"no recorded run for {baseline_key}")
+
+    def log(message: str) -> None:
+        print(f"  {message}", flush=True)
+
+    print(f"Benchmarking {key}")
+    results = run_benchmarks(args.repeats, log=log)
+
+    regressed = False
+    if baseline_key is None:
+        print("No baseline recorded yet; this run becomes the baseline.")
+    else:
+        baseline = history[baseline_key]["results"]
+        rows = compare(baseline, results, args.threshold)
+        slower = [row["name"] for row in rows if row["status"] == "slower"]
+        if slower:
+            # A burst of load on the machine can slow one run down; only a
+            # slowdown that survives a second round of samples counts
+            print(f"Re-measuring {', '.join(slower)}")
+            for name, result in run_benchmarks(args.repeats, slower, log).items():
+                results[name]["samples"].extend(result["samples"])
+            rows = compare(baseline, results, args.threshold)
+        print(f"\nCompared with {baseline_key}:")
+        print(format_comparison(rows))
+        slower = [row["name"] for row in rows if row["status"] == "slower"]
+        regressed = bool(slower)
+        if regressed:
+            print(f"\nSignificant slowdown: {', '.join(slower)}")
+
+    if not args.no_save:
+        history[key] = {
+            "timestamp": time.time(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "baseline": baseline_key,
+            "regressed": regressed,
+            "results": results,
+        }
+        save_history(history, args.history)
+    return 1 if regressed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
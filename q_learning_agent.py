@@ -1,20 +1,44 @@
 """
 Q-Learning Agent implementation
 """
-from typing import Any, Dict, List, Tuple
+from collections import OrderedDict
+from typing import Any, Dict, List, Set, Tuple
+import heapq
 import random
 import math
 
 from agent import Agent
+from world_model import WorldModel
 
 
 class QLearningAgent(Agent):
     """
     A reinforcement learning agent that uses Q-learning to make decisions.
+    
+    With a trace_decay (lambda) above zero the agent learns with Watkins's
+    Q(lambda): each TD error also updates recently taken state-actions,
+    weighted by how long ago they were taken, so a reward propagates back
+    along the whole recent path instead of one cell per visit. Traces are
+    sparse and bounded; only the last few state-actions are touched.
+    
+    With planning_steps above zero the agent also learns with Dyna-Q: it
+    remembers the reward and next state of every state-action it has taken
+    and, after each real step, replays that many remembered transitions as
+    extra one-step backups. Replayed transitions are sampled at random, or,
+    with prioritized_sweeping, taken in order of how much their value would
+    change, following changes back to the state-actions that lead into them.
     """
     
+    # Traces whose weight falls below this are dropped
+    MIN_TRACE = 0.01
+    
+    # Prioritized sweeping ignores value changes smaller than this
+    PRIORITY_THRESHOLD = 0.01
+    
     def __init__(self, name: str = "QLearningAgent", learning_rate: float = 0.2, 
-                 discount_factor: float = 0.9, exploration_rate: float = 0.3):
+                 discount_factor: float = 0.9, exploration_rate: float = 0.3,
+                 trace_decay: float = 0.0, max_traces: int = 64,
+                 planning_steps: int = 0, prioritized_sweeping: bool = False):
         """
         Initialize the agent.
         
@@ -23,15 +47,22 @@ class QLearningAgent(Agent):
             learning_rate: Alpha - how quickly the agent incorporates new information
             discount_factor: Gamma - how much the agent values future rewards
             exploration_rate: Epsilon - probability of choosing a random action
+            trace_decay: Lambda - how much credit earlier state-actions get; 0
+                gives plain one-step Q-learning, and anything from 0.4 to 0.95
+                learns the built-in mazes in fewer steps
+            max_traces: The most state-actions updated per step in Q(lambda) mode
+            planning_steps: Simulated backups per real step (Dyna-Q); 0 disables planning
+            prioritized_sweeping: Replay transitions by priority instead of at random
         """
         super().__init__(name)
         self.percept = None
         self.position = None
         self.last_position = None
         self.last_action = None
-        self.model = {}  # Maps positions to cell contents
+        self.world_model = WorldModel()  # Compact record of known cells and visits
+        self.model = self.world_model.cells  # Dict-style view: position -> cell content
         self.q_values = {}  # Maps (state, action) pairs to values
-        self.visit_counts = {}  # For visualization: track how often each cell is visited
+        self.visit_counts = self.world_model.visits  # For visualization: track how often each cell is visited
         
         # Learning parameters
         self.learning_rate = learning_rate
@@ -39,7 +70,26 @@ class QLearningAgent(Agent):
         self.exploration_rate = exploration_rate
         self.initial_exploration_rate = exploration_rate
         self.min_exploration_rate = 0.05
-        self.exploration_decay = 0.995  # Slower decay for better exploration
+        # Per-step decay of the exploration rate (about 0.987, the rate the
+        # agent has always used)
+        self.exploration_decay = 0.95 ** (1 / 20) * 0.9 ** (1 / 10)
+        
+        # Eligibility traces: (state, action) -> update index of its last visit, oldest first
+        self.trace_decay = trace_decay
+        self.max_traces = max_traces
+        self.traces: "OrderedDict[Tuple[Tuple[int, int], str], int]" = OrderedDict()
+        self.trace_clock = 0
+        
+        # Dyna-Q model: (state, action) -> (reward, next state), with its keys
+        # in a list for uniform sampling and reverse links for prioritized sweeping
+        self.planning_steps = planning_steps
+        self.prioritized_sweeping = prioritized_sweeping
+        self.transitions: Dict[Tuple[Tuple[int, int], str], Tuple[float, Tuple[int, int]]] = {}
+        self.transition_keys: List[Tuple[Tuple[int, int], str]] = []
+        self.predecessors: Dict[Tuple[int, int], Set[Tuple[Tuple[int, int], str]]] = {}
+        self.priority_queue: List[Tuple[float, int, Tuple[Tuple[int, int], str]]] = []
+        self.queued_priorities: Dict[Tuple[Tuple[int, int], str], float] = {}
+        self.queue_counter = 0
         
         self.current_action = None
         self.steps_taken = 0
@@ -61,7 +111,7 @@ class QLearningAgent(Agent):
             self.position = percept["position"]
             
             # Track visit count for this position (for visualization)
-            self.visit_counts[self.position] = self.visit_counts.get(self.position, 0) + 1
+            self.world_model.visit(self.position)
             
         # Update the model with cell content
         if "cell_content" in percept and self.position:
@@ -96,11 +146,20 @@ class QLearningAgent(Agent):
             # Update Q-value using the Q-learning update rule
             self.update_q_value(self.last_position, self.last_action, reward, self.position)
             
+            # Learn from remembered experience as well (Dyna-Q)
+            if self.planning_steps > 0:
+                self.remember_transition(self.last_position, self.last_action, reward, self.position)
+                self.plan()
+            
+            # Reaching the goal ends the episode, so no earlier step earns more credit
+            if self.goal_reached:
+                self.traces.clear()
+            
         # Decay exploration rate over time
         self.steps_taken += 1
         self.exploration_rate = max(
             self.min_exploration_rate,
-            self.initial_exploration_rate * (0.95 ** (self.steps_taken / 20))
+            self.initial_exploration_rate * self.exploration_decay ** self.steps_taken
         )
             
     def update_q_value(self, state: Tuple[int, int], action: str, reward: float, next_state: Tuple[int, int]) -> None:
@@ -121,6 +180,16 @@ class QLearningAgent(Agent):
         next_q_values = [self.q_values.get((next_state, a), 0.0) for a in next_actions]
         max_next_q = max(next_q_values) if next_q_values else 0.0
         
+        if self.trace_decay > 0:
+            if next_state != state:
+                self.update_traces((state, action), reward + self.discount_factor * max_next_q - current_q)
+                return
+            # Hitting an obstacle is the fault of this move alone. Spreading its
+            # penalty along the trace drags the moves that led here below the
+            # value of pacing back and forth, which then traps the greedy
+            # policy for large lambda, so back it up one step and cut the trace.
+            self.traces.clear()
+        
         # Q-learning update formula
         new_q = current_q + self.learning_rate * (
             reward + self.discount_factor * max_next_q - current_q
@@ -129,6 +198,121 @@ class QLearningAgent(Agent):
         # Update Q-value
         self.q_values[(state, action)] = new_q
         
+    def update_traces(self, state_action: Tuple[Tuple[int, int], str], td_error: float) -> None:
+        """
+        Apply a TD error to every state-action with an eligibility trace.
+        
+        The taken state-action's trace is reset to 1 (replacing traces); an
+        older trace's weight is (gamma * lambda) ** age, computed from when it
+        was last taken rather than decayed in place. Traces older than the
+        horizon where the weight drops below MIN_TRACE, or beyond max_traces,
+        are discarded.
+        
+        Args:
+            state_action: The (state, action) pair just taken
+            td_error: The TD error of the step
+        """
+        self.trace_clock += 1
+        now = self.trace_clock
+        traces = self.traces
+        traces[state_action] = now
+        traces.move_to_end(state_action)
+        
+        decay = self.discount_factor * self.trace_decay
+        horizon = self.max_traces
+        if decay <= 0:
+            horizon = 1
+        elif decay < 1:
+            horizon = min(horizon, int(math.log(self.MIN_TRACE) / math.log(decay)) + 1)
+        while len(traces) > horizon:
+            traces.popitem(last=False)
+        
+        step = self.learning_rate * td_error
+        q_values = self.q_values
+        for pair, visited in traces.items():
+            q_values[pair] = q_values.get(pair, 0.0) + step * decay ** (now - visited)
+        
+    def remember_transition(self, state: Tuple[int, int], action: str, reward: float,
+                            next_state: Tuple[int, int]) -> None:
+        """
+        Record the outcome of a real step in the Dyna-Q model.
+        
+        Args:
+            state: The previous state (position)
+            action: The action taken
+            reward: The reward received
+            next_state: The resulting state
+        """
+        key = (state, action)
+        previous = self.transitions.get(key)
+        if previous is None:
+            self.transition_keys.append(key)
+        elif previous[1] != next_state:
+            # The world changed; the old successor no longer follows this state-action
+            self.predecessors[previous[1]].discard(key)
+        self.transitions[key] = (reward, next_state)
+        self.predecessors.setdefault(next_state, set()).add(key)
+        
+        if self.prioritized_sweeping:
+            self._queue(key, abs(self._td_error(state, action, reward, next_state)))
+            
+    def plan(self) -> None:
+        """
+        Run planning_steps simulated one-step backups from the Dyna-Q model.
+        """
+        if self.prioritized_sweeping:
+            self._sweep(self.planning_steps)
+            return
+        
+        if not self.transition_keys:
+            return
+        
+        # Sample the whole batch at once, then back up in a tight loop
+        q_values = self.q_values
+        transitions = self.transitions
+        alpha = self.learning_rate
+        gamma = self.discount_factor
+        for key in random.choices(self.transition_keys, k=self.planning_steps):
+            reward, next_state = transitions[key]
+            max_next_q = max(q_values.get((next_state, "up"), 0.0), q_values.get((next_state, "down"), 0.0),
+                             q_values.get((next_state, "left"), 0.0), q_values.get((next_state, "right"), 0.0))
+            current_q = q_values.get(key, 0.0)
+            q_values[key] = current_q + alpha * (reward + gamma * max_next_q - current_q)
+            
+    def _td_error(self, state: Tuple[int, int], action: str, reward: float, next_state: Tuple[int, int]) -> float:
+        """One-step TD error of a transition under the current Q-values."""
+        q_values = self.q_values
+        max_next_q = max(q_values.get((next_state, a), 0.0) for a in ("up", "down", "left", "right"))
+        return reward + self.discount_factor * max_next_q - q_values.get((state, action), 0.0)
+        
+    def _queue(self, key: Tuple[Tuple[int, int], str], priority: float) -> None:
+        """Queue a state-action for prioritized sweeping if it would change enough."""
+        if priority <= self.PRIORITY_THRESHOLD or priority <= self.queued_priorities.get(key, 0.0):
+            return
+        self.queued_priorities[key] = priority
+        self.queue_counter += 1
+        heapq.heappush(self.priority_queue, (-priority, self.queue_counter, key))
+        
+    def _sweep(self, budget: int) -> None:
+        """Back up the highest-priority state-actions, queueing their predecessors."""
+        q_values = self.q_values
+        queue = self.priority_queue
+        while budget > 0 and queue:
+            negative_priority, _, key = heapq.heappop(queue)
+            if self.queued_priorities.get(key) != -negative_priority:
+                continue  # Superseded by a higher-priority entry
+            del self.queued_priorities[key]
+            budget -= 1
+            
+            state, action = key
+            reward, next_state = self.transitions[key]
+            q_values[key] = q_values.get(key, 0.0) + self.learning_rate * self._td_error(state, action, reward, next_state)
+            
+            # State-actions leading into this state may now be worth updating
+            for predecessor in self.predecessors.get(state, ()):
+                previous_reward, _ = self.transitions[predecessor]
+                self._queue(predecessor, abs(self._td_error(predecessor[0], predecessor[1], previous_reward, state)))
+            
     def get_next_state(self, state: Tuple[int, int], action: str) -> Tuple[int, int]:
         """
         Predict the next state given current state and action.
@@ -199,14 +383,11 @@ class QLearningAgent(Agent):
             self.current_action = None
             return None
             
-        # Dynamic exploration rate based on steps taken
-        current_exploration = max(
-            self.min_exploration_rate, 
-            self.exploration_rate * (0.9 ** (self.steps_taken / 10))
-        )
-            
         # Exploration: with probability epsilon, choose a random action
-        if random.random() < current_exploration:
+        if random.random() < self.exploration_rate:
+            # Watkins's Q(lambda): earlier steps get no credit for what follows a random move
+            self.traces.clear()
+            
             # Choose a random valid action (avoid known obstacles)
             valid_actions = []
             x, y = self.position
@@ -0,0 +1,347 @@
+"""
+Hyperparameter sweep and parallel training for the Q-Learning Agent
+"""
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+import math
+import random
+import time
+
+from grid_world import GridWorld
+from q_learning_agent import QLearningAgent
+from q_table_store import SharedQTable
+from main import create_structured_maze
+
+
+# Parameters passed to the QLearningAgent constructor; anything else is set as an attribute
+CONSTRUCTOR_PARAMS = ("learning_rate", "discount_factor", "exploration_rate", "trace_decay", "max_traces",
+                      "planning_steps", "prioritized_sweeping")
+
+# Tunable attributes that are not constructor parameters
+ATTRIBUTE_PARAMS = ("min_exploration_rate", "exploration_decay")
+
+
+def grid_space(space: Dict[str, Sequence[Any]]) -> List[Dict[str, Any]]:
+    """
+    Expand a grid search space into configurations.
+
+    Args:
+        space: Maps parameter names to the values to try
+
+    Returns:
+        One configuration per combination of values
+    """
+    names = list(space)
+    return [dict(zip(names, values)) for values in product(*(space[name] for name in names))]
+
+
+def random_space(space: Dict[str, Any], n_samples: int, seed: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Sample configurations from a random search space.
+
+    Args:
+        space: Maps parameter names to a (low, high) tuple for a uniform
+            float, or to a list of values to choose from
+        n_samples: The number of configurations to draw
+        seed: Seed for the sampler
+
+    Returns:
+        The sampled configurations
+    """
+    rng = random.Random(seed)
+    configs = []
+    for _ in range(n_samples):
+        config = {}
+        for name, domain in space.items():
+            if isinstance(domain, tuple) and len(domain) == 2:
+                config[name] = rng.uniform(*domain)
+            else:
+                config[name] = rng.choice(list(domain))
+        configs.append(config)
+    return configs
+
+
+def make_agent(config: Dict[str, Any]) -> QLearningAgent:
+    """
+    Create a Q-learning agent for a configuration.
+
+    Args:
+        config: Maps parameter names to values
+
+    Returns:
+        The configured agent
+    """
+    unknown = set(config) - set(CONSTRUCTOR_PARAMS) - set(ATTRIBUTE_PARAMS)
+    if unknown:
+        raise ValueError(f"unknown Q-learning parameters: {sorted(unknown)}")
+    agent = QLearningAgent("Q-Learner", **{k: v for k, v in config.items() if k in CONSTRUCTOR_PARAMS})
+    for name in ATTRIBUTE_PARAMS:
+        if name in config:
+            setattr(agent, name, config[name])
+    return agent
+
+
+def _build_maze(width: int, height: int, maze_seed: int,
+                maze_builder: Callable[[GridWorld], None]) -> GridWorld:
+    """Build the shared maze deterministically from its seed."""
+    state = random.getstate()
+    random.seed(maze_seed)
+    env = GridWorld(width=width, height=height, name="Sweep")
+    maze_builder(env)
+    random.setstate(state)
+    return env
+
+
+def _reset_episode(agent: QLearningAgent) -> None:
+    """Clear an agent's per-episode state while keeping what it has learned."""
+    agent.percept = None
+    agent.position = None
+    agent.last_position = None
+    agent.last_action = None
+    agent.current_action = None
+    agent.goal_reached = False
+    agent.traces.clear()
+
+
+def _train_job(job: Tuple) -> Tuple[int, int, List[int], QLearningAgent, Any]:
+    """
+    Train one (configuration, seed) pair for more episodes.
+
+    Runs in a worker process. The agent and random state from the previous
+    rung are passed back in so training resumes instead of starting over.
+
+    Returns:
+        A tuple of (config index, seed, steps per new episode, trained agent,
+        random state)
+    """
+    (index, config, seed, agent, rng_state, episodes, max_steps,
+     width, height, maze_seed, maze_builder, start) = job
+
+    if rng_state is None:
+        random.seed(seed)
+    else:
+        random.setstate(rng_state)
+    env = _build_maze(width, height, maze_seed, maze_builder)
+    if agent is None:
+        agent = make_agent(config)
+    env.add_agent(agent, start)
+    curve = _run_episodes(env, agent, episodes, max_steps)
+    return index, seed, curve, agent, random.getstate()
+
+
+def _run_episodes(env: GridWorld, agent: QLearningAgent, episodes: int, max_steps: int) -> List[int]:
+    """Run episodes from the start position and return the steps each took."""
+    curve = []
+    for _ in range(episodes):
+        env.reset()
+        _reset_episode(agent)
+        steps = max_steps
+        for step in range(max_steps):
+            env.step()
+            if env.agent_positions[agent] in env.goal_positions:
+                steps = step + 1
+                break
+        curve.append(steps)
+    return curve
+
+
+def _shared_job(job: Tuple) -> List[int]:
+    """
+    Train one agent into a shared Q-table.
+
+    Runs in a worker process, with its own copy of the maze.
+
+    Returns:
+        The steps per episode
+    """
+    config, seed, table, episodes, max_steps, width, height, maze_seed, maze_builder, start = job
+    random.seed(seed)
+    env = _build_maze(width, height, maze_seed, maze_builder)
+    agent = make_agent(config)
+    agent.q_values = table
+    env.add_agent(agent, start)
+    try:
+        return _run_episodes(env, agent, episodes, max_steps)
+    finally:
+        table.close()
+
+
+def train_shared(config: Dict[str, Any], agents: int = 4, episodes: int = 30, max_steps: int = 300,
+                 width: int = 15, height: int = 8, maze_seed: int = 0,
+                 maze_builder: Callable[[GridWorld], None] = create_structured_maze,
+                 start: Tuple[int, int] = (1, 1), processes: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Train several agents in parallel processes into one shared Q-table.
+
+    Every agent runs its own copy of the maze, and all of them read and
+    update the same SharedQTable without locks, so each learns from the
+    others' experience and total steps per second grows with the number of
+    cores. Agents in a single environment can share a table the same way,
+    by assigning one table (or one dict) to each agent's q_values.
+
+    Args:
+        config: The agent configuration (see make_agent)
+        agents: The number of agents, each seeded with its index
+        episodes: Episodes per agent
+        max_steps: Step limit per episode
+        width: Maze width
+        height: Maze height
+        maze_seed: Seed for the shared maze
+        maze_builder: A function that adds obstacles and goals to a GridWorld
+        start: The agents' start position
+        processes: Worker process count, or None for one per agent
+
+    Returns:
+        A dict with "q_values" (a copy of the learned table), "curves"
+        (steps per episode for each agent), "steps" (total environment
+        steps), "seconds" and "steps_per_second"
+    """
+    table = SharedQTable(width, height)
+    try:
+        jobs = [(config, seed, table, episodes, max_steps, width, height, maze_seed, maze_builder, start)
+                for seed in range(agents)]
+        started = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=processes or agents) as pool:
+            curves = list(pool.map(_shared_job, jobs))
+        seconds = time.perf_counter() - started
+        q_values = dict(table.items())
+    finally:
+        table.close()
+        table.unlink()
+
+    steps = sum(sum(curve) for curve in curves)
+    return {
+        "q_values": q_values,
+        "curves": curves,
+        "steps": steps,
+        "seconds": seconds,
+        "steps_per_second": steps / seconds if seconds else 0.0,
+    }
+
+
+def run_sweep(configs: List[Dict[str, Any]], seeds: Sequence[int] = (0, 1, 2),
+              max_episodes: int = 27, min_episodes: int = 3, halving_rate: int = 3,
+              successive_halving: bool = True, score_window: int = 3, max_steps: int = 300,
+              width: int = 15, height: int = 8, maze_seed: int = 0,
+              maze_builder: Callable[[GridWorld], None] = create_structured_maze,
+              start: Tuple[int, int] = (1, 1), processes: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Train every configuration on the same maze across a process pool and rank them.
+
+    With successive halving, all configurations first train for min_episodes
+    episodes; only the best 1/halving_rate continue, for halving_rate times as
+    many episodes in total, and so on until max_episodes. Training resumes
+    from each survivor's learned Q-values rather than restarting.
+
+    A configuration's score is the mean steps-to-goal over its last
+    score_window episodes, averaged across seeds (lower is better).
+
+    Args:
+        configs: The configurations to evaluate (see grid_space/random_space)
+        seeds: Training seeds; each configuration is trained once per seed
+        max_episodes: Episodes for configurations that survive every rung
+        min_episodes: Episodes in the first rung
+        halving_rate: Factor by which survivors shrink and budgets grow per rung
+        successive_halving: If False, train every configuration for max_episodes
+        score_window: Number of final episodes to average for the score
+        max_steps: Step limit per episode
+        width: Maze width
+        height: Maze height
+        maze_seed: Seed for the shared maze
+        maze_builder: A function that adds obstacles and goals to a GridWorld
+        start: The agent's start position
+        processes: Worker process count, or None for one per CPU
+
+    Returns:
+        One result per configuration, best first, with keys "rank", "config",
+        "score", "episodes" (trained per seed) and "curve" (mean steps per
+        episode across seeds)
+    """
+    if successive_halving:
+        budgets = []
+        budget = min_episodes
+        while budget < max_episodes:
+            budgets.append(budget)
+            budget *= halving_rate
+        budgets.append(max_episodes)
+    else:
+        budgets = [max_episodes]
+
+    curves: Dict[Tuple[int, int], List[int]] = {(i, s): [] for i in range(len(configs)) for s in seeds}
+    agents: Dict[Tuple[int, int], QLearningAgent] = {}
+    rng_states: Dict[Tuple[int, int], Any] = {}
+    active = list(range(len(configs)))
+
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        for rung, budget in enumerate(budgets):
+            jobs = []
+            for i in active:
+                for seed in seeds:
+                    episodes = budget - len(curves[(i, seed)])
+                    jobs.append((i, configs[i], seed, agents.get((i, seed)), rng_states.get((i, seed)),
+                                 episodes, max_steps,
+                                 width, height, maze_seed, maze_builder, start))
+
+            for index, seed, curve, agent, rng_state in pool.map(_train_job, jobs):
+                curves[(index, seed)].extend(curve)
+                agents[(index, seed)] = agent
+                rng_states[(index, seed)] = rng_state
+
+            if rung < len(budgets) - 1:
+                keep = max(1, math.ceil(len(active) / halving_rate))
+                active = sorted(active, key=lambda i: _score(curves, i, seeds, score_window))[:keep]
+
+    results = []
+    for i, config in enumerate(configs):
+        trained = len(curves[(i, seeds[0])])
+        mean_curve = [sum(curves[(i, s)][e] for s in seeds) / len(seeds) for e in range(trained)]
+        results.append({
+            "config": config,
+            "score": _score(curves, i, seeds, score_window),
+            "episodes": trained,
+            "curve": mean_curve,
+        })
+
+    # Configurations that trained longer rank ahead of those eliminated earlier
+    results.sort(key=lambda r: (-r["episodes"], r["score"]))
+    for rank, result in enumerate(results, start=1):
+        result["rank"] = rank
+    return results
+
+
+def _score(curves: Dict[Tuple[int, int], List[int]], index: int,
+           seeds: Sequence[int], window: int) -> float:
+    """Mean steps-to-goal over the last episodes, averaged across seeds."""
+    total = 0.0
+    for seed in seeds:
+        tail = curves[(index, seed)][-window:]
+        total += sum(tail) / len(tail)
+    return total / len(seeds)
+
+
+def format_results(results: List[Dict[str, Any]]) -> str:
+    """
+    Format sweep results as a text table.
+
+    Args:
+        results: The output of run_sweep
+
+    Returns:
+        A table with one row per configuration
+    """
+    lines = [f"{'rank':>4}  {'score':>8}  {'episodes':>8}  config"]
+    for result in results:
+        config = ", ".join(f"{k}={v:.4g}" if isinstance(v, float) else f"{k}={v}"
+                           for k, v in result["config"].items())
+        lines.append(f"{result['rank']:>4}  {result['score']:>8.1f}  {result['episodes']:>8}  {config}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    space = {
+        "learning_rate": [0.1, 0.2, 0.5],
+        "discount_factor": [0.8, 0.9, 0.99],
+        "exploration_rate": [0.1, 0.3],
+    }
+    print(format_results(run_sweep(grid_space(space))))
@@ -0,0 +1,414 @@
+"""
+Q-Table Store - memory-mapped persistence and shared-memory tables of Q-values
+"""
+from collections.abc import Mapping, MutableMapping
+from multiprocessing import shared_memory
+from typing import Any, Dict, Iterator, Optional, Tuple
+from array import array
+import hashlib
+import mmap
+import os
+import struct
+import threading
+import weakref
+
+from grid_world import GridWorld
+
+
+ACTIONS = ("up", "down", "left", "right")
+_ACTION_INDEX = {action: i for i, action in enumerate(ACTIONS)}
+
+# File header: magic, width, height, action count. The Q-values (float32,
+# one per cell and action, row-major) and visit counts (uint32, one per cell)
+# follow in native byte order, so files are meant for the machine that wrote them.
+_MAGIC = b"QTB1"
+_HEADER = struct.Struct("<4sIII")
+
+# Open tables by path, shared by every agent in the process while any of them uses it
+_open_tables: "weakref.WeakValueDictionary[str, MappedQTable]" = weakref.WeakValueDictionary()
+_open_tables_lock = threading.Lock()
+
+
+def _flat_index(key: Any, width: int, height: int) -> int:
+    """Index of a (position, action) pair in a dense table, or -1 if it is outside the table."""
+    try:
+        (x, y), action = key
+        action_index = _ACTION_INDEX[action]
+    except (TypeError, ValueError, KeyError):
+        return -1
+    if not (0 <= x < width and 0 <= y < height):
+        return -1
+    return (y * width + x) * len(ACTIONS) + action_index
+
+
+def maze_fingerprint(env: GridWorld) -> str:
+    """
+    Identify a maze by its size, obstacles and goals.
+
+    Args:
+        env: The environment
+
+    Returns:
+        A hex digest that is equal for identical mazes
+    """
+    digest = hashlib.sha256()
+    digest.update(struct.pack("<II", env.width, env.height))
+    for y in range(env.height):
+        digest.update(bytes(1 if env.grid[y][x] == GridWorld.OBSTACLE else 0 for x in range(env.width)))
+    for x, y in sorted(env.goal_positions):
+        digest.update(struct.pack("<II", x, y))
+    return digest.hexdigest()[:32]
+
+
+def table_path(env: GridWorld, directory: str) -> Optional[str]:
+    """
+    Get the file that holds the newest Q-table for an environment's maze.
+
+    Each saved table is a separate file named after the maze and its
+    contents; a small pointer file named after the maze records the newest.
+
+    Args:
+        env: The environment
+        directory: The directory Q-tables are kept in
+
+    Returns:
+        The file path, or None if no table was saved for the maze
+    """
+    try:
+        with open(_latest_path(maze_fingerprint(env), directory)) as f:
+            name = f.read().strip()
+    except FileNotFoundError:
+        return None
+    return os.path.join(directory, name) if name else None
+
+
+def _latest_path(fingerprint: str, directory: str) -> str:
+    """Path of the pointer file naming the newest table for a maze."""
+    return os.path.join(directory, f"{fingerprint}.latest")
+
+
+class MappedQTable(Mapping):
+    """
+    A read-only Q-table backed by a memory-mapped file.
+
+    Maps (position, action) pairs to Q-values, like QLearningAgent.q_values;
+    pairs whose stored value is zero are treated as absent. Opening costs
+    one mmap call regardless of table size, and every agent that uses the
+    same table shares the same pages.
+
+    Pickling stores only the path, so a simulation holding the table can be
+    saved and restored cheaply; the restored table maps the file again.
+    Table files are never rewritten once saved, so the restored table has
+    the same contents.
+    """
+
+    def __init__(self, path: str):
+        """
+        Map a Q-table file.
+
+        Args:
+            path: The file written by save_q_table
+        """
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.width, self.height, action_count = _HEADER.unpack_from(self._mmap)
+        if magic != _MAGIC or action_count != len(ACTIONS):
+            self._mmap.close()
+            raise ValueError(f"not a Q-table file: {path}")
+        cells = self.width * self.height
+        view = memoryview(self._mmap)
+        q_start = _HEADER.size
+        visits_start = q_start + cells * len(ACTIONS) * 4
+        self._q = view[q_start:visits_start].cast("f")
+        self._visits = view[visits_start:visits_start + cells * 4].cast("I")
+
+    def __getitem__(self, key: Any) -> float:
+        index = _flat_index(key, self.width, self.height)
+        if index < 0 or self._q[index] == 0.0:
+            raise KeyError(key)
+        return self._q[index]
+
+    def __iter__(self) -> Iterator[Tuple[Tuple[int, int], str]]:
+        q = self._q
+        width = self.width
+        for index in range(len(q)):
+            if q[index] != 0.0:
+                cell, action_index = divmod(index, len(ACTIONS))
+                yield (cell % width, cell // width), ACTIONS[action_index]
+
+    def __len__(self) -> int:
+        return sum(1 for value in self._q if value != 0.0)
+
+    def visit_counts(self) -> Iterator[Tuple[Tuple[int, int], int]]:
+        """
+        Iterate over the saved visit counts of visited cells.
+
+        Yields:
+            (position, count) pairs
+        """
+        visits = self._visits
+        for cell in range(len(visits)):
+            if visits[cell]:
+                yield (cell % self.width, cell // self.width), visits[cell]
+
+    def close(self) -> None:
+        """
+        Unmap the file.
+        """
+        self._q.release()
+        self._visits.release()
+        self._mmap.close()
+
+    def __reduce__(self) -> Tuple[Any, Tuple[str]]:
+        return open_q_table, (self.path,)
+
+
+class SharedQTable(MutableMapping):
+    """
+    A Q-table in shared memory that agents in several processes learn into at once.
+
+    Like MappedQTable, it maps (position, action) pairs to Q-values stored
+    densely per cell and action, and pairs whose value is zero are treated
+    as absent. Updates are lock-free (Hogwild-style): two processes
+    updating the same pair at the same moment can lose one update, which
+    Q-learning tolerates, and each value is a single aligned 8-byte store,
+    so values are never torn.
+
+    Pickling sends only the shared memory block's name, so a table passed
+    to a worker process attaches to the same memory. The process that
+    created the table should call ``unlink`` when training is done.
+    """
+
+    def __init__(self, width: int, height: int, name: Optional[str] = None):
+        """
+        Create a zeroed table, or attach to an existing one.
+
+        Args:
+            width: The width of the grid
+            height: The height of the grid
+            name: The shared memory block to attach to, or None to create one
+        """
+        self.width = width
+        self.height = height
+        size = width * height * len(ACTIONS) * 8
+        if name is None:
+            self._shm = shared_memory.SharedMemory(create=True, size=size)
+        else:
+            self._shm = shared_memory.SharedMemory(name=name)
+        self._q = self._shm.buf[:size].cast("d")
+
+    @property
+    def name(self) -> str:
+        """The name of the shared memory block."""
+        return self._shm.name
+
+    def __getitem__(self, key: Any) -> float:
+        index = _flat_index(key, self.width, self.height)
+        if index < 0 or self._q[index] == 0.0:
+            raise KeyError(key)
+        return self._q[index]
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        # Called several times per agent step, so skip the Mapping.get indirection
+        index = _flat_index(key, self.width, self.height)
+        if index < 0:
+            return default
+        value = self._q[index]
+        return default if value == 0.0 else value
+
+    def __setitem__(self, key: Any, value: float) -> None:
+        index = _flat_index(key, self.width, self.height)
+        if index < 0:
+            raise KeyError(key)
+        self._q[index] = value
+
+    def __delitem__(self, key: Any) -> None:
+        index = _flat_index(key, self.width, self.height)
+        if index < 0 or self._q[index] == 0.0:
+            raise KeyError(key)
+        self._q[index] = 0.0
+
+    def __iter__(self) -> Iterator[Tuple[Tuple[int, int], str]]:
+        q = self._q
+        width = self.width
+        for index in range(len(q)):
+            if q[index] != 0.0:
+                cell, action_index = divmod(index, len(ACTIONS))
+                yield (cell % width, cell // width), ACTIONS[action_index]
+
+    def __len__(self) -> int:
+        return sum(1 for value in self._q if value != 0.0)
+
+    def close(self) -> None:
+        """
+        Detach this process from the table.
+        """
+        self._q.release()
+        self._shm.close()
+
+    def unlink(self) -> None:
+        """
+        Free the shared memory once every process has closed the table.
+        """
+        self._shm.unlink()
+
+    def __reduce__(self) -> Tuple[Any, Tuple[int, int, str]]:
+        return SharedQTable, (self.width, self.height, self.name)
+
+
+class QValueOverlay(MutableMapping):
+    """
+    A writable Q-table layered over a shared read-only one.
+
+    Reads fall through to the base table until a pair is written; writes
+    stay in a private dict, so agents can start from a shared mapped table
+    and keep learning without copying it.
+    """
+
+    _DELETED = object()
+
+    def __init__(self, base: Mapping):
+        """
+        Initialize an overlay with no changes.
+
+        Args:
+            base: The shared table to read through to
+        """
+        self.base = base
+        self.changes: Dict[Any, Any] = {}
+
+    def __getitem__(self, key: Any) -> float:
+        value = self.changes.get(key)
+        if value is None:
+            return self.base[key]
+        if value is self._DELETED:
+            raise KeyError(key)
+        return value
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        # Called several times per agent step, so skip the Mapping.get indirection
+        value = self.changes.get(key)
+        if value is None:
+            return self.base.get(key, default)
+        return default if value is self._DELETED else value
+
+    def __setitem__(self, key: Any, value: float) -> None:
+        self.changes[key] = value
+
+    def __delitem__(self, key: Any) -> None:
+        if key not in self:
+            raise KeyError(key)
+        self.changes[key] = self._DELETED
+
+    def __iter__(self) -> Iterator[Any]:
+        for key, value in self.changes.items():
+            if value is not self._DELETED:
+                yield key
+        for key in self.base:
+            if key not in self.changes:
+                yield key
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+
+def open_q_table(path: str) -> MappedQTable:
+    """
+    Get the mapped table for a file, sharing one mapping per file per process.
+
+    The mapping is shared while any agent holds the table, and unmapped
+    when the last of them lets go of it.
+
+    Args:
+        path: The Q-table file
+
+    Returns:
+        The mapped table
+
+    Raises:
+        FileNotFoundError: If the file was removed
+        ValueError: If the file is not a Q-table
+    """
+    with _open_tables_lock:
+        table = _open_tables.get(path)
+        if table is None:
+            table = _open_tables[path] = MappedQTable(path)
+        return table
+
+
+def save_q_table(agent: Any, env: GridWorld, directory: str) -> str:
+    """
+    Save an agent's Q-values and visit counts for the environment's maze.
+
+    Each save writes a new file named after the maze and a hash of the
+    table, then points the maze's pointer file at it; both are written
+    beside their targets and renamed into place. A saved file is never
+    rewritten, so agents that started from an earlier table, including
+    ones pickled and restored since, keep reading the values they started
+    from. Earlier files stay in the directory until it is cleared.
+
+    Args:
+        agent: A QLearningAgent
+        env: The environment the agent learned in
+        directory: The directory Q-tables are kept in
+
+    Returns:
+        The path of the saved file
+    """
+    width, height = env.width, env.height
+    q = array("f", bytes(4 * width * height * len(ACTIONS)))
+    for ((x, y), action), value in agent.q_values.items():
+        if 0 <= x < width and 0 <= y < height and action in _ACTION_INDEX:
+            q[(y * width + x) * len(ACTIONS) + _ACTION_INDEX[action]] = value
+    visits = array("I", bytes(4 * width * height))
+    for (x, y), count in agent.visit_counts.items():
+        if 0 <= x < width and 0 <= y < height:
+            visits[y * width + x] = min(count, 0xFFFFFFFF)
+
+    contents = _HEADER.pack(_MAGIC, width, height, len(ACTIONS)) + q.tobytes() + visits.tobytes()
+    fingerprint = maze_fingerprint(env)
+    name = f"{fingerprint}-{hashlib.sha256(contents).hexdigest()[:16]}.qtable"
+    path = os.path.join(directory, name)
+
+    os.makedirs(directory, exist_ok=True)
+    if not os.path.exists(path):
+        _write_atomically(path, contents)
+    _write_atomically(_latest_path(fingerprint, directory), name.encode())
+    return path
+
+
+def _write_atomically(path: str, contents: bytes) -> None:
+    """Write a file beside its target and rename it into place."""
+    temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(contents)
+    os.replace(temp_path, path)
+
+
+def warm_start(agent: Any, env: GridWorld, directory: str) -> bool:
+    """
+    Start an agent from the saved Q-table for the environment's maze, if any.
+
+    The agent's Q-values become an overlay on the shared mapped table, and
+    the saved visit counts are restored.
+
+    Args:
+        agent: A QLearningAgent
+        env: The environment the agent will learn in
+        directory: The directory Q-tables are kept in
+
+    Returns:
+        True if a saved table was found
+    """
+    path = table_path(env, directory)
+    if path is None:
+        return False
+    try:
+        table = open_q_table(path)
+    except (FileNotFoundError, ValueError):
+        return False
+    agent.q_values = QValueOverlay(table)
+    for position, count in table.visit_counts():
+        agent.world_model.set_visit_count(position, count)
+    return True
@@ -1,27 +1,36 @@
 """
 Simple Reflex Agent implementation
 """
-from typing import Any, Dict, Callable
+from typing import Any, Dict, Callable, List
 
 from agent import Agent
+from decision_table import DecisionTable, NO_MATCH, PerceptField, RANDOM_OPEN_DIRECTION
+from grid_world import GridWorld
 
 
 class SimpleReflexAgent(Agent):
     """
     A simple reflex agent that maps percepts directly to actions 
     using condition-action rules.
+    
+    Rules are either callables (see add_rule) or declarative conditions over
+    percept fields compiled into a DecisionTable (see add_table_rule).
+    Declarative rules are checked first; callable rules apply only when no
+    declarative rule matches.
     """
     
-    def __init__(self, name: str = "SimpleReflexAgent"):
+    def __init__(self, name: str = "SimpleReflexAgent", decision_table: DecisionTable = None):
         """
         Initialize the agent.
         
         Args:
             name: A name for the agent
+            decision_table: A compiled rule table, which may be shared by many agents
         """
         super().__init__(name)
         self.percept = None
         self.action_rules = {}
+        self.decision_table = decision_table
         self.current_action = None
         
     def add_rule(self, condition: Callable[[Any], bool], action: Any) -> None:
@@ -34,6 +43,20 @@ class SimpleReflexAgent(Agent):
         """
         self.action_rules[condition] = action
         
+    def add_table_rule(self, conditions: Dict[str, Any], action: Any) -> None:
+        """
+        Add a declarative rule to the agent's decision table.
+        
+        Args:
+            conditions: Maps percept fields (cell_content, goal_visible,
+                goal_direction, up, down, left, right) to a required value or
+                a collection of allowed values
+            action: The action to perform when the conditions hold
+        """
+        if self.decision_table is None:
+            self.decision_table = DecisionTable()
+        self.decision_table.add_rule(conditions, action)
+        
     def perceive(self, percept: Any) -> None:
         """
         Process a percept from the environment.
@@ -47,6 +70,22 @@ class SimpleReflexAgent(Agent):
         """
         Decide on an action based on the current percept.
         
+        Returns:
+            An action to be performed
+        """
+        # Check the compiled declarative rules first
+        if self.decision_table is not None:
+            action = self.decision_table.lookup(self.percept)
+            if action is not NO_MATCH:
+                self.current_action = action
+                return action
+                
+        return self._decide_from_callables()
+        
+    def _decide_from_callables(self) -> Any:
+        """
+        Decide on an action using the callable condition-action rules.
+        
         Returns:
             An action to be performed
         """
@@ -70,4 +109,63 @@ class SimpleReflexAgent(Agent):
         Returns:
             The action performed
         """
-        return self.current_action
\ No newline at end of file
+        return self.current_action
+        
+    @staticmethod
+    def decide_batch(agents: List["SimpleReflexAgent"]) -> List[Any]:
+        """
+        Decide for many reflex agents at once.
+        
+        Agents sharing a decision table have their current percepts matched
+        in a single pass over that table; agents without a table, or whose
+        percept matches no declarative rule, use their callable rules.
+        
+        Args:
+            agents: The agents to decide for
+            
+        Returns:
+            The chosen actions, in the same order as the agents
+        """
+        actions = [None] * len(agents)
+        groups = {}
+        for i, agent in enumerate(agents):
+            if agent.decision_table is None:
+                actions[i] = agent._decide_from_callables()
+            else:
+                groups.setdefault(id(agent.decision_table), []).append(i)
+                
+        for indices in groups.values():
+            table = agents[indices[0]].decision_table
+            results = table.lookup_batch([agents[i].percept for i in indices])
+            for i, action in zip(indices, results):
+                agent = agents[i]
+                if action is NO_MATCH:
+                    action = agent._decide_from_callables()
+                else:
+                    agent.current_action = action
+                actions[i] = action
+                
+        return actions
+
+
+def default_explorer(name: str = "Explorer", decision_table: DecisionTable = None) -> SimpleReflexAgent:
+    """
+    Create a reflex agent that heads for a visible goal and otherwise explores.
+    
+    The agent stops on a goal, moves towards the goal when it is visible and
+    takes a random open direction otherwise.
+    
+    Args:
+        name: A name for the agent
+        decision_table: A table to share with other explorers; the default
+            rules are added to a new table when omitted
+        
+    Returns:
+        The reflex agent
+    """
+    agent = SimpleReflexAgent(name, decision_table)
+    if decision_table is None:
+        agent.add_table_rule({"cell_content": GridWorld.GOAL}, None)
+        agent.add_table_rule({"goal_visible": True}, PerceptField("goal_direction"))
+        agent.add_table_rule({}, RANDOM_OPEN_DIRECTION)
+    return agent
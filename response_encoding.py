@@ -0,0 +1,121 @@
+"""
+Response Encoding - content negotiation for simulation API responses
+"""
+from typing import Any, Dict, Optional, Tuple
+import gzip
+import json
+
+try:
+    import msgpack
+except ImportError:  # MessagePack responses are offered only when msgpack is installed
+    msgpack = None
+
+try:
+    import brotli
+except ImportError:  # Brotli compression is offered only when brotli is installed
+    brotli = None
+
+
+JSON_MIMETYPE = "application/json"
+MSGPACK_MIMETYPE = "application/msgpack"
+MSGPACK_MIMETYPES = (MSGPACK_MIMETYPE, "application/x-msgpack")
+
+# Payloads smaller than this are sent uncompressed
+MIN_COMPRESS_SIZE = 1024
+
+
+def _parse_quality(header: str) -> Dict[str, float]:
+    """
+    Parse an Accept-style header into a map of values to their q weights.
+    """
+    qualities = {}
+    for part in header.split(","):
+        fields = part.strip().split(";")
+        value = fields[0].strip().lower()
+        if not value:
+            continue
+        quality = 1.0
+        for param in fields[1:]:
+            name, _, number = param.strip().partition("=")
+            if name.strip() == "q":
+                try:
+                    quality = float(number)
+                except ValueError:
+                    quality = 0.0
+        qualities[value] = quality
+    return qualities
+
+
+def choose_format(accept: str) -> str:
+    """
+    Pick the response format for an Accept header.
+
+    MessagePack is chosen only if the client lists it explicitly, weighted
+    at least as high as JSON, and msgpack is installed.
+
+    Args:
+        accept: The request's Accept header
+
+    Returns:
+        "msgpack" or "json"
+    """
+    if msgpack is None:
+        return "json"
+    qualities = _parse_quality(accept)
+    msgpack_quality = max(qualities.get(mimetype, 0.0) for mimetype in MSGPACK_MIMETYPES)
+    json_quality = qualities.get(JSON_MIMETYPE, qualities.get("application/*", qualities.get("*/*", 0.0)))
+    return "msgpack" if msgpack_quality > 0 and msgpack_quality >= json_quality else "json"
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    Pick the compression for an Accept-Encoding header.
+
+    Args:
+        accept_encoding: The request's Accept-Encoding header
+
+    Returns:
+        "br", "gzip", or None for no compression
+    """
+    qualities = _parse_quality(accept_encoding)
+    wildcard = qualities.get("*", 0.0)
+    candidates = ["br", "gzip"] if brotli is not None else ["gzip"]
+    best, best_quality = None, 0.0
+    for encoding in candidates:
+        quality = qualities.get(encoding, wildcard)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def encode_payload(payload: Any, accept: str = "", accept_encoding: str = "",
+                   min_compress_size: int = MIN_COMPRESS_SIZE) -> Tuple[bytes, Dict[str, str]]:
+    """
+    Serialize and optionally compress a response payload for a client.
+
+    Args:
+        payload: A JSON-serializable payload
+        accept: The request's Accept header
+        accept_encoding: The request's Accept-Encoding header
+        min_compress_size: Serialized payloads smaller than this are not compressed
+
+    Returns:
+        A tuple of (body, headers)
+    """
+    if choose_format(accept) == "msgpack":
+        # Single-precision floats halve the size of Q-value and utility grids
+        body = msgpack.packb(payload, use_bin_type=True, use_single_float=True)
+        headers = {"Content-Type": MSGPACK_MIMETYPE}
+    else:
+        body = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+        headers = {"Content-Type": JSON_MIMETYPE}
+    headers["Vary"] = "Accept, Accept-Encoding"
+
+    encoding = choose_encoding(accept_encoding) if len(body) >= min_compress_size else None
+    if encoding == "br":
+        body = brotli.compress(body, quality=5)
+    elif encoding == "gzip":
+        body = gzip.compress(body, compresslevel=6)
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return body, headers
@@ -0,0 +1,246 @@
+"""
+Simulation Jobs - background simulation runs on a bounded worker pool
+"""
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, Optional, Set, Tuple
+import threading
+import time
+import uuid
+
+from simulation_store import SimulationStore
+
+
+class JobQueueFull(Exception):
+    """Raised when a job is submitted while every worker and queue slot is taken."""
+
+
+class JobManager:
+    """
+    Runs simulations in the background for a step budget.
+
+    Jobs run on a fixed-size thread pool with a bounded queue, so request
+    handlers return immediately and overload is reported by ``submit``
+    raising JobQueueFull rather than by requests timing out.
+
+    Job records (status, progress and results) are kept in a
+    SimulationStore, so with a shared store any server process can report
+    on or cancel a job. The pool and its bounds are per process.
+
+    Besides simulations, ``submit_task`` runs other long work, such as an
+    agent comparison, as a generator that yields its partial result after
+    each unit of work.
+
+    A job record is a dict with the keys "job_id", "status" (one of
+    "queued", "running", "done", "cancelled" or "failed"), "config",
+    "step_budget", "steps", "goal_reached", "performance", "result",
+    "error", "submitted", "started" and "finished". For a task, "steps"
+    counts the units of work done, "result" is the last value it yielded
+    and "step_budget" is None.
+    """
+
+    TERMINAL_STATUSES = ("done", "cancelled", "failed")
+
+    # Job records are stored under this prefix, next to the simulations
+    KEY_PREFIX = "job-"
+
+    def __init__(self, store: SimulationStore, build: Callable[[Dict[str, Any]], Tuple[Any, Any]],
+                 max_workers: int = 2, max_queued: int = 8, progress_interval: int = 50):
+        """
+        Initialize the manager and its worker pool.
+
+        Args:
+            store: Where job records are kept
+            build: Creates the (environment, agent) pair for a job's config
+            max_workers: The number of jobs that run at once
+            max_queued: The number of jobs that may wait for a worker
+            progress_interval: Steps between progress updates to the store,
+                which is also how often remote cancellation is noticed
+        """
+        self.store = store
+        self.build = build
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self.progress_interval = progress_interval
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="simulation-job")
+        self._lock = threading.Lock()
+        self._futures: Dict[str, Future] = {}  # Jobs queued or running in this process
+        self._cancelled: Set[str] = set()  # Running jobs asked to stop
+
+    def submit(self, config: Dict[str, Any], step_budget: int) -> str:
+        """
+        Queue a simulation run.
+
+        Args:
+            config: The simulation config passed to build
+            step_budget: The maximum number of steps to run
+
+        Returns:
+            The job's id
+
+        Raises:
+            JobQueueFull: If the pool and its queue are full
+        """
+        return self._enqueue(config, step_budget, self._run, config, step_budget)
+
+    def submit_task(self, config: Dict[str, Any], task: Callable[[Dict[str, Any]], Iterator[Any]]) -> str:
+        """
+        Queue a task other than a simulation run.
+
+        Args:
+            config: The task's config, stored in the job record and passed to task
+            task: A generator function that yields its partial result after
+                each unit of work; the job can be cancelled between yields
+
+        Returns:
+            The job's id
+
+        Raises:
+            JobQueueFull: If the pool and its queue are full
+        """
+        return self._enqueue(config, None, self._run_task, config, task)
+
+    def _enqueue(self, config: Dict[str, Any], step_budget: Optional[int],
+                 run: Callable[..., None], *args: Any) -> str:
+        """
+        Store a queued job record and hand the job to the pool.
+        """
+        with self._lock:
+            if len(self._futures) >= self.max_workers + self.max_queued:
+                raise JobQueueFull(f"{len(self._futures)} jobs already queued or running")
+            job_id = uuid.uuid4().hex
+            self.store.save(self._key(job_id), {
+                "job_id": job_id,
+                "status": "queued",
+                "config": config,
+                "step_budget": step_budget,
+                "steps": 0,
+                "goal_reached": False,
+                "performance": None,
+                "result": None,
+                "error": None,
+                "submitted": time.time(),
+                "started": None,
+                "finished": None,
+            })
+            self._futures[job_id] = self._executor.submit(run, job_id, *args)
+        return job_id
+
+    def status(self, job_id: str) -> Dict[str, Any]:
+        """
+        Get a job's record.
+
+        Raises:
+            SimulationNotFound: If there is no job with this id
+        """
+        return self.store.load(self._key(job_id))
+
+    def cancel(self, job_id: str) -> Dict[str, Any]:
+        """
+        Cancel a job. A queued job is cancelled at once; a running job stops
+        at its next step (or its next progress update, if it runs in another
+        process).
+
+        Returns:
+            The job's record after the request
+
+        Raises:
+            SimulationNotFound: If there is no job with this id
+        """
+        with self._lock:
+            future = self._futures.get(job_id)
+            if future is not None and future.cancel():
+                del self._futures[job_id]
+                return self._update(job_id, status="cancelled", finished=time.time())
+            if future is not None:
+                self._cancelled.add(job_id)
+        return self._update(job_id, cancel_requested=True)
+
+    @property
+    def active_jobs(self) -> int:
+        """The number of jobs queued or running in this process."""
+        return len(self._futures)
+
+    def shutdown(self) -> None:
+        """
+        Cancel queued jobs, stop running ones and wait for the pool to exit.
+        """
+        with self._lock:
+            self._cancelled.update(self._futures)
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    @classmethod
+    def is_job_key(cls, key: str) -> bool:
+        """Whether a store key belongs to a job record rather than a simulation."""
+        return key.startswith(cls.KEY_PREFIX)
+
+    def _key(self, job_id: str) -> str:
+        return f"{self.KEY_PREFIX}{job_id}"
+
+    def _update(self, job_id: str, **fields: Any) -> Dict[str, Any]:
+        with self.store.session(self._key(job_id)) as record:
+            record.update(fields)
+            return dict(record)
+
+    def _run(self, job_id: str, config: Dict[str, Any], step_budget: int) -> None:
+        """
+        Run a job to completion in a worker thread.
+        """
+        steps = 0
+        performance = None
+        goal_reached = False
+        try:
+            self._update(job_id, status="running", started=time.time())
+            env, agent = self.build(config)
+            cancelled = False
+            while steps < step_budget:
+                if job_id in self._cancelled:
+                    cancelled = True
+                    break
+                env.step()
+                steps += 1
+                performance = agent.performance_measure
+                if env.agent_positions[agent] in env.goal_positions:
+                    goal_reached = True
+                    break
+                if steps % self.progress_interval == 0:
+                    record = self._update(job_id, steps=steps, performance=performance)
+                    if record.get("cancel_requested"):
+                        cancelled = True
+                        break
+            self._update(job_id, status="cancelled" if cancelled else "done", steps=steps,
+                         goal_reached=goal_reached, performance=performance, finished=time.time())
+        except Exception as e:
+            self._update(job_id, status="failed", steps=steps, error=str(e), finished=time.time())
+        finally:
+            self._forget(job_id)
+
+    def _run_task(self, job_id: str, config: Dict[str, Any],
+                  task: Callable[[Dict[str, Any]], Iterator[Any]]) -> None:
+        """
+        Run a task to completion in a worker thread, storing each partial result.
+        """
+        steps = 0
+        result = None
+        try:
+            self._update(job_id, status="running", started=time.time())
+            cancelled = False
+            for result in task(config):
+                steps += 1
+                record = self._update(job_id, steps=steps, result=result)
+                if job_id in self._cancelled or record.get("cancel_requested"):
+                    cancelled = True
+                    break
+            self._update(job_id, status="cancelled" if cancelled else "done", steps=steps,
+                         result=result, finished=time.time())
+        except Exception as e:
+            self._update(job_id, status="failed", steps=steps, error=str(e), finished=time.time())
+        finally:
+            self._forget(job_id)
+
+    def _forget(self, job_id: str) -> None:
+        """
+        Drop a finished job from this process's bookkeeping.
+        """
+        with self._lock:
+            self._futures.pop(job_id, None)
+            self._cancelled.discard(job_id)
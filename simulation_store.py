@@ -0,0 +1,274 @@
+"""
+Simulation Store - simulation state shared between web server processes
+"""
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+import os
+import pickle
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+import zlib
+
+
+class SimulationNotFound(KeyError):
+    """Raised when a simulation id is not in the store."""
+
+
+class SimulationStore(ABC):
+    """
+    Abstract base class for stores that keep web simulations by id.
+
+    A simulation's state is any picklable object; app.py stores a dict with
+    the environment, the agent and the chart data. Request handlers read and
+    update it inside ``session``, which holds the simulation's lock, so
+    requests for the same simulation run one at a time while requests for
+    different simulations run in parallel.
+
+    Subclasses implement ``load``, ``save``, ``delete``, ``lock`` and ``ids``.
+    """
+
+    def create(self, state: Any) -> str:
+        """
+        Store a new simulation.
+
+        Args:
+            state: The simulation state
+
+        Returns:
+            The new simulation's id
+        """
+        simulation_id = uuid.uuid4().hex
+        self.save(simulation_id, state)
+        return simulation_id
+
+    @contextmanager
+    def session(self, simulation_id: Optional[str]) -> Iterator[Any]:
+        """
+        Lock a simulation, load it, and save it back when the block exits.
+
+        If the block raises, the state is not saved.
+
+        Args:
+            simulation_id: The simulation's id
+
+        Yields:
+            The simulation state
+
+        Raises:
+            SimulationNotFound: If there is no simulation with this id
+            TimeoutError: If the simulation stays locked by another request
+        """
+        if not simulation_id:
+            raise SimulationNotFound(simulation_id)
+        with self.lock(simulation_id):
+            state = self.load(simulation_id)
+            yield state
+            self.save(simulation_id, state)
+
+    @abstractmethod
+    def load(self, simulation_id: str) -> Any:
+        """
+        Load a simulation's state.
+
+        Raises:
+            SimulationNotFound: If there is no simulation with this id
+        """
+        pass
+
+    @abstractmethod
+    def save(self, simulation_id: str, state: Any) -> None:
+        """
+        Store a simulation's state, replacing any previous state.
+        """
+        pass
+
+    @abstractmethod
+    def delete(self, simulation_id: str) -> None:
+        """
+        Remove a simulation, if it exists.
+        """
+        pass
+
+    @abstractmethod
+    def lock(self, simulation_id: str) -> Any:
+        """
+        Get a context manager that holds the simulation's lock.
+
+        Raises:
+            TimeoutError: If the lock is not acquired within the store's lock timeout
+        """
+        pass
+
+    @abstractmethod
+    def ids(self) -> List[str]:
+        """
+        Get the ids of every stored simulation.
+        """
+        pass
+
+
+class MemoryStore(SimulationStore):
+    """
+    A store that keeps simulations as live objects in this process.
+
+    It only works with a single server process, but needs no serialization.
+    """
+
+    def __init__(self, lock_timeout: float = 10.0):
+        """
+        Initialize an empty store.
+
+        Args:
+            lock_timeout: Seconds to wait for a locked simulation before giving up
+        """
+        self.lock_timeout = lock_timeout
+        self._states: Dict[str, Any] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._guard = threading.Lock()
+
+    def load(self, simulation_id: str) -> Any:
+        try:
+            return self._states[simulation_id]
+        except KeyError:
+            raise SimulationNotFound(simulation_id) from None
+
+    def save(self, simulation_id: str, state: Any) -> None:
+        self._states[simulation_id] = state
+
+    def delete(self, simulation_id: str) -> None:
+        self._states.pop(simulation_id, None)
+        with self._guard:
+            self._locks.pop(simulation_id, None)
+
+    @contextmanager
+    def lock(self, simulation_id: str) -> Iterator[None]:
+        with self._guard:
+            lock = self._locks.setdefault(simulation_id, threading.Lock())
+        if not lock.acquire(timeout=self.lock_timeout):
+            raise TimeoutError(f"simulation {simulation_id} is locked")
+        try:
+            yield
+        finally:
+            lock.release()
+
+    def ids(self) -> List[str]:
+        return list(self._states)
+
+
+class SQLiteStore(SimulationStore):
+    """
+    A store that keeps simulations in a SQLite file, so every server process
+    on the machine (e.g. each gunicorn worker) sees the same simulations.
+
+    States are pickled and zlib-compressed. Locks are leases in a table: a
+    lease left behind by a crashed process expires after ``lock_ttl``
+    seconds. Simulations not updated for ``max_age`` seconds are removed
+    when new ones are created.
+    """
+
+    def __init__(self, path: Optional[str] = None, lock_timeout: float = 10.0,
+                 lock_ttl: float = 30.0, max_age: float = 3600.0):
+        """
+        Open the store, creating the database file if needed.
+
+        Args:
+            path: The database file (defaults to a file in the temp directory)
+            lock_timeout: Seconds to wait for a locked simulation before giving up
+            lock_ttl: Seconds after which a lock is considered abandoned
+            max_age: Seconds of inactivity after which a simulation is removed
+        """
+        self.path = path or os.path.join(tempfile.gettempdir(), "agent_simulations.sqlite3")
+        self.lock_timeout = lock_timeout
+        self.lock_ttl = lock_ttl
+        self.max_age = max_age
+        self._local = threading.local()  # sqlite3 connections are per thread
+
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("CREATE TABLE IF NOT EXISTS simulations "
+                     "(id TEXT PRIMARY KEY, state BLOB NOT NULL, updated REAL NOT NULL)")
+        conn.execute("CREATE TABLE IF NOT EXISTS locks "
+                     "(id TEXT PRIMARY KEY, owner TEXT NOT NULL, expires REAL NOT NULL)")
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Autocommit mode; every statement is its own transaction
+            conn = sqlite3.connect(self.path, timeout=self.lock_timeout, isolation_level=None)
+            self._local.conn = conn
+        return conn
+
+    def create(self, state: Any) -> str:
+        self._connection().execute("DELETE FROM simulations WHERE updated < ?",
+                                   (time.time() - self.max_age,))
+        return super().create(state)
+
+    def load(self, simulation_id: str) -> Any:
+        row = self._connection().execute("SELECT state FROM simulations WHERE id = ?",
+                                         (simulation_id,)).fetchone()
+        if row is None:
+            raise SimulationNotFound(simulation_id)
+        return pickle.loads(zlib.decompress(row[0]))
+
+    def save(self, simulation_id: str, state: Any) -> None:
+        blob = zlib.compress(pickle.dumps(state, pickle.HIGHEST_PROTOCOL))
+        self._connection().execute("INSERT OR REPLACE INTO simulations (id, state, updated) VALUES (?, ?, ?)",
+                                   (simulation_id, blob, time.time()))
+
+    def delete(self, simulation_id: str) -> None:
+        conn = self._connection()
+        conn.execute("DELETE FROM simulations WHERE id = ?", (simulation_id,))
+        conn.execute("DELETE FROM locks WHERE id = ?", (simulation_id,))
+
+    def ids(self) -> List[str]:
+        return [row[0] for row in self._connection().execute("SELECT id FROM simulations")]
+
+    @contextmanager
+    def lock(self, simulation_id: str) -> Iterator[None]:
+        conn = self._connection()
+        owner = uuid.uuid4().hex
+        deadline = time.monotonic() + self.lock_timeout
+        delay = 0.002
+        while True:
+            now = time.time()
+            # Take the lease if it is free or has expired
+            conn.execute("INSERT INTO locks (id, owner, expires) VALUES (?, ?, ?) "
+                         "ON CONFLICT(id) DO UPDATE SET owner = excluded.owner, expires = excluded.expires "
+                         "WHERE locks.expires < ?",
+                         (simulation_id, owner, now + self.lock_ttl, now))
+            row = conn.execute("SELECT owner FROM locks WHERE id = ?", (simulation_id,)).fetchone()
+            if row is not None and row[0] == owner:
+                break
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f"simulation {simulation_id} is locked")
+            time.sleep(delay)
+            delay = min(delay * 2, 0.05)
+        try:
+            yield
+        finally:
+            conn.execute("DELETE FROM locks WHERE id = ? AND owner = ?", (simulation_id, owner))
+
+
+def create_store(spec: str = "sqlite") -> SimulationStore:
+    """
+    Create a simulation store from a short specification.
+
+    Args:
+        spec: "memory" for a MemoryStore, "sqlite" for a SQLiteStore at the
+            default path, or "sqlite:<path>" for a SQLiteStore at that path
+
+    Returns:
+        The store
+    """
+    if spec == "memory":
+        return MemoryStore()
+    if spec == "sqlite":
+        return SQLiteStore()
+    if spec.startswith("sqlite:"):
+        return SQLiteStore(spec[len("sqlite:"):])
+    raise ValueError(f"unknown simulation store: {spec!r}")
+
@@ -6,10 +6,29 @@ let performanceChart = null;
 let comparisonChart = null;
 let simulationSpeed = 500; // ms between steps
 let currentVisualization = 'normal';
+let simulationId = null; // Sent back in the X-Simulation-Id header on every request
+
+// Canvas renderer state
+let cellSize = 42;
+let cellPitch = 44; // cell size + gap
+let canvasGridWidth = 0;
+let canvasGridHeight = 0;
+let canvasColors = {};
+let agentCells = new Set(); // Cell indices (y * width + x) holding an agent
+let maxVisitCount = 0;
+let pendingCells = new Set(); // Cell indices to repaint on the next frame
+let pendingFullRedraw = false;
+let frameRequested = false;
+
+// Simulation states are requested as MessagePack, falling back to JSON
+const STATE_ACCEPT = 'application/msgpack, application/json;q=0.9';
+
+// Policy arrows by action
+const POLICY_ARROWS = { up: '↑', right: '→', down: '↓', left: '←' };
 
 // DOM elements
-const gridContainer = document.getElementById('grid-container');
-const overlayContainer = document.getElementById('overlay-container');
+const gridCanvas = document.getElementById('grid-canvas');
+const gridContext = gridCanvas.getContext('2d');
 const agentTypeSelect = document.getElementById('agent-type');
 const initializeBtn = document.getElementById('initialize-btn');
 const stepBtn = document.getElementById('step-btn');
@@ -44,6 +63,12 @@ vizHeatmap.addEventListener('change', () => updateVisualization('heatmap'));
 vizValues.addEventListener('change', () => updateVisualization('values'));
 vizPolicy.addEventListener('change', () => updateVisualization('policy'));
 
+// The cell size follows the window width, so resizing redraws the grid
+window.addEventListener('resize', () => {
+    pendingFullRedraw = true;
+    scheduleFrame();
+});
+
 // Initialize charts
 function initializeCharts() {
     // Performance chart
@@ -158,9 +183,10 @@ async function initializeSimulation() {
         // Call the init endpoint
         const response = await fetch('/init', {
             method: 'POST',
-            headers: {
+            headers: simulationHeaders({
                 'Content-Type': 'application/json',
-            },
+                'Accept': STATE_ACCEPT,
+            }),
             body: JSON.stringify({ agent_type: agentType }),
         });
         
@@ -169,7 +195,8 @@ async function initializeSimulation() {
         }
         
         // Get the initial state
-        currentState = await response.json();
+        currentState = await readState(response);
+        simulationId = currentState.simulation_id;
         
         // Reset charts
         performanceChart.data.labels = [];
@@ -214,17 +241,24 @@ async function stepSimulation() {
         // Call the step endpoint
         const response = await fetch('/step', {
             method: 'POST',
-            headers: {
+            headers: simulationHeaders({
                 'Content-Type': 'application/json',
-            },
+                'Accept': STATE_ACCEPT,
+            }),
         });
         
         if (!response.ok) {
             throw new Error('Failed to step simulation');
         }
         
-        // Get the updated state
-        const newState = await response.json();
+        // Get the updated state; steps only send the grid cells that changed
+        const newState = await readState(response);
+        if (!newState.grid && currentState && currentState.grid) {
+            newState.grid = currentState.grid;
+            for (const [x, y, cellType] of newState.cell_changes || []) {
+                newState.grid[y][x] = cellType;
+            }
+        }
         currentState = newState;
         
         // Update the UI
@@ -263,6 +297,100 @@ async function stepSimulation() {
     }
 }
 
+// Parse a simulation state response in whichever format the server chose
+async function readState(response) {
+    const contentType = response.headers.get('Content-Type') || '';
+    if (contentType.includes('msgpack')) {
+        return decodeMsgPack(new Uint8Array(await response.arrayBuffer()));
+    }
+    return response.json();
+}
+
+// Decode a MessagePack document (as sent for 'Accept: application/msgpack')
+function decodeMsgPack(bytes) {
+    const view = new DataView(bytes.buffer, bytes.byteOffset, bytes.byteLength);
+    const textDecoder = new TextDecoder();
+    let offset = 0;
+    
+    function readString(length) {
+        const text = textDecoder.decode(bytes.subarray(offset, offset + length));
+        offset += length;
+        return text;
+    }
+    
+    function readBinary(length) {
+        const data = bytes.slice(offset, offset + length);
+        offset += length;
+        return data;
+    }
+    
+    function readArray(length) {
+        const array = new Array(length);
+        for (let i = 0; i < length; i++) {
+            array[i] = readValue();
+        }
+        return array;
+    }
+    
+    function readMap(length) {
+        const map = {};
+        for (let i = 0; i < length; i++) {
+            const key = readValue();
+            map[key] = readValue();
+        }
+        return map;
+    }
+    
+    function readValue() {
+        const type = view.getUint8(offset++);
+        let value;
+        
+        if (type <= 0x7f) return type;                          // positive fixint
+        if (type >= 0xe0) return type - 0x100;                  // negative fixint
+        if ((type & 0xf0) === 0x80) return readMap(type & 0x0f);
+        if ((type & 0xf0) === 0x90) return readArray(type & 0x0f);
+        if ((type & 0xe0) === 0xa0) return readString(type & 0x1f);
+        
+        switch (type) {
+            case 0xc0: return null;
+            case 0xc2: return false;
+            case 0xc3: return true;
+            case 0xc4: value = view.getUint8(offset); offset += 1; return readBinary(value);
+            case 0xc5: value = view.getUint16(offset); offset += 2; return readBinary(value);
+            case 0xc6: value = view.getUint32(offset); offset += 4; return readBinary(value);
+            case 0xca: value = view.getFloat32(offset); offset += 4; return value;
+            case 0xcb: value = view.getFloat64(offset); offset += 8; return value;
+            case 0xcc: value = view.getUint8(offset); offset += 1; return value;
+            case 0xcd: value = view.getUint16(offset); offset += 2; return value;
+            case 0xce: value = view.getUint32(offset); offset += 4; return value;
+            case 0xcf: value = Number(view.getBigUint64(offset)); offset += 8; return value;
+            case 0xd0: value = view.getInt8(offset); offset += 1; return value;
+            case 0xd1: value = view.getInt16(offset); offset += 2; return value;
+            case 0xd2: value = view.getInt32(offset); offset += 4; return value;
+            case 0xd3: value = Number(view.getBigInt64(offset)); offset += 8; return value;
+            case 0xd9: value = view.getUint8(offset); offset += 1; return readString(value);
+            case 0xda: value = view.getUint16(offset); offset += 2; return readString(value);
+            case 0xdb: value = view.getUint32(offset); offset += 4; return readString(value);
+            case 0xdc: value = view.getUint16(offset); offset += 2; return readArray(value);
+            case 0xdd: value = view.getUint32(offset); offset += 4; return readArray(value);
+            case 0xde: value = view.getUint16(offset); offset += 2; return readMap(value);
+            case 0xdf: value = view.getUint32(offset); offset += 4; return readMap(value);
+            default:
+                throw new Error(`Unsupported MessagePack type 0x${type.toString(16)}`);
+        }
+    }
+    
+    return readValue();
+}
+
+// Add the current simulation id to request headers
+function simulationHeaders(headers) {
+    if (simulationId) {
+        headers['X-Simulation-Id'] = simulationId;
+    }
+    return headers;
+}
+
 // Toggle auto run mode
 function toggleAutoRun() {
     if (autoRunInterval) {
@@ -308,8 +436,11 @@ function resetSimulation() {
     resetBtn.disabled = true;
     
     // Clear grid and info
-    gridContainer.innerHTML = '';
-    overlayContainer.innerHTML = '';
+    gridContext.clearRect(0, 0, gridCanvas.width, gridCanvas.height);
+    pendingCells.clear();
+    pendingFullRedraw = false;
+    canvasGridWidth = 0;
+    canvasGridHeight = 0;
     agentInfoDiv.innerHTML = '<p>No simulation running</p>';
     updateStepCounter(0);
     
@@ -338,66 +469,196 @@ function updateSimulationSpeed() {
     }
 }
 
-// Update the grid visualization
+// Update the grid visualization, repainting only the cells the server marked dirty
 function updateGrid(state) {
-    // Clear the grid and overlay
-    gridContainer.innerHTML = '';
-    overlayContainer.innerHTML = '';
+    if (!state || !state.grid) return;
+    
+    agentCells = new Set(state.agents.map(agent => agent.position[1] * state.width + agent.position[0]));
     
+    if (state.full_redraw || !Array.isArray(state.dirty_cells) ||
+            state.width !== canvasGridWidth || state.height !== canvasGridHeight) {
+        pendingFullRedraw = true;
+    } else {
+        for (const [x, y] of state.dirty_cells) {
+            pendingCells.add(y * state.width + x);
+        }
+    }
+    
+    // Heat colours are relative to the busiest cell, so a new maximum repaints every visited cell
+    const visitCounts = (state.simulation_data && state.simulation_data.visit_counts) || {};
+    let maxCount = 0;
+    for (const pos in visitCounts) {
+        maxCount = Math.max(maxCount, visitCounts[pos]);
+    }
+    if (maxCount !== maxVisitCount && currentVisualization === 'heatmap') {
+        for (const posStr in visitCounts) {
+            const match = posStr.match(/\((\d+),\s*(\d+)\)/);
+            if (match) pendingCells.add(parseInt(match[2]) * state.width + parseInt(match[1]));
+        }
+    }
+    maxVisitCount = maxCount;
+    
+    scheduleFrame();
+}
+
+// Paint pending cells on the next animation frame, coalescing updates that arrive faster
+function scheduleFrame() {
+    if (frameRequested) return;
+    frameRequested = true;
+    requestAnimationFrame(drawFrame);
+}
+
+// Paint every pending cell, or the whole grid after a full redraw request
+function drawFrame() {
+    frameRequested = false;
+    const state = currentState;
     if (!state || !state.grid) return;
     
-    // Set grid dimensions
-    gridContainer.style.gridTemplateColumns = `repeat(${state.width}, var(--cell-size))`;
-    gridContainer.style.gridTemplateRows = `repeat(${state.height}, var(--cell-size))`;
-    
-    // Create cells
-    for (let y = 0; y < state.height; y++) {
-        for (let x = 0; x < state.width; x++) {
-            const cell = document.createElement('div');
-            cell.className = 'grid-cell';
-            cell.dataset.x = x;
-            cell.dataset.y = y;
-            
-            // Set cell type
-            const cellType = state.grid[y][x];
-            if (cellType === 'obstacle') {
-                cell.classList.add('cell-obstacle');
-            } else if (cellType === 'goal') {
-                cell.classList.add('cell-goal');
-                cell.innerHTML = '<i class="bi bi-flag-fill"></i>';
-            } else {
-                cell.classList.add('cell-empty');
+    if (pendingFullRedraw) {
+        resizeCanvas(state);
+        for (let y = 0; y < state.height; y++) {
+            for (let x = 0; x < state.width; x++) {
+                drawCell(state, x, y);
             }
-            
-            // Add visit counts (for trails)
-            if (state.simulation_data && state.simulation_data.visit_counts) {
-                const posKey = `(${x}, ${y})`;
-                if (state.simulation_data.visit_counts[posKey] && cellType === 'empty') {
-                    cell.classList.add('cell-visited');
-                }
-            }
-            
-            // Add cell to grid
-            gridContainer.appendChild(cell);
+        }
+    } else {
+        for (const index of pendingCells) {
+            drawCell(state, index % state.width, Math.floor(index / state.width));
         }
     }
     
-    // Add agents to grid
-    for (const agent of state.agents) {
-        const [x, y] = agent.position;
-        const index = y * state.width + x;
-        const cell = gridContainer.children[index];
-        
-        // Add agent marker
-        cell.classList.add('cell-agent');
-        const agentMarker = document.createElement('div');
-        agentMarker.className = 'agent-marker';
-        agentMarker.innerHTML = '<i class="bi bi-robot"></i>';
-        cell.appendChild(agentMarker);
+    pendingCells.clear();
+    pendingFullRedraw = false;
+}
+
+// Size the canvas for the grid and read the cell size and colours from the stylesheet
+function resizeCanvas(state) {
+    const style = getComputedStyle(document.documentElement);
+    cellSize = parseFloat(style.getPropertyValue('--cell-size')) || 42;
+    cellPitch = cellSize + (parseFloat(style.getPropertyValue('--grid-gap')) || 2);
+    for (const name of ['agent', 'goal', 'obstacle', 'empty', 'agent-trail']) {
+        canvasColors[name] = style.getPropertyValue(`--${name}-color`).trim();
     }
     
-    // Apply visualization overlay based on the current mode
-    updateVisualization(currentVisualization);
+    const width = state.width * cellPitch - (cellPitch - cellSize);
+    const height = state.height * cellPitch - (cellPitch - cellSize);
+    const ratio = window.devicePixelRatio || 1;
+    gridCanvas.width = Math.round(width * ratio);
+    gridCanvas.height = Math.round(height * ratio);
+    gridCanvas.style.width = `${width}px`;
+    gridCanvas.style.height = `${height}px`;
+    gridContext.setTransform(ratio, 0, 0, ratio, 0, 0);
+    gridContext.clearRect(0, 0, width, height);
+    
+    canvasGridWidth = state.width;
+    canvasGridHeight = state.height;
+}
+
+// Paint one cell: its contents, the overlay for the current mode, then any agent on it
+function drawCell(state, x, y) {
+    const ctx = gridContext;
+    const left = x * cellPitch;
+    const top = y * cellPitch;
+    const centerX = left + cellSize / 2;
+    const centerY = top + cellSize / 2;
+    const cellType = state.grid[y][x];
+    const posKey = `(${x}, ${y})`;
+    const visitCounts = (state.simulation_data && state.simulation_data.visit_counts) || {};
+    
+    ctx.clearRect(left, top, cellSize, cellSize);
+    ctx.textAlign = 'center';
+    ctx.textBaseline = 'middle';
+    
+    if (cellType === 'obstacle') {
+        ctx.fillStyle = canvasColors.obstacle;
+        ctx.fillRect(left, top, cellSize, cellSize);
+    } else if (cellType === 'goal') {
+        ctx.fillStyle = canvasColors.goal;
+        ctx.fillRect(left, top, cellSize, cellSize);
+        ctx.fillStyle = 'white';
+        ctx.font = `${Math.round(cellSize * 0.45)}px sans-serif`;
+        ctx.fillText('⚑', centerX, centerY);
+    } else {
+        ctx.fillStyle = canvasColors.empty;
+        ctx.fillRect(left, top, cellSize, cellSize);
+        if (visitCounts[posKey]) {
+            // Visited trail
+            ctx.fillStyle = canvasColors['agent-trail'];
+            ctx.fillRect(left, top, cellSize, cellSize);
+        }
+        ctx.strokeStyle = '#dee2e6';
+        ctx.lineWidth = 1;
+        ctx.strokeRect(left + 0.5, top + 0.5, cellSize - 1, cellSize - 1);
+        drawOverlay(state, x, y, posKey, visitCounts);
+    }
+    
+    if (agentCells.has(y * state.width + x)) {
+        ctx.fillStyle = canvasColors.agent;
+        ctx.beginPath();
+        ctx.arc(centerX, centerY, cellSize * 0.4, 0, 2 * Math.PI);
+        ctx.fill();
+        ctx.fillStyle = 'white';
+        ctx.font = 'bold 14px sans-serif';
+        ctx.fillText('A', centerX, centerY);
+    }
+}
+
+// Paint the overlay of the current visualization mode on an empty cell
+function drawOverlay(state, x, y, posKey, visitCounts) {
+    const ctx = gridContext;
+    const left = x * cellPitch;
+    const top = y * cellPitch;
+    const centerX = left + cellSize / 2;
+    const centerY = top + cellSize / 2;
+    const agentInfo = state.agent_info || {};
+    
+    if (currentVisualization === 'heatmap') {
+        const count = visitCounts[posKey] || 0;
+        if (count > 0) {
+            // Intensity (0-1) relative to the most visited cell
+            const intensity = Math.min(1, count / maxVisitCount);
+            ctx.fillStyle = `rgba(255, 0, 0, ${intensity * 0.7})`;
+            ctx.fillRect(left, top, cellSize, cellSize);
+            ctx.fillStyle = 'black';
+            ctx.font = 'bold 10px sans-serif';
+            ctx.fillText(count, centerX, centerY);
+        }
+    } else if (currentVisualization === 'values') {
+        let value;
+        if (state.agent_type === 'utility' && agentInfo.utilities) {
+            value = agentInfo.utilities[posKey];
+        } else if (state.agent_type === 'qlearning' && agentInfo.q_value_grid) {
+            value = agentInfo.q_value_grid[y][x];
+        }
+        if (value === undefined) return;
+        
+        // Colour based on value, as for the info badges
+        let background = null;
+        let textColor = 'black';
+        if (value > 5) {
+            background = '#198754';
+            textColor = 'white';
+        } else if (value > 0) {
+            background = '#ffc107';
+        } else if (value < 0) {
+            background = '#dc3545';
+            textColor = 'white';
+        }
+        if (background) {
+            ctx.fillStyle = background;
+            ctx.fillRect(left, top, cellSize, cellSize);
+        }
+        ctx.fillStyle = textColor;
+        ctx.font = 'bold 10px sans-serif';
+        ctx.fillText(value.toFixed(1), centerX, centerY);
+    } else if (currentVisualization === 'policy') {
+        const bestAction = agentInfo.policy ? agentInfo.policy[posKey] : undefined;
+        if (bestAction && POLICY_ARROWS[bestAction]) {
+            ctx.fillStyle = 'rgba(0, 0, 0, 0.5)';
+            ctx.font = '16px sans-serif';
+            ctx.fillText(POLICY_ARROWS[bestAction], centerX, centerY);
+        }
+    }
 }
 
 // Update the agent information display
@@ -532,232 +793,31 @@ function addLogEntry(message, type = 'info') {
 function updateVisualization(mode) {
     currentVisualization = mode;
     
-    // Clear existing overlay
-    overlayContainer.innerHTML = '';
-    
     // If no current state, return
     if (!currentState || !currentState.grid) return;
     
     if (mode === 'heatmap') {
-        // Create heat map based on visit counts
-        if (currentState.simulation_data && currentState.simulation_data.visit_counts) {
-            createHeatMap(currentState);
-        } else {
+        if (!currentState.simulation_data || !currentState.simulation_data.visit_counts) {
             addLogEntry('No visit count data available for heat map', 'error');
         }
     } else if (mode === 'values') {
-        // Show utility or Q-values
-        if (currentState.agent_type === 'utility' && currentState.agent_info.utilities) {
-            createValueMap(currentState.agent_info.utilities);
-        } else if (currentState.agent_type === 'qlearning' && currentState.agent_info.q_value_grid) {
-            createQValueGrid(currentState.agent_info.q_value_grid);
-        } else {
+        const hasUtilities = currentState.agent_type === 'utility' && currentState.agent_info.utilities;
+        const hasQValues = currentState.agent_type === 'qlearning' && currentState.agent_info.q_value_grid;
+        if (!hasUtilities && !hasQValues) {
             addLogEntry('No value data available for this agent type', 'error');
         }
     } else if (mode === 'policy') {
-        // Show policy (best action at each position)
-        if (currentState.agent_type === 'qlearning' && currentState.agent_info.q_values) {
-            createPolicyMap(currentState.agent_info.q_values);
-        } else if (currentState.agent_type === 'utility' && currentState.agent_info.utilities) {
+        if (currentState.agent_type === 'utility' && currentState.agent_info.utilities) {
             // Future implementation: derive policy from utilities
             addLogEntry('Policy visualization not implemented for this agent type', 'error');
-        } else {
+        } else if (currentState.agent_type !== 'qlearning' || !currentState.agent_info.policy) {
             addLogEntry('No policy data available for this agent type', 'error');
         }
     }
-}
-
-// Create a heat map based on visit counts
-function createHeatMap(state) {
-    const visitCounts = state.simulation_data.visit_counts;
-    if (!visitCounts) return;
-    
-    // Find max visit count for normalization
-    let maxCount = 0;
-    for (const pos in visitCounts) {
-        maxCount = Math.max(maxCount, visitCounts[pos]);
-    }
-    
-    // Create heat map overlay
-    for (let y = 0; y < state.height; y++) {
-        for (let x = 0; x < state.width; x++) {
-            const posKey = `(${x}, ${y})`;
-            const count = visitCounts[posKey] || 0;
-            
-            if (count > 0 && state.grid[y][x] === 'empty') {
-                // Calculate intensity (0-1) based on visit count
-                const intensity = Math.min(1, count / maxCount);
-                
-                // Create overlay element
-                const overlay = document.createElement('div');
-                overlay.className = 'heatmap-overlay';
-                overlay.style.backgroundColor = `rgba(255, 0, 0, ${intensity * 0.7})`;
-                
-                // Position overlay
-                overlay.style.left = `${x * (42 + 2)}px`; // cell size + gap
-                overlay.style.top = `${y * (42 + 2)}px`;
-                overlay.style.width = '42px';
-                overlay.style.height = '42px';
-                
-                // Add count text
-                overlay.textContent = count;
-                
-                // Add to overlay container
-                overlayContainer.appendChild(overlay);
-            }
-        }
-    }
-}
-
-// Create a value map visualization from utilities
-function createValueMap(utilities) {
-    if (!utilities || !currentState) return;
     
-    // Create value overlay for each cell
-    for (const posStr in utilities) {
-        try {
-            // Parse position string "(x, y)" to get coordinates
-            const match = posStr.match(/\((\d+),\s*(\d+)\)/);
-            if (!match) continue;
-            
-            const x = parseInt(match[1]);
-            const y = parseInt(match[2]);
-            
-            // Skip obstacles and goals
-            if (currentState.grid[y][x] !== 'empty') continue;
-            
-            const value = utilities[posStr];
-            
-            // Create overlay element
-            const overlay = document.createElement('div');
-            overlay.className = 'cell-value';
-            
-            // Set text to show value
-            overlay.textContent = value.toFixed(1);
-            
-            // Set color based on value
-            let valueClass = '';
-            if (value > 5) valueClass = 'value-high';
-            else if (value > 0) valueClass = 'value-medium';
-            else if (value < 0) valueClass = 'value-low';
-            
-            if (valueClass) overlay.classList.add(valueClass);
-            
-            // Position overlay
-            overlay.style.left = `${x * (42 + 2)}px`; // cell size + gap
-            overlay.style.top = `${y * (42 + 2)}px`;
-            
-            // Add to overlay container
-            overlayContainer.appendChild(overlay);
-        } catch (e) {
-            console.error("Error processing utility value:", e);
-        }
-    }
-}
-
-// Create a visualization from Q-value grid
-function createQValueGrid(qValueGrid) {
-    if (!qValueGrid || !currentState) return;
-    
-    for (let y = 0; y < qValueGrid.length; y++) {
-        for (let x = 0; x < qValueGrid[y].length; x++) {
-            // Skip obstacles and goals
-            if (currentState.grid[y][x] !== 'empty') continue;
-            
-            const value = qValueGrid[y][x];
-            
-            // Create overlay element
-            const overlay = document.createElement('div');
-            overlay.className = 'cell-value';
-            
-            // Set text to show value
-            overlay.textContent = value.toFixed(1);
-            
-            // Set color based on value
-            let valueClass = '';
-            if (value > 5) valueClass = 'value-high';
-            else if (value > 0) valueClass = 'value-medium';
-            else if (value < 0) valueClass = 'value-low';
-            
-            if (valueClass) overlay.classList.add(valueClass);
-            
-            // Position overlay
-            overlay.style.left = `${x * (42 + 2)}px`; // cell size + gap
-            overlay.style.top = `${y * (42 + 2)}px`;
-            
-            // Add to overlay container
-            overlayContainer.appendChild(overlay);
-        }
-    }
-}
-
-// Create a policy map visualization from Q-values
-function createPolicyMap(qValues) {
-    if (!qValues || !currentState) return;
-    
-    // For each position with Q-values, determine the best action
-    for (const posStr in qValues) {
-        try {
-            // Parse position string "(x, y)" to get coordinates
-            const match = posStr.match(/\((\d+),\s*(\d+)\)/);
-            if (!match) continue;
-            
-            const x = parseInt(match[1]);
-            const y = parseInt(match[2]);
-            
-            // Skip obstacles and goals
-            if (currentState.grid[y][x] !== 'empty') continue;
-            
-            const actionValues = qValues[posStr];
-            
-            // Find best action
-            let bestAction = null;
-            let bestValue = -Infinity;
-            
-            for (const action in actionValues) {
-                if (actionValues[action] > bestValue) {
-                    bestValue = actionValues[action];
-                    bestAction = action;
-                }
-            }
-            
-            if (bestAction && bestValue > 0) {
-                // Create arrow element
-                const arrow = document.createElement('div');
-                arrow.className = 'policy-arrow';
-                
-                // Set arrow based on action
-                let arrowChar = '';
-                let rotation = 0;
-                
-                if (bestAction === 'up') {
-                    arrowChar = '↑';
-                    rotation = 0;
-                } else if (bestAction === 'right') {
-                    arrowChar = '↑';
-                    rotation = 90;
-                } else if (bestAction === 'down') {
-                    arrowChar = '↑';
-                    rotation = 180;
-                } else if (bestAction === 'left') {
-                    arrowChar = '↑';
-                    rotation = 270;
-                }
-                
-                arrow.textContent = arrowChar;
-                arrow.style.transform = `rotate(${rotation}deg)`;
-                
-                // Position arrow
-                arrow.style.left = `${x * (42 + 2) + 21}px`; // center in cell
-                arrow.style.top = `${y * (42 + 2) + 21}px`;
-                
-                // Add to overlay container
-                overlayContainer.appendChild(arrow);
-            }
-        } catch (e) {
-            console.error("Error creating policy arrow:", e);
-        }
-    }
+    // Every cell's overlay changes with the mode
+    pendingFullRedraw = true;
+    scheduleFrame();
 }
 
 // Run a comparison of all agent types
@@ -777,7 +837,12 @@ async function runAgentComparison() {
             throw new Error('Failed to run comparison');
         }
         
-        const results = await response.json();
+        // The comparison runs as a background job; wait for it to finish
+        const job = await waitForJob((await response.json()).job_id);
+        if (job.status !== 'done') {
+            throw new Error(`Comparison ${job.status}${job.error ? ': ' + job.error : ''}`);
+        }
+        const results = job.result;
         
         // Update comparison chart
         comparisonChart.data.datasets[0].data = [
@@ -806,6 +871,26 @@ async function runAgentComparison() {
     }
 }
 
+// Follow a background job's event stream until the job ends, resolving with its final record.
+// The server closes long streams and EventSource reconnects by itself.
+function waitForJob(jobId) {
+    return new Promise((resolve, reject) => {
+        const source = new EventSource(`/jobs/${jobId}/events`);
+        source.onmessage = (event) => {
+            const job = JSON.parse(event.data);
+            if (['done', 'cancelled', 'failed'].includes(job.status)) {
+                source.close();
+                resolve(job);
+            }
+        };
+        source.onerror = () => {
+            if (source.readyState === EventSource.CLOSED) {
+                reject(new Error('Lost the job event stream'));
+            }
+        };
+    });
+}
+
 // Get the full name of an agent type
 function getAgentTypeName(type) {
     switch (type) {
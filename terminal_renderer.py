@@ -0,0 +1,193 @@
+"""
+Terminal Renderer - incremental ANSI rendering of a GridWorld
+"""
+from typing import Any, Dict, List, Optional, Sequence, TextIO, Tuple
+import sys
+import time
+
+
+class TerminalRenderer:
+    """
+    Draws a GridWorld in a terminal, sending only what changed since the
+    previous frame.
+
+    The first frame clears the screen and draws everything. Later frames
+    compare each visible cell with the last frame and rewrite only the
+    changed runs of cells, using ANSI cursor positioning. Each frame is one
+    write to the stream.
+
+    An optional frame-rate cap skips frames that arrive too soon after the
+    previous one, so the simulation can step faster than the terminal can
+    draw. An optional viewport shows only part of a large grid and can
+    follow an agent.
+    """
+
+    EMPTY_CELL = "· "
+    OBSTACLE_CELL = "▓▓"
+    GOAL_CELL = "G "
+
+    # Status lines for at most this many agents are shown under the grid
+    MAX_STATUS_AGENTS = 10
+
+    def __init__(self, env: Any, viewport: Optional[Tuple[int, int]] = None,
+                 follow: Any = None, max_fps: Optional[float] = None,
+                 stream: Optional[TextIO] = None):
+        """
+        Initialize the renderer.
+
+        Args:
+            env: The GridWorld to draw
+            viewport: The (width, height) in cells to show, or None for the whole grid
+            follow: An agent to keep centred in the viewport, or None for a fixed
+                viewport at the top-left corner
+            max_fps: The maximum number of frames drawn per second, or None for no cap
+            stream: The terminal stream to write to (defaults to stdout)
+        """
+        self.env = env
+        width, height = viewport if viewport else (env.width, env.height)
+        self.viewport = (min(width, env.width), min(height, env.height))
+        self.follow = follow
+        self.max_fps = max_fps
+        self.stream = stream if stream is not None else sys.stdout
+        self.frames_drawn = 0
+        self.frames_skipped = 0
+        self._last_cells: Optional[List[str]] = None  # Cell labels of the last frame, row-major
+        self._last_lines: Dict[int, str] = {}  # Maps screen rows to the text lines drawn there
+        self._last_time: Optional[float] = None
+        self._agent_labels: Dict[Any, str] = {}
+        self._labelled_agents = -1  # Number of agents when labels were last built
+
+    def render(self, force: bool = False, notes: Sequence[str] = ()) -> bool:
+        """
+        Draw the current state of the environment.
+
+        Args:
+            force: Draw even if the frame-rate cap would skip this frame
+            notes: Extra text lines to show under the agent status lines
+
+        Returns:
+            True if a frame was drawn, False if it was skipped
+        """
+        now = time.monotonic()
+        if (not force and self.max_fps and self._last_time is not None
+                and now - self._last_time < 1.0 / self.max_fps):
+            self.frames_skipped += 1
+            return False
+        self._last_time = now
+
+        origin_x, origin_y = self._origin()
+        cells = self._cells(origin_x, origin_y)
+        width, height = self.viewport
+        out = []
+
+        if self._last_cells is None:
+            # First frame: clear the screen, hide the cursor and draw the borders
+            out.append("\x1b[2J\x1b[?25l")
+            out.append(f"\x1b[2;1H┌{'─' * (width * 2)}┐")
+            for row in range(height):
+                line = "".join(cells[row * width:(row + 1) * width])
+                out.append(f"\x1b[{row + 3};1H│{line}│")
+            out.append(f"\x1b[{height + 3};1H└{'─' * (width * 2)}┘")
+        else:
+            for row in range(height):
+                start = row * width
+                col = 0
+                while col < width:
+                    if cells[start + col] == self._last_cells[start + col]:
+                        col += 1
+                        continue
+                    # Rewrite the whole run of changed cells in one go
+                    run_start = col
+                    while col < width and cells[start + col] != self._last_cells[start + col]:
+                        col += 1
+                    text = "".join(cells[start + run_start:start + col])
+                    out.append(f"\x1b[{row + 3};{run_start * 2 + 2}H{text}")
+
+        status_lines = self._status_lines(origin_x, origin_y, notes)
+        for screen_row, line in status_lines:
+            if self._last_lines.get(screen_row) != line:
+                out.append(f"\x1b[{screen_row};1H{line}\x1b[K")
+                self._last_lines[screen_row] = line
+        # Clear lines left over from a longer previous frame
+        shown_rows = {screen_row for screen_row, _ in status_lines}
+        for screen_row in [row for row in self._last_lines if row not in shown_rows]:
+            out.append(f"\x1b[{screen_row};1H\x1b[K")
+            del self._last_lines[screen_row]
+
+        self._last_cells = cells
+        self.stream.write("".join(out))
+        self.stream.flush()
+        self.frames_drawn += 1
+        return True
+
+    def close(self) -> None:
+        """
+        Move the cursor below the frame and show it again.
+        """
+        if self._last_cells is not None:
+            last_row = max(self._last_lines) if self._last_lines else self.viewport[1] + 3
+            self.stream.write(f"\x1b[{last_row + 1};1H\x1b[?25h")
+            self.stream.flush()
+
+    def _origin(self) -> Tuple[int, int]:
+        """
+        Get the grid position shown at the top-left of the viewport.
+        """
+        width, height = self.viewport
+        position = self.env.agent_positions.get(self.follow) if self.follow is not None else None
+        if position is None:
+            return 0, 0
+        x, y = position
+        origin_x = min(max(x - width // 2, 0), self.env.width - width)
+        origin_y = min(max(y - height // 2, 0), self.env.height - height)
+        return origin_x, origin_y
+
+    def _cells(self, origin_x: int, origin_y: int) -> List[str]:
+        """
+        Build the two-column label of every visible cell, row-major.
+        """
+        env = self.env
+        if self._labelled_agents != len(env.agents):
+            self._agent_labels = {agent: f"A{i % 10}" for i, agent in enumerate(env.agents)}
+            self._labelled_agents = len(env.agents)
+
+        width, height = self.viewport
+        cells = []
+        for y in range(origin_y, origin_y + height):
+            row = env.grid[y]
+            for x in range(origin_x, origin_x + width):
+                occupants = env.position_agents.get((x, y))
+                if occupants:
+                    cells.append(self._agent_labels.get(occupants[0], "A?"))
+                elif row[x] == env.OBSTACLE:
+                    cells.append(self.OBSTACLE_CELL)
+                elif row[x] == env.GOAL:
+                    cells.append(self.GOAL_CELL)
+                else:
+                    cells.append(self.EMPTY_CELL)
+        return cells
+
+    def _status_lines(self, origin_x: int, origin_y: int,
+                      notes: Sequence[str] = ()) -> List[Tuple[int, str]]:
+        """
+        Build the header, agent status and note lines with their screen rows.
+        """
+        env = self.env
+        width, height = self.viewport
+        header = f"{env.name} - Time step: {env.time_step}"
+        if (width, height) != (env.width, env.height):
+            header += f" - View ({origin_x}, {origin_y}) {width}x{height} of {env.width}x{env.height}"
+        lines = [(1, header)]
+
+        row = height + 4
+        for i, agent in enumerate(env.agents[:self.MAX_STATUS_AGENTS]):
+            lines.append((row, f"Agent {i}: {agent.name} at {env.agent_positions.get(agent)} "
+                               f"- Performance: {agent.performance_measure}"))
+            row += 1
+        if len(env.agents) > self.MAX_STATUS_AGENTS:
+            lines.append((row, f"... and {len(env.agents) - self.MAX_STATUS_AGENTS} more agents"))
+            row += 1
+        for note in notes:
+            lines.append((row, note))
+            row += 1
+        return lines
@@ -0,0 +1,57 @@
+"""
+Tests for the web app's request handling
+"""
+import os
+import random
+
+import pytest
+
+pytest.importorskip("flask")
+os.environ.setdefault("SIMULATION_STORE", "memory")
+
+import app  # noqa: E402
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(app, "Q_TABLE_DIR", str(tmp_path))
+    return app.app.test_client()
+
+
+def test_job_id_is_not_a_simulation_id(client):
+    job_id = app.jobs.submit({"agent_type": "reflex"}, 1)
+    headers = {app.SIMULATION_HEADER: f"{app.JobManager.KEY_PREFIX}{job_id}"}
+
+    assert client.post("/step", headers=headers).status_code == 400
+    assert client.post("/init", json={"agent_type": "reflex"}, headers=headers).status_code == 200
+    assert app.jobs.status(job_id)["job_id"] == job_id
+
+
+def test_agent_structure_totals_follow_simulations(client):
+    response = client.post("/init", json={"agent_type": "qlearning"})
+    headers = {app.SIMULATION_HEADER: response.get_json()["simulation_id"]}
+    for _ in range(10):
+        client.post("/step", headers=headers)
+    sizes, entries = app.agent_structure_totals
+    assert entries["q_values"] > 0 and sizes["q_values"] > 0
+
+    # Replacing the simulation drops its agent from the totals
+    client.post("/init", json={"agent_type": "reflex"}, headers=headers)
+    assert entries["q_values"] == 0 and sizes["q_values"] == 0
+
+
+def test_q_table_is_saved_once_per_episode(client, monkeypatch):
+    saved = []
+    monkeypatch.setattr(app, "save_q_table", lambda agent, env, directory: saved.append(env))
+    random.seed(0)
+    response = client.post("/init", json={"agent_type": "qlearning"})
+    headers = {app.SIMULATION_HEADER: response.get_json()["simulation_id"]}
+    for _ in range(5000):
+        if client.post("/step", headers=headers).get_json()["goal_reached"]:
+            break
+    else:
+        pytest.fail("the Q-learning agent did not reach the goal")
+
+    for _ in range(3):
+        client.post("/step", headers=headers)
+    assert len(saved) == 1
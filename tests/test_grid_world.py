@@ -0,0 +1,233 @@
+"""
+Tests for GridWorld's cached and incrementally maintained structures
+"""
+from collections import deque
+import random
+
+import pytest
+
+from grid_world import GridWorld
+from reflex_agent import SimpleReflexAgent
+
+
+RANDOM_GRIDS = 300
+
+
+def random_edit(env, rng):
+    """Apply one random obstacle or goal change, returning it as (method name, position)."""
+    position = (rng.randrange(env.width), rng.randrange(env.height))
+    name = rng.choices(("add_obstacle", "remove_obstacle", "add_goal"), weights=(5, 4, 1))[0]
+    getattr(env, name)(position)
+    return name, position
+
+
+def random_world(rng, **kwargs):
+    """Build a small GridWorld with random obstacles and one or two goals."""
+    env = GridWorld(width=rng.randint(2, 9), height=rng.randint(2, 9), **kwargs)
+    for _ in range(env.width * env.height // 4):
+        env.add_obstacle((rng.randrange(env.width), rng.randrange(env.height)))
+    for _ in range(rng.randint(1, 2)):
+        env.add_goal((rng.randrange(env.width), rng.randrange(env.height)))
+    return env
+
+
+def reference_distances(env):
+    """Breadth-first search from the goals, as a dict of position -> moves to the nearest goal."""
+    distances = {goal: 0 for goal in env.goal_positions if env.grid[goal[1]][goal[0]] == GridWorld.GOAL}
+    queue = deque(distances)
+    while queue:
+        x, y = queue.popleft()
+        for nx, ny in ((x, y - 1), (x, y + 1), (x - 1, y), (x + 1, y)):
+            if (0 <= nx < env.width and 0 <= ny < env.height and (nx, ny) not in distances
+                    and env.grid[ny][nx] != GridWorld.OBSTACLE):
+                distances[(nx, ny)] = distances[(x, y)] + 1
+                queue.append((nx, ny))
+    return distances
+
+
+def assert_distance_field_is_correct(env):
+    """Check every cell's distance and that its optimal action leads one move closer."""
+    expected = reference_distances(env)
+    moves = {GridWorld.UP: (0, -1), GridWorld.DOWN: (0, 1), GridWorld.LEFT: (-1, 0), GridWorld.RIGHT: (1, 0)}
+    for y in range(env.height):
+        for x in range(env.width):
+            distance = env.optimal_distance((x, y))
+            assert distance == expected.get((x, y)), (x, y)
+            action = env.optimal_action((x, y))
+            if not distance:
+                assert action is None, (x, y)
+            else:
+                dx, dy = moves[action]
+                assert expected.get((x + dx, y + dy)) == distance - 1, (x, y)
+
+
+def add_probes(env):
+    """Put one agent on every cell, so every cell's percept can be read."""
+    probes = {}
+    for y in range(env.height):
+        for x in range(env.width):
+            probes[(x, y)] = SimpleReflexAgent(f"Probe {x},{y}")
+            env.add_agent(probes[(x, y)], (x, y))
+    return probes
+
+
+# Percept cache (user-030)
+
+@pytest.mark.parametrize("seed", range(RANDOM_GRIDS))
+def test_cached_percepts_match_computed_ones_after_edits(seed):
+    rng = random.Random(seed)
+    cached = GridWorld(width=rng.randint(2, 8), height=rng.randint(2, 8), cache_percepts=True)
+    plain = GridWorld(width=cached.width, height=cached.height)
+    cached_probes, plain_probes = add_probes(cached), add_probes(plain)
+    if rng.random() < 0.5:
+        cached.precompute_percepts()
+
+    for edit in range(12):
+        name, position = random_edit(cached, rng)
+        getattr(plain, name)(position)
+        if edit % 3 == 2:
+            for cell, probe in cached_probes.items():
+                assert cached.get_percept(probe) == plain.get_percept(plain_probes[cell]), cell
+
+
+def test_cached_percepts_are_shared_per_cell():
+    env = GridWorld(width=4, height=3, cache_percepts=True)
+    first, second = SimpleReflexAgent("A"), SimpleReflexAgent("B")
+    env.add_agent(first, (1, 1))
+    env.add_agent(second, (1, 1))
+    assert env.get_percept(first) is env.get_percept(second)
+
+
+# Distance field (user-034)
+
+@pytest.mark.parametrize("seed", range(RANDOM_GRIDS))
+def test_distance_field_matches_breadth_first_search(seed):
+    env = random_world(random.Random(seed))
+    assert_distance_field_is_correct(env)
+
+
+def test_distance_heuristic_is_the_optimal_distance():
+    env = GridWorld(width=5, height=3)
+    env.add_obstacle((2, 0))
+    env.add_obstacle((2, 1))
+    env.add_obstacle((4, 1))
+    env.add_goal((4, 0))
+    heuristic = env.distance_heuristic()
+    assert heuristic((0, 0), (4, 0)) == 8
+    env.add_obstacle((2, 2))
+    assert heuristic((0, 0), (4, 0)) == float("inf")
+    assert env.optimal_distance((0, 0)) is None
+    assert env.optimal_distance((9, 9)) is None
+
+
+# Incremental distance-field repair and moving obstacles (user-035)
+
+@pytest.mark.parametrize("seed", range(RANDOM_GRIDS))
+def test_repaired_distance_field_matches_breadth_first_search(seed):
+    rng = random.Random(seed)
+    env = random_world(rng)
+    env.distance_field()
+    for _ in range(15):
+        random_edit(env, rng)
+        assert_distance_field_is_correct(env)
+
+
+def test_moving_obstacle_keeps_the_distance_field_current():
+    env = GridWorld(width=5, height=5)
+    env.add_goal((4, 4))
+    obstacle = env.add_moving_obstacle([(2, 1), (2, 2), (2, 3), (2, 2)])
+    env.distance_field()
+    visited = []
+    for _ in range(8):
+        env.step()
+        visited.append(obstacle.position)
+        assert_distance_field_is_correct(env)
+    assert visited == [(2, 2), (2, 3), (2, 2), (2, 1)] * 2
+
+
+def test_grid_changes_are_published_per_tick():
+    env = GridWorld(width=5, height=3)
+    env.add_goal((4, 2))
+    env.add_moving_obstacle([(1, 1), (2, 1)], period=2)
+    events = []
+    env.subscribe(lambda time_step, changes: events.append((time_step, changes)))
+
+    env.step()
+    assert events == [] and env.last_changes == frozenset()
+    env.step()
+    assert events == [(1, frozenset({(1, 1), (2, 1)}))]
+    assert env.last_changes == frozenset({(1, 1), (2, 1)})
+
+
+def test_moving_obstacle_waits_for_an_agent_in_its_way():
+    env = GridWorld(width=4, height=3)
+    env.add_goal((3, 2))
+    obstacle = env.add_moving_obstacle([(1, 1), (2, 1)])
+    agent = SimpleReflexAgent("Blocker")  # Has no rules, so it stays put
+    env.add_agent(agent, (2, 1))
+    env.step()
+    assert obstacle.position == (1, 1)
+    assert env.grid[1][2] == GridWorld.EMPTY
+
+
+# Reset and copy-on-write clone (user-045)
+
+def test_reset_restores_the_start_of_the_episode():
+    env = GridWorld(width=6, height=4)
+    env.add_goal((5, 3))
+    obstacle = env.add_moving_obstacle([(3, 0), (3, 1), (3, 2)])
+    agent = SimpleReflexAgent("Walker")
+    agent.add_rule(lambda percept: True, GridWorld.RIGHT)
+    agent.performance_measure = 4
+    env.add_agent(agent, (0, 3))
+    for _ in range(7):
+        env.step()
+    assert env.agent_positions[agent] == (5, 3) and agent.performance_measure > 4
+    assert obstacle.index != 0
+
+    env.reset()
+    assert env.agent_positions[agent] == (0, 3)
+    assert env.agents_at((0, 3)) == [agent]
+    assert agent.performance_measure == 4
+    assert env.time_step == 0 and env.last_changes == frozenset()
+    assert obstacle.position == (3, 0)
+    assert [env.grid[y][3] for y in range(3)] == [GridWorld.OBSTACLE, GridWorld.EMPTY, GridWorld.EMPTY]
+
+
+@pytest.mark.parametrize("sparse", [False, True])
+@pytest.mark.parametrize("seed", range(50))
+def test_clone_and_original_change_independently(seed, sparse):
+    rng = random.Random(seed)
+    env = random_world(rng, sparse=sparse, chunk_size=4, cache_percepts=True)
+    env.distance_field()
+    env.precompute_percepts()
+    env.random_empty_position()  # Build the free-cell index
+    before = [[env.grid[y][x] for x in range(env.width)] for y in range(env.height)]
+
+    clone = env.clone()
+    for _ in range(10):
+        random_edit(clone, rng)
+    assert [[env.grid[y][x] for x in range(env.width)] for y in range(env.height)] == before
+    assert_distance_field_is_correct(env)
+    assert_distance_field_is_correct(clone)
+
+    # The original's percepts and free cells still describe its own grid
+    plain = GridWorld(width=env.width, height=env.height)
+    for y, row in enumerate(before):
+        for x, content in enumerate(row):
+            if content == GridWorld.OBSTACLE:
+                plain.add_obstacle((x, y))
+    for position in env.goal_positions:
+        plain.add_goal(position)
+    for cell, probe in add_probes(env).items():
+        plain_probe = SimpleReflexAgent("Plain")
+        plain.add_agent(plain_probe, cell)
+        assert env.get_percept(probe) == plain.get_percept(plain_probe), cell
+    for _ in range(20):
+        x, y = env.random_empty_position()
+        assert env.grid[y][x] == GridWorld.EMPTY
+
+    for _ in range(10):
+        random_edit(env, rng)
+    assert_distance_field_is_correct(env)
+    assert_distance_field_is_correct(clone)
@@ -0,0 +1,153 @@
+"""
+Tests for the ModelBasedAgent planners against breadth-first search
+"""
+from collections import deque
+import random
+
+import pytest
+
+from hierarchical_planner import HierarchicalPlanner
+from jump_point_search import jump_point_search
+from model_agent import ModelBasedAgent
+from world_model import WorldModel
+
+
+RANDOM_MAPS = 600
+MOVES = {"up": (0, -1), "down": (0, 1), "left": (-1, 0), "right": (1, 0)}
+
+
+def random_map(rng):
+    """
+    Build a world model of a random map with a start and a goal.
+
+    A few cells are left unknown, which the planners treat as blocked.
+    """
+    model = WorldModel()
+    width, height = rng.randint(2, 30), rng.randint(2, 30)
+    density = rng.choice((0.1, 0.25, 0.4))
+    for y in range(height):
+        for x in range(width):
+            roll = rng.random()
+            if roll >= 0.03:
+                model.set((x, y), 1 if roll < density else 0)
+    open_cells = [position for position, content in model.known_cells() if content != 1]
+    if len(open_cells) < 2:
+        model.set((0, 0), 0)
+        model.set((1, 0), 0)
+        open_cells = [(0, 0), (1, 0)]
+    start, goal = rng.sample(open_cells, 2)
+    return model, start, goal
+
+
+def is_open(model, position):
+    content = model.get(position)
+    return content is not None and content != 1
+
+
+def shortest_distance(model, start, goal):
+    """Breadth-first search over the model's known open cells."""
+    distances = {start: 0}
+    queue = deque([start])
+    while queue:
+        x, y = current = queue.popleft()
+        if current == goal:
+            return distances[goal]
+        for dx, dy in MOVES.values():
+            neighbor = (x + dx, y + dy)
+            if neighbor not in distances and is_open(model, neighbor):
+                distances[neighbor] = distances[current] + 1
+                queue.append(neighbor)
+    return None
+
+
+def walk(model, start, actions):
+    """Follow actions from a start cell, checking that every cell entered is open."""
+    x, y = start
+    for action in actions:
+        dx, dy = MOVES[action]
+        x, y = x + dx, y + dy
+        assert is_open(model, (x, y)), (x, y)
+    return x, y
+
+
+def follow_hierarchical_route(planner, start, goal, change=None):
+    """Ask the planner for segments until it reaches the goal or gives up; returns (end, moves)."""
+    position, moves = start, 0
+    while position != goal:
+        segment = planner.next_segment(position, goal)
+        if not segment:
+            break
+        position = walk(planner.world_model, position, segment)
+        moves += len(segment)
+        if change is not None:
+            change(position)
+    return position, moves
+
+
+# HPA* (user-046)
+
+@pytest.mark.parametrize("seed", range(RANDOM_MAPS))
+def test_hierarchical_route_reaches_every_reachable_goal(seed):
+    rng = random.Random(seed)
+    model, start, goal = random_map(rng)
+    cluster_size = rng.choice((2, 4, 8))
+    planner = HierarchicalPlanner(model, cluster_size)
+
+    position, moves = follow_hierarchical_route(planner, start, goal)
+    optimal = shortest_distance(model, start, goal)
+    if optimal is None:
+        assert position != goal
+    else:
+        assert position == goal
+        assert optimal <= moves <= 2 * optimal + 2 * cluster_size
+
+
+@pytest.mark.parametrize("seed", range(200))
+def test_hierarchical_route_adapts_to_new_obstacles(seed):
+    rng = random.Random(seed)
+    model, start, goal = random_map(rng)
+    planner = HierarchicalPlanner(model, rng.choice((2, 4, 8)))
+
+    def block_a_cell(position):
+        # Wall off a random known cell, but never the agent's cell or the goal
+        cell = (rng.randrange(model.width), rng.randrange(model.height))
+        if rng.random() < 0.5 and cell not in (position, goal) and model.get(cell) is not None:
+            model.set(cell, 1)
+
+    position, _ = follow_hierarchical_route(planner, start, goal, block_a_cell)
+    if position != goal:
+        assert shortest_distance(model, position, goal) is None
+
+
+def test_hierarchical_planner_rejects_tiny_clusters():
+    with pytest.raises(ValueError):
+        HierarchicalPlanner(WorldModel(), cluster_size=1)
+
+
+# Jump Point Search (user-047)
+
+@pytest.mark.parametrize("seed", range(RANDOM_MAPS))
+def test_jump_point_search_finds_shortest_paths(seed):
+    model, start, goal = random_map(random.Random(seed))
+    path, _ = jump_point_search(model, start, goal)
+    optimal = shortest_distance(model, start, goal)
+    if optimal is None:
+        assert path == []
+    else:
+        assert walk(model, start, path) == goal
+        assert len(path) == optimal
+
+
+def test_jump_point_search_expands_fewer_nodes_than_a_star_on_open_maps():
+    model = WorldModel()
+    for y in range(40):
+        for x in range(40):
+            model.set((x, y), 0)
+    agents = {planner: ModelBasedAgent(planner=planner) for planner in ("astar", "jps")}
+    for agent in agents.values():
+        agent.world_model = model
+        agent.model = model.cells
+        agent.position, agent.goal_position = (0, 0), (39, 39)
+    paths = {planner: agent.plan_path() for planner, agent in agents.items()}
+    assert len(paths["jps"]) == len(paths["astar"]) == 78
+    assert agents["jps"].nodes_expanded < agents["astar"].nodes_expanded
@@ -0,0 +1,108 @@
+"""
+Tests for memory-mapped and shared-memory Q-tables
+"""
+import os
+import pickle
+
+import pytest
+
+from grid_world import GridWorld
+from q_learning_agent import QLearningAgent
+from q_table_store import (QValueOverlay, SharedQTable, maze_fingerprint, open_q_table, save_q_table,
+                           table_path, warm_start)
+
+
+@pytest.fixture
+def env():
+    env = GridWorld(width=6, height=4, name="Q World")
+    env.add_obstacle((2, 1))
+    env.add_goal((4, 2))
+    return env
+
+
+def trained_agent(values):
+    agent = QLearningAgent("Q-Learner")
+    agent.q_values.update(values)
+    agent.world_model.set_visit_count((1, 1), 3)
+    return agent
+
+
+def test_warm_start_reads_the_saved_table(env, tmp_path):
+    save_q_table(trained_agent({((1, 1), "right"): 5.0, ((3, 2), "up"): -1.5}), env, str(tmp_path))
+
+    agent = QLearningAgent("Q-Learner")
+    assert warm_start(agent, env, str(tmp_path))
+    assert isinstance(agent.q_values, QValueOverlay)
+    assert dict(agent.q_values) == {((1, 1), "right"): 5.0, ((3, 2), "up"): -1.5}
+    assert agent.visit_counts[(1, 1)] == 3
+
+
+def test_warm_start_without_a_saved_table(env, tmp_path):
+    assert table_path(env, str(tmp_path)) is None
+    assert not warm_start(QLearningAgent("Q-Learner"), env, str(tmp_path))
+
+
+def test_fingerprint_depends_on_the_maze(env):
+    other = GridWorld(width=6, height=4)
+    other.add_goal((4, 2))
+    assert maze_fingerprint(env) != maze_fingerprint(other)
+    other.add_obstacle((2, 1))
+    assert maze_fingerprint(env) == maze_fingerprint(other)
+
+
+def test_overlay_writes_stay_private(env, tmp_path):
+    save_q_table(trained_agent({((1, 1), "right"): 5.0}), env, str(tmp_path))
+    first, second = QLearningAgent("A"), QLearningAgent("B")
+    warm_start(first, env, str(tmp_path))
+    warm_start(second, env, str(tmp_path))
+
+    first.q_values[((1, 1), "right")] = 7.0
+    del first.q_values[((1, 1), "right")]
+    first.q_values[((0, 0), "down")] = 1.0
+    assert dict(first.q_values) == {((0, 0), "down"): 1.0}
+    assert dict(second.q_values) == {((1, 1), "right"): 5.0}
+    assert first.q_values.base is second.q_values.base
+
+
+def test_restored_agent_keeps_the_table_it_started_from(env, tmp_path):
+    save_q_table(trained_agent({((1, 1), "right"): 5.0}), env, str(tmp_path))
+    agent = QLearningAgent("Q-Learner")
+    warm_start(agent, env, str(tmp_path))
+    data = pickle.dumps(agent)
+
+    # Another agent saves a different table for the same maze
+    save_q_table(trained_agent({((1, 1), "right"): -7.0}), env, str(tmp_path))
+
+    restored = pickle.loads(data)
+    assert restored.q_values[((1, 1), "right")] == 5.0
+    newer = QLearningAgent("Q-Learner")
+    warm_start(newer, env, str(tmp_path))
+    assert newer.q_values[((1, 1), "right")] == -7.0
+
+
+def test_identical_tables_share_a_file(env, tmp_path):
+    values = {((1, 1), "right"): 5.0}
+    first = save_q_table(trained_agent(values), env, str(tmp_path))
+    second = save_q_table(trained_agent(values), env, str(tmp_path))
+    assert first == second == table_path(env, str(tmp_path))
+    assert len([name for name in os.listdir(tmp_path) if name.endswith(".qtable")]) == 1
+
+
+def test_open_q_table_shares_one_mapping(env, tmp_path):
+    path = save_q_table(trained_agent({((1, 1), "right"): 5.0}), env, str(tmp_path))
+    assert open_q_table(path) is open_q_table(path)
+
+
+def test_shared_table_pickles_by_name():
+    table = SharedQTable(3, 2)
+    try:
+        attached = pickle.loads(pickle.dumps(table))
+        attached[((2, 1), "left")] = 0.5
+        assert table[((2, 1), "left")] == 0.5
+        assert dict(table) == {((2, 1), "left"): 0.5}
+        with pytest.raises(KeyError):
+            table[((3, 0), "up")] = 1.0
+        attached.close()
+    finally:
+        table.close()
+        table.unlink()
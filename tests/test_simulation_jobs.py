@@ -0,0 +1,83 @@
+"""
+Tests for background simulation jobs
+"""
+import threading
+import time
+
+import pytest
+
+from grid_world import GridWorld
+from reflex_agent import default_explorer
+from simulation_jobs import JobManager
+from simulation_store import MemoryStore
+
+
+def build(config):
+    env = GridWorld(width=10, height=6, name="Job World")
+    env.add_goal((8, 4))
+    agent = default_explorer("Explorer")
+    env.add_agent(agent, (1, 1))
+    return env, agent
+
+
+@pytest.fixture
+def jobs():
+    manager = JobManager(MemoryStore(), build, max_workers=1, max_queued=1, progress_interval=5)
+    yield manager
+    manager.shutdown()
+
+
+def wait(jobs, job_id, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        record = jobs.status(job_id)
+        if record["status"] in JobManager.TERMINAL_STATUSES:
+            return record
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+def test_simulation_job_runs_to_its_budget_or_the_goal(jobs):
+    record = wait(jobs, jobs.submit({}, 200))
+    assert record["status"] == "done"
+    assert record["goal_reached"] or record["steps"] == 200
+
+
+def test_task_job_keeps_its_last_result(jobs):
+    def task(config):
+        for i in range(config["count"]):
+            yield {"done": i + 1}
+
+    record = wait(jobs, jobs.submit_task({"count": 3}, task))
+    assert record["status"] == "done"
+    assert record["steps"] == 3
+    assert record["result"] == {"done": 3}
+    assert record["step_budget"] is None
+
+
+def test_task_job_stops_when_cancelled(jobs):
+    release = threading.Event()
+
+    def task(config):
+        while True:
+            yield "working"
+            release.wait(1.0)
+
+    job_id = jobs.submit_task({}, task)
+    while jobs.status(job_id)["steps"] == 0:
+        time.sleep(0.01)
+    jobs.cancel(job_id)
+    release.set()
+    record = wait(jobs, job_id)
+    assert record["status"] == "cancelled"
+    assert record["result"] == "working"
+
+
+def test_failed_task_records_the_error(jobs):
+    def task(config):
+        raise ValueError("bad config")
+        yield
+
+    record = wait(jobs, jobs.submit_task({}, task))
+    assert record["status"] == "failed"
+    assert record["error"] == "bad config"
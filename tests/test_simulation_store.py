@@ -0,0 +1,94 @@
+"""
+Tests for the web simulation stores
+"""
+from typing import Any, Callable, Dict, Hashable, Optional
+import pickle
+import random
+
+import pytest
+
+from grid_world import GridWorld
+from main import create_structured_maze
+from model_agent import ModelBasedAgent
+from q_learning_agent import QLearningAgent
+from reflex_agent import default_explorer
+from simulation_store import MemoryStore, SimulationNotFound, SQLiteStore
+from utility_agent import UtilityBasedAgent
+
+
+# The agents the web app creates, by agent type
+AGENT_FACTORIES = {
+    "reflex": lambda: default_explorer("Explorer"),
+    "model": lambda: ModelBasedAgent("Explorer"),
+    "utility": lambda: UtilityBasedAgent("Explorer", exploration_rate=0.2),
+    "qlearning": lambda: QLearningAgent("Q-Learner", learning_rate=0.2, discount_factor=0.9,
+                                        exploration_rate=0.3),
+}
+
+
+def check_round_trip(create: Callable[[], Any], advance: Callable[[Any], Any],
+                     observe: Callable[[Any], Hashable], steps: int = 20, seed: int = 0) -> Optional[int]:
+    """
+    Check that a simulation behaves the same after being pickled between steps.
+
+    SQLiteStore pickles a simulation after every request, so anything that
+    does not survive pickling (for example a marker compared by identity)
+    changes how a stored simulation behaves. This runs one copy of a
+    simulation in memory and another that is pickled and loaded before
+    every step, with the same random seed for both, and compares what
+    ``observe`` sees after each step.
+
+    Returns:
+        The first step after which the two copies differ, or None if they
+        never do
+    """
+    random.seed(seed)
+    live = create()
+    random.seed(seed)
+    stored = create()
+    for step in range(1, steps + 1):
+        stored = pickle.loads(pickle.dumps(stored, pickle.HIGHEST_PROTOCOL))
+        random.seed(seed + step)
+        advance(live)
+        random.seed(seed + step)
+        advance(stored)
+        if observe(live) != observe(stored):
+            return step
+    return None
+
+
+@pytest.mark.parametrize("agent_type", sorted(AGENT_FACTORIES))
+def test_simulation_survives_pickling_between_steps(agent_type):
+    make_agent = AGENT_FACTORIES[agent_type]
+
+    def create() -> Dict[str, Any]:
+        env = GridWorld(width=15, height=8, name="Round Trip")
+        create_structured_maze(env)
+        env.add_agent(make_agent(), (1, 1))
+        return {"env": env}
+
+    step = check_round_trip(create, lambda sim: sim["env"].step(),
+                            lambda sim: tuple(sim["env"].agent_positions.values()), steps=50)
+    assert step is None, f"{agent_type} agent differs after step {step}"
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return MemoryStore()
+    return SQLiteStore(str(tmp_path / "simulations.db"))
+
+
+def test_session_saves_changes(store):
+    simulation_id = store.create({"step_count": 0})
+    with store.session(simulation_id) as sim:
+        sim["step_count"] += 1
+    assert store.load(simulation_id) == {"step_count": 1}
+    assert simulation_id in store.ids()
+
+
+def test_deleted_simulation_is_not_found(store):
+    simulation_id = store.create({"step_count": 0})
+    store.delete(simulation_id)
+    with pytest.raises(SimulationNotFound):
+        store.load(simulation_id)
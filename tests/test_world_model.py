@@ -0,0 +1,70 @@
+"""
+Tests for the packed world model against plain dicts
+"""
+import pickle
+import random
+
+import pytest
+
+from world_model import WorldModel
+
+
+@pytest.mark.parametrize("seed", range(600))
+def test_world_model_behaves_like_dicts(seed):
+    rng = random.Random(seed)
+    model = WorldModel(initial_size=rng.choice((1, 4, 16)))
+    cells, visits = {}, {}
+    changed = []
+    model.listeners.append(changed.append)
+    span = rng.choice((3, 10, 40))
+
+    for _ in range(60):
+        position = (rng.randint(-span, span), rng.randint(-span, span))
+        operation = rng.random()
+        if operation < 0.5:
+            # Set or forget a cell; listeners hear about actual changes only
+            content = rng.choice((0, 1, 2)) if operation < 0.4 else None
+            events = len(changed)
+            model.set(position, content)
+            if cells.get(position) != content:
+                assert changed[events:] == [position]
+            else:
+                assert len(changed) == events
+            if content is None:
+                cells.pop(position, None)
+            else:
+                cells[position] = content
+        elif operation < 0.8:
+            visits[position] = visits.get(position, 0) + 1
+            assert model.visit(position) == visits[position]
+        elif operation < 0.9:
+            count = rng.choice((0, 3, 70000))
+            model.visits[position] = count
+            if count:
+                visits[position] = count
+            else:
+                visits.pop(position, None)
+        else:
+            assert model.cells.get(position) == cells.get(position)
+            assert model.visit_count(position) == visits.get(position, 0)
+
+    assert dict(model.cells.items()) == cells
+    assert dict(model.visits.items()) == visits
+    assert len(model.cells) == len(cells) and len(model.visits) == len(visits)
+    assert set(model.cells) == set(cells)
+
+    restored = pickle.loads(pickle.dumps(model))
+    assert dict(restored.cells.items()) == cells
+    assert dict(restored.visits.items()) == visits
+
+
+def test_unknown_cells_are_absent():
+    model = WorldModel()
+    model.cells[(2, 3)] = 1
+    assert (2, 3) in model.cells and (3, 3) not in model.cells
+    with pytest.raises(KeyError):
+        model.cells[(-5, 0)]
+    with pytest.raises(KeyError):
+        del model.visits[(2, 3)]
+    with pytest.raises(ValueError):
+        model.set((0, 0), 3)
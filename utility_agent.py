@@ -1,10 +1,11 @@
 """
 Utility-Based Agent implementation
 """
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, FrozenSet, List, Tuple
 import random
 
 from agent import Agent
+from world_model import WorldModel
 
 
 class UtilityBasedAgent(Agent):
@@ -23,14 +24,15 @@ class UtilityBasedAgent(Agent):
         super().__init__(name)
         self.percept = None
         self.position = None
-        self.model = {}  # Maps positions to cell contents
+        self.world_model = WorldModel()  # Compact record of known cells and visits
+        self.model = self.world_model.cells  # Dict-style view: position -> cell content
         self.utilities = {}  # Maps positions to utility values
         self.exploration_rate = exploration_rate
         self.discount_factor = 0.9  # For utility calculations
         self.goal_positions = []  # Known goal positions
         self.last_position = None
         self.current_action = None
-        self.visit_counts = {}  # For visualization
+        self.visit_counts = self.world_model.visits  # For visualization
         
     def perceive(self, percept: Any) -> None:
         """
@@ -47,7 +49,7 @@ class UtilityBasedAgent(Agent):
             self.position = percept["position"]
             
             # Track visit count for visualization
-            self.visit_counts[self.position] = self.visit_counts.get(self.position, 0) + 1
+            self.world_model.visit(self.position)
             
         # Update the model with cell content
         if "cell_content" in percept and self.position:
@@ -73,18 +75,39 @@ class UtilityBasedAgent(Agent):
         # Update utilities after each move
         self.update_utilities()
         
+    def on_grid_change(self, time_step: int, changed_cells: FrozenSet[Tuple[int, int]]) -> None:
+        """
+        Forget changed cells and their utilities.
+        
+        Only the changed cells are dropped; they are re-learned from percepts
+        and their utilities re-initialized on the next update.
+        
+        Args:
+            time_step: The environment time step of the change
+            changed_cells: The (x, y) cells whose contents changed
+        """
+        for pos in changed_cells:
+            if pos in self.model:
+                del self.model[pos]
+            self.utilities.pop(pos, None)
+            if pos in self.goal_positions:
+                self.goal_positions.remove(pos)
+                
     def update_utilities(self) -> None:
         """
         Update the utility values for known positions.
         Uses a simple form of value iteration from reinforcement learning.
         """
+        # Snapshot the known cells once; the model is scanned on every sweep below
+        known_cells = list(self.world_model.known_cells())
+        
         # Initialize utilities for all known positions
-        for pos in self.model:
+        for pos, content in known_cells:
             if pos not in self.utilities:
                 # Default utility is negative for obstacles, positive for goals, zero otherwise
-                if self.model[pos] == 1:  # OBSTACLE
+                if content == 1:  # OBSTACLE
                     self.utilities[pos] = -10.0
-                elif self.model[pos] == 2:  # GOAL
+                elif content == 2:  # GOAL
                     self.utilities[pos] = 10.0
                 else:
                     self.utilities[pos] = 0.0
@@ -97,8 +120,8 @@ class UtilityBasedAgent(Agent):
         for _ in range(5):  # Reduced from 30 to speed up processing
             new_utilities = self.utilities.copy()
             
-            for pos in self.model:
-                if self.model[pos] == 1:  # Skip obstacles
+            for pos, content in known_cells:
+                if content == 1:  # Skip obstacles
                     continue
                 if pos in self.goal_positions:  # Goals have fixed utility
                     continue
@@ -110,7 +133,8 @@ class UtilityBasedAgent(Agent):
                 
                 for neighbor in neighbors:
                     # Skip if neighbor is unknown or an obstacle
-                    if neighbor not in self.model or self.model[neighbor] == 1:
+                    neighbor_content = self.world_model.get(neighbor)
+                    if neighbor_content is None or neighbor_content == 1:
                         continue
                         
                     # Get utility of neighbor
@@ -0,0 +1,370 @@
+"""
+World Model - compact storage for an agent's knowledge of a grid world
+"""
+from array import array
+from collections.abc import ItemsView, MutableMapping
+from typing import Any, Callable, Iterator, List, Optional, Tuple
+
+
+class WorldModel:
+    """
+    A compact, grow-on-demand record of what an agent knows about a grid.
+
+    Each cell is stored as a 2-bit state (unknown, empty, obstacle, goal),
+    packed four to a byte, and each cell has an unsigned integer visit counter
+    (16-bit, widened to 32-bit the first time a counter overflows).
+    Both arrays cover a bounding box that grows as the agent learns about cells
+    outside it, so no per-cell Python objects are kept.
+
+    Agents expose dict-compatible views of the model through ``cells`` (cell
+    position -> cell content) and ``visits`` (cell position -> visit count),
+    so code written against the old ``model``/``visit_counts`` dicts works
+    unchanged.
+    """
+
+    # Stored cell states; a known cell's state is its grid content + 1
+    UNKNOWN = 0
+    EMPTY = 1
+    OBSTACLE = 2
+    GOAL = 3
+
+    def __init__(self, initial_size: int = 16):
+        """
+        Initialize an empty model.
+
+        Args:
+            initial_size: Minimum number of cells to add on each side when the
+                bounds first grow in a direction
+        """
+        self.initial_size = initial_size
+        self.min_x = 0
+        self.min_y = 0
+        self.width = 0
+        self.height = 0
+        self._row_bytes = 0
+        self._cells = bytearray()
+        self._visits = array('H')
+        self._known = 0  # Number of known cells
+        self._visited = 0  # Number of cells with a non-zero visit count
+        self.listeners: List[Callable[[Tuple[int, int]], None]] = []  # Called with each cell whose content changes
+        self.cells = CellView(self)
+        self.visits = VisitView(self)
+
+    def get(self, position: Tuple[int, int], default: Any = None) -> Any:
+        """
+        Get the known content of a cell.
+
+        Args:
+            position: The (x, y) position of the cell
+            default: Value to return if the cell is unknown
+
+        Returns:
+            The cell content (0=empty, 1=obstacle, 2=goal) or default
+        """
+        ix = position[0] - self.min_x
+        iy = position[1] - self.min_y
+        if 0 <= ix < self.width and 0 <= iy < self.height:
+            state = (self._cells[iy * self._row_bytes + (ix >> 2)] >> ((ix & 3) << 1)) & 3
+            if state:
+                return state - 1
+        return default
+
+    def set(self, position: Tuple[int, int], content: Optional[int]) -> None:
+        """
+        Record the content of a cell.
+
+        Args:
+            position: The (x, y) position of the cell
+            content: The cell content (0=empty, 1=obstacle, 2=goal), or None
+                to mark the cell unknown again
+        """
+        state = self.UNKNOWN if content is None else content + 1
+        if not self.UNKNOWN <= state <= self.GOAL:
+            raise ValueError(f"invalid cell content: {content}")
+
+        x, y = position
+        if not self._in_bounds(x, y):
+            if state == self.UNKNOWN:
+                return
+            self._grow(x, y)
+
+        ix = x - self.min_x
+        iy = y - self.min_y
+        index = iy * self._row_bytes + (ix >> 2)
+        shift = (ix & 3) << 1
+        byte = self._cells[index]
+        old = (byte >> shift) & 3
+        self._cells[index] = (byte & ~(3 << shift)) | (state << shift)
+
+        if old == self.UNKNOWN and state != self.UNKNOWN:
+            self._known += 1
+        elif old != self.UNKNOWN and state == self.UNKNOWN:
+            self._known -= 1
+        if old != state and self.listeners:
+            for listener in self.listeners:
+                listener(position)
+
+    def visit(self, position: Tuple[int, int]) -> int:
+        """
+        Increment the visit counter of a cell.
+
+        Args:
+            position: The (x, y) position of the cell
+
+        Returns:
+            The new visit count
+        """
+        x, y = position
+        if not self._in_bounds(x, y):
+            self._grow(x, y)
+        index = (y - self.min_y) * self.width + (x - self.min_x)
+        count = self._visits[index] + 1
+        try:
+            self._visits[index] = count
+        except OverflowError:
+            self._visits = array('I', self._visits)
+            self._visits[index] = count
+        if count == 1:
+            self._visited += 1
+        return count
+
+    def visit_count(self, position: Tuple[int, int]) -> int:
+        """
+        Get the visit counter of a cell.
+
+        Args:
+            position: The (x, y) position of the cell
+
+        Returns:
+            The number of times the cell has been visited
+        """
+        x, y = position
+        if not self._in_bounds(x, y):
+            return 0
+        return self._visits[(y - self.min_y) * self.width + (x - self.min_x)]
+
+    def set_visit_count(self, position: Tuple[int, int], count: int) -> None:
+        """
+        Overwrite the visit counter of a cell.
+
+        Args:
+            position: The (x, y) position of the cell
+            count: The new visit count
+        """
+        x, y = position
+        if not self._in_bounds(x, y):
+            if count == 0:
+                return
+            self._grow(x, y)
+        index = (y - self.min_y) * self.width + (x - self.min_x)
+        old = self._visits[index]
+        try:
+            self._visits[index] = count
+        except OverflowError:
+            self._visits = array('I', self._visits)
+            self._visits[index] = count
+        if old == 0 and count != 0:
+            self._visited += 1
+        elif old != 0 and count == 0:
+            self._visited -= 1
+
+    def known_cells(self) -> Iterator[Tuple[Tuple[int, int], int]]:
+        """
+        Iterate over all known cells.
+
+        Returns:
+            An iterator of ((x, y), content) pairs in row-major order
+        """
+        cells = self._cells
+        row_bytes = self._row_bytes
+        for iy in range(self.height):
+            y = self.min_y + iy
+            base = iy * row_bytes
+            for bx in range(row_bytes):
+                byte = cells[base + bx]
+                if not byte:
+                    continue
+                x = self.min_x + (bx << 2)
+                for k in range(4):
+                    state = (byte >> (k << 1)) & 3
+                    if state:
+                        yield (x + k, y), state - 1
+
+    def visited_cells(self) -> Iterator[Tuple[Tuple[int, int], int]]:
+        """
+        Iterate over all cells with a non-zero visit count.
+
+        Returns:
+            An iterator of ((x, y), count) pairs in row-major order
+        """
+        width = self.width
+        for index, count in enumerate(self._visits):
+            if count:
+                yield (self.min_x + index % width, self.min_y + index // width), count
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory used by the cell and visit arrays, in bytes."""
+        return len(self._cells) + len(self._visits) * self._visits.itemsize
+
+    def _in_bounds(self, x: int, y: int) -> bool:
+        return (0 <= x - self.min_x < self.width and
+                0 <= y - self.min_y < self.height)
+
+    def _grow(self, x: int, y: int) -> None:
+        """
+        Enlarge the bounding box so that it contains (x, y).
+
+        Each growth adds at least half the current extent on the side that
+        overflowed, so the total cost of growing is amortized over the cells
+        added. The left edge only moves
+        by multiples of four columns, which keeps packed rows byte-aligned and
+        lets existing rows be copied as byte slices.
+        """
+        if self.width == 0:
+            old_min_x, old_max_x = x, x
+            old_min_y, old_max_y = y, y
+        else:
+            old_min_x, old_max_x = self.min_x, self.min_x + self.width
+            old_min_y, old_max_y = self.min_y, self.min_y + self.height
+
+        pad_x = max(self.initial_size, self.width // 2)
+        pad_y = max(self.initial_size, self.height // 2)
+
+        new_min_x = x - pad_x if x < old_min_x or self.width == 0 else old_min_x
+        new_max_x = x + 1 + pad_x if x >= old_max_x or self.width == 0 else old_max_x
+        new_min_y = y - pad_y if y < old_min_y or self.height == 0 else old_min_y
+        new_max_y = y + 1 + pad_y if y >= old_max_y or self.height == 0 else old_max_y
+
+        # Keep the column shift a multiple of four so packed bytes line up
+        shift_x = (old_min_x - new_min_x + 3) // 4 * 4
+        new_min_x = old_min_x - shift_x
+        shift_y = old_min_y - new_min_y
+
+        new_width = new_max_x - new_min_x
+        new_height = new_max_y - new_min_y
+        new_row_bytes = (new_width + 3) // 4
+
+        cells = bytearray(new_row_bytes * new_height)
+        visits = array(self._visits.typecode, [0]) * (new_width * new_height)
+
+        byte_offset = shift_x // 4
+        for row in range(self.height):
+            new_row = row + shift_y
+            src = row * self._row_bytes
+            dst = new_row * new_row_bytes + byte_offset
+            cells[dst:dst + self._row_bytes] = self._cells[src:src + self._row_bytes]
+            src = row * self.width
+            dst = new_row * new_width + shift_x
+            visits[dst:dst + self.width] = self._visits[src:src + self.width]
+
+        self.min_x = new_min_x
+        self.min_y = new_min_y
+        self.width = new_width
+        self.height = new_height
+        self._row_bytes = new_row_bytes
+        self._cells = cells
+        self._visits = visits
+
+    def __str__(self) -> str:
+        return (f"WorldModel({self._known} known cells, "
+                f"{self.width}x{self.height} bounds, {self.nbytes} bytes)")
+
+
+class CellView(MutableMapping):
+    """
+    A dict-compatible view mapping (x, y) positions to known cell contents.
+    Unknown cells are absent from the view.
+    """
+
+    __slots__ = ("_model",)
+
+    def __init__(self, model: WorldModel):
+        self._model = model
+
+    def __getitem__(self, position: Tuple[int, int]) -> int:
+        content = self._model.get(position)
+        if content is None:
+            raise KeyError(position)
+        return content
+
+    def __setitem__(self, position: Tuple[int, int], content: int) -> None:
+        self._model.set(position, content)
+
+    def __delitem__(self, position: Tuple[int, int]) -> None:
+        if self._model.get(position) is None:
+            raise KeyError(position)
+        self._model.set(position, None)
+
+    def __contains__(self, position: Any) -> bool:
+        return self._model.get(position) is not None
+
+    def get(self, position: Tuple[int, int], default: Any = None) -> Any:
+        return self._model.get(position, default)
+
+    def __iter__(self) -> Iterator[Tuple[int, int]]:
+        for position, _ in self._model.known_cells():
+            yield position
+
+    def items(self) -> "_ModelItems":
+        return _ModelItems(self, self._model.known_cells)
+
+    def __len__(self) -> int:
+        return self._model._known
+
+
+class VisitView(MutableMapping):
+    """
+    A dict-compatible view mapping (x, y) positions to visit counts.
+    Cells that have never been visited are absent from the view.
+    """
+
+    __slots__ = ("_model",)
+
+    def __init__(self, model: WorldModel):
+        self._model = model
+
+    def __getitem__(self, position: Tuple[int, int]) -> int:
+        count = self._model.visit_count(position)
+        if count == 0:
+            raise KeyError(position)
+        return count
+
+    def __setitem__(self, position: Tuple[int, int], count: int) -> None:
+        self._model.set_visit_count(position, count)
+
+    def __delitem__(self, position: Tuple[int, int]) -> None:
+        if self._model.visit_count(position) == 0:
+            raise KeyError(position)
+        self._model.set_visit_count(position, 0)
+
+    def __contains__(self, position: Any) -> bool:
+        return self._model.visit_count(position) > 0
+
+    def get(self, position: Tuple[int, int], default: Any = None) -> Any:
+        count = self._model.visit_count(position)
+        return count if count else default
+
+    def __iter__(self) -> Iterator[Tuple[int, int]]:
+        for position, _ in self._model.visited_cells():
+            yield position
+
+    def items(self) -> "_ModelItems":
+        return _ModelItems(self, self._model.visited_cells)
+
+    def __len__(self) -> int:
+        return self._model._visited
+
+
+class _ModelItems(ItemsView):
+    """
+    An items view that iterates the model arrays directly instead of
+    looking up every key a second time.
+    """
+
+    def __init__(self, mapping: MutableMapping, iterate: Any):
+        super().__init__(mapping)
+        self._iterate = iterate
+
+    def __iter__(self) -> Iterator[Tuple[Tuple[int, int], int]]:
+        return self._iterate()